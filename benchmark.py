@@ -0,0 +1,612 @@
+#!/usr/bin/env python3
+"""
+Benchmark this server against the local Athena API simulator (simulator.py).
+
+Suites:
+  pool           per-call aiohttp sessions vs the shared pooled session
+  tools          a seeded mix of tool calls driven through handle_call_tool
+  http           the same mix from many MCP client sessions against main.py
+                 running the streamable HTTP transport
+  booking        many agents racing for a few hot slots, booking with the
+                 server's conflict-aware pipeline vs clients re-querying open
+                 slots and retrying themselves
+  feed           a watcher re-polling a week of appointments while bookings
+                 happen, via get_appointments vs get_appointment_changes
+  serialization  response size and serialization time of the output formats
+
+The simulator runs in its own process so its work does not compete with the
+server's event loop. Its data and the tool workload are generated from --seed,
+so runs with the same arguments are comparable. Save results with --output and compare
+a later run against them with --baseline:
+
+    python benchmark.py --suite tools --calls 2000 --concurrency 20 --latency 0.02 --output before.json
+    python benchmark.py --suite tools --calls 2000 --concurrency 20 --latency 0.02 --baseline before.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+import aiohttp
+
+os.environ.setdefault("ATHENA_CLIENT_ID", "bench")
+os.environ.setdefault("ATHENA_CLIENT_SECRET", "bench")
+os.environ.setdefault("ATHENA_PRACTICE_ID", "1")
+# Measure the server itself rather than the client-side rate limiter, and start every run cold
+os.environ.setdefault("ATHENA_RATE_LIMIT_READ", "0")
+os.environ.setdefault("ATHENA_RATE_LIMIT_WRITE", "0")
+os.environ.setdefault("ATHENA_MAX_CONCURRENCY", "1000")
+os.environ["ATHENA_CACHE_DIR"] = ""
+
+from main import AthenaHealthMCP, serialize_result  # noqa: E402
+from simulator import AthenaSimulator  # noqa: E402
+
+# Relative frequency of each tool in the tools suite
+TOOL_WEIGHTS = {
+    "get_departments": 10,
+    "get_providers": 10,
+    "get_appointment_types": 5,
+    "search_patients": 20,
+    "get_available_slots": 20,
+    "find_open_slots": 15,
+    "get_appointments": 10,
+    "create_appointment": 5,
+}
+
+Call = Tuple[str, Callable[[], Awaitable[bool]]]
+
+SIMULATOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "simulator.py")
+
+async def start_simulator(args: argparse.Namespace) -> asyncio.subprocess.Process:
+    """Run simulator.py in a child process and wait until it is listening"""
+    process = await asyncio.create_subprocess_exec(
+        sys.executable, SIMULATOR,
+        "--port", str(args.port),
+        "--seed", str(args.seed),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--page-size", str(args.page_size),
+        "--patients", str(args.patients),
+        stdout=asyncio.subprocess.PIPE
+    )
+    if not await asyncio.wait_for(process.stdout.readline(), timeout=30):
+        raise RuntimeError(f"Simulator exited with status {await process.wait()}")
+    return process
+
+async def simulator_requests(base_url: str) -> int:
+    """Return the number of API requests the simulator has served"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{base_url}/simulator/stats") as response:
+            return (await response.json())["requests"]
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def summarize(latencies: List[float], errors: int, elapsed: Optional[float] = None) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    summary = {
+        "calls": len(latencies),
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+    if elapsed:
+        summary["calls_per_sec"] = round(len(latencies) / elapsed, 1)
+    return summary
+
+def max_rss_mb() -> Optional[float]:
+    """Peak resident set size of this process (server and simulator together)"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+async def run_load(calls: List[Call], concurrency: int) -> Dict[str, Any]:
+    """Run labelled calls with bounded concurrency and collect overall and per-label latency stats.
+
+    A call fails if it raises or returns False.
+    """
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(label: str, call: Callable[[], Awaitable[bool]]) -> None:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                ok = await call()
+            except Exception:
+                ok = False
+            latencies[label].append(time.perf_counter() - started)
+            if ok is False:
+                errors[label] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(label, call) for label, call in calls))
+    elapsed = time.perf_counter() - started
+
+    overall = summarize([value for values in latencies.values() for value in values], sum(errors.values()), elapsed)
+    overall["by_label"] = {label: summarize(values, errors[label]) for label, values in sorted(latencies.items())}
+    return overall
+
+def build_workload(simulator: AthenaSimulator, count: int, seed: int) -> List[Tuple[str, Dict[str, Any]]]:
+    """Generate a seeded mix of tool calls against the simulator's data"""
+    rng = random.Random(seed)
+    tools = list(TOOL_WEIGHTS)
+    weights = [TOOL_WEIGHTS[tool] for tool in tools]
+    departments = [d["departmentid"] for d in simulator.departments]
+    today = date.today()
+    # Each booking takes a distinct open slot so bookings do not conflict with each other
+    open_slots = rng.sample(sorted(simulator.slots), min(len(simulator.slots), count))
+
+    def day(offset: int) -> str:
+        return (today + timedelta(days=offset)).strftime("%m/%d/%Y")
+
+    workload = []
+    for tool in rng.choices(tools, weights, k=count):
+        if tool == "get_providers":
+            args = {"department_id": rng.choice(departments)}
+        elif tool == "search_patients":
+            patient = rng.choice(simulator.patients)
+            args = {"first_name": patient["firstname"], "last_name": patient["lastname"]}
+            if rng.random() < 0.3:
+                # A misspelt name exercises the local fuzzy index
+                args = {"first_name": patient["firstname"][:-1], "last_name": patient["lastname"], "fuzzy": True}
+        elif tool == "get_available_slots":
+            start = rng.randrange(0, 14)
+            args = {"department_id": rng.choice(departments), "start_date": day(start), "end_date": day(start + rng.randrange(1, 6))}
+        elif tool == "find_open_slots":
+            args = {"department_id": rng.choice(departments), "earliest_time": rng.choice(["08:00", "12:00", "14:00"]), "limit": 5}
+        elif tool == "get_appointments":
+            start = rng.randrange(0, 21)
+            args = {"start_date": day(start), "end_date": day(start + 7), "department_id": rng.choice(departments)}
+        elif tool == "create_appointment" and open_slots:
+            slot = simulator.slots[open_slots.pop()]
+            args = {
+                "patient_id": rng.choice(simulator.patients)["patientid"],
+                "provider_id": slot["providerid"],
+                "department_id": slot["departmentid"],
+                "appointment_type_id": slot["appointmenttypeid"],
+                "appointment_date": slot["date"],
+                "appointment_time": slot["starttime"],
+            }
+        elif tool == "create_appointment":
+            continue
+        else:
+            args = {}
+        workload.append((tool, args))
+    return workload
+
+async def bench_pool(simulator: AthenaSimulator, base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Compare opening a new aiohttp.ClientSession per call with the shared pooled session"""
+    mcp = AthenaHealthMCP()
+    mcp.base_url = base_url
+    results = {}
+    try:
+        token = await mcp.authenticate()
+        counter = iter(range(10 ** 9))
+
+        async def per_call_session() -> bool:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(
+                    f"{base_url}/v1/{mcp.practice_id}/patients",
+                    headers={"Authorization": f"Bearer {token}"},
+                    params={"firstname": str(next(counter))}
+                ) as response:
+                    response.raise_for_status()
+                    await response.json()
+                    return True
+
+        async def pooled_session() -> bool:
+            # Unique params so neither the cache nor request coalescing short-circuits the call
+            await mcp.make_api_request("/patients", params={"firstname": str(next(counter))})
+            return True
+
+        for label, call in [("per-call session", per_call_session), ("pooled session", pooled_session)]:
+            stats = await run_load([(label, call)] * args.calls, args.concurrency)
+            stats.pop("by_label")
+            results[label] = stats
+            print_stats(label, stats)
+    finally:
+        await mcp.close()
+    return results
+
+async def bench_tools(simulator: AthenaSimulator, base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Drive a seeded tool call mix through handle_call_tool and report throughput, latency and memory"""
+    mcp = AthenaHealthMCP()
+    mcp.base_url = base_url
+    await mcp.start()
+    try:
+        def tool_call(name: str, arguments: Dict[str, Any]) -> Call:
+            async def call() -> bool:
+                content = await mcp.handle_call_tool(name, arguments)
+                return not content[0].text.startswith("Error:")
+            return name, call
+
+        # Warm the connection pool, token and caches with a different sample of the same mix
+        warmup = build_workload(simulator, args.warmup, args.seed + 1)
+        await run_load([tool_call(name, arguments) for name, arguments in warmup], args.concurrency)
+
+        workload = build_workload(simulator, args.calls, args.seed)
+        upstream_before = await simulator_requests(base_url)
+        if args.trace_memory:
+            tracemalloc.start()
+        stats = await run_load([tool_call(name, arguments) for name, arguments in workload], args.concurrency)
+        if args.trace_memory:
+            stats["traced_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / 1024 / 1024, 1)
+            tracemalloc.stop()
+        stats["upstream_requests"] = await simulator_requests(base_url) - upstream_before
+        stats["max_rss_mb"] = max_rss_mb()
+    finally:
+        await mcp.close()
+
+    print_tool_stats(stats)
+    return stats
+
+async def bench_http(simulator: AthenaSimulator, base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Run main.py with the HTTP transport and drive the tool mix from many concurrent MCP client sessions"""
+    from contextlib import AsyncExitStack
+    from mcp import ClientSession
+    from mcp.client.streamable_http import streamablehttp_client
+
+    # The MCP client logs every HTTP request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("mcp").setLevel(logging.WARNING)
+    port = args.port + 1
+    env = dict(
+        os.environ,
+        ATHENA_TRANSPORT="http",
+        ATHENA_HTTP_PORT=str(port),
+        ATHENA_BASE_URL=base_url,
+        ATHENA_TOOL_CONCURRENCY=str(args.concurrency)
+    )
+    server = await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(os.path.dirname(SIMULATOR), "main.py"),
+        env=env,
+        stderr=asyncio.subprocess.DEVNULL
+    )
+    try:
+        url = f"http://127.0.0.1:{port}/mcp"
+        async with aiohttp.ClientSession() as session:
+            for _ in range(100):
+                try:
+                    async with session.get(f"http://127.0.0.1:{port}/"):
+                        break
+                except aiohttp.ClientConnectionError:
+                    await asyncio.sleep(0.1)
+
+        async with AsyncExitStack() as stack:
+            sessions = []
+            for _ in range(args.clients):
+                read_stream, write_stream, _ = await stack.enter_async_context(streamablehttp_client(url))
+                client = await stack.enter_async_context(ClientSession(read_stream, write_stream))
+                await client.initialize()
+                sessions.append(client)
+
+            def tool_calls(workload: List[Tuple[str, Dict[str, Any]]]) -> List[Call]:
+                calls = []
+                for index, (name, arguments) in enumerate(workload):
+                    async def call(client=sessions[index % len(sessions)], name=name, arguments=arguments) -> bool:
+                        result = await client.call_tool(name, arguments)
+                        return not result.isError and not result.content[0].text.startswith("Error:")
+                    calls.append((name, call))
+                return calls
+
+            await run_load(tool_calls(build_workload(simulator, args.warmup, args.seed + 1)), args.concurrency)
+            upstream_before = await simulator_requests(base_url)
+            stats = await run_load(tool_calls(build_workload(simulator, args.calls, args.seed)), args.concurrency)
+            stats["upstream_requests"] = await simulator_requests(base_url) - upstream_before
+            stats["clients"] = len(sessions)
+    finally:
+        # SIGTERM exercises the server's graceful shutdown
+        server.terminate()
+        await server.wait()
+
+    print_tool_stats(stats)
+    return stats
+
+async def bench_booking(simulator: AthenaSimulator, base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Race agents for a few hot slots and count upstream requests per successful booking.
+
+    In "client retry" mode the server books only the requested slot and each agent re-queries
+    get_available_slots after a conflict and tries the nearest slot itself, as clients had to
+    before the booking pipeline. In "pipeline" mode one create_appointment call does both.
+    """
+    rng = random.Random(args.seed)
+    tomorrow = date.today() + timedelta(days=1)
+    future = sorted(slot_id for slot_id in simulator.slots if simulator.dates[slot_id] > tomorrow)
+    hot = [simulator.slots[slot_id] for slot_id in rng.sample(future, min(args.hot_slots, len(future)))]
+    requests = []
+    for slot in rng.choices(hot, k=args.bookings):
+        requests.append({
+            "patient_id": rng.choice(simulator.patients)["patientid"],
+            "provider_id": slot["providerid"],
+            "department_id": slot["departmentid"],
+            "appointment_type_id": slot["appointmenttypeid"],
+            "appointment_date": slot["date"],
+            "appointment_time": slot["starttime"],
+        })
+
+    def booked(content: List[Any]) -> bool:
+        return not content[0].text.startswith("Error:")
+
+    results = {}
+    for mode in ("client retry", "pipeline"):
+        # A fresh simulator per mode, so both race for the same open slots
+        process = await start_simulator(args)
+        mcp = AthenaHealthMCP()
+        mcp.base_url = base_url
+        await mcp.start()
+        try:
+            alternatives = mcp.booking_alternatives
+
+            async def client_retry(arguments: Dict[str, Any]) -> bool:
+                arguments = dict(arguments, max_alternatives=0)
+                tried = set()
+                for attempt in range(alternatives + 1):
+                    tried.add((arguments["appointment_date"], arguments["appointment_time"]))
+                    if booked(await mcp.handle_call_tool("create_appointment", arguments)):
+                        return True
+                    if attempt == alternatives:
+                        break
+                    day = datetime.strptime(arguments["appointment_date"], "%m/%d/%Y")
+                    content = await mcp.handle_call_tool("get_available_slots", {
+                        "department_id": arguments["department_id"],
+                        "start_date": arguments["appointment_date"],
+                        "end_date": (day + timedelta(days=2)).strftime("%m/%d/%Y"),
+                    })
+                    if not booked(content):
+                        return False
+                    candidates = [
+                        slot for slot in json.loads(content[0].text)["appointments"]
+                        if slot["providerid"] == arguments["provider_id"]
+                        and slot["appointmenttypeid"] == arguments["appointment_type_id"]
+                        and (slot["date"], slot["starttime"]) not in tried
+                    ]
+                    if not candidates:
+                        return False
+                    arguments = dict(arguments, appointment_date=candidates[0]["date"], appointment_time=candidates[0]["starttime"])
+                return False
+
+            async def pipeline(arguments: Dict[str, Any]) -> bool:
+                return booked(await mcp.handle_call_tool("create_appointment", arguments))
+
+            agent = client_retry if mode == "client retry" else pipeline
+            upstream_before = await simulator_requests(base_url)
+            stats = await run_load([(mode, lambda arguments=arguments: agent(arguments)) for arguments in requests], args.concurrency)
+            stats.pop("by_label")
+            stats["upstream_requests"] = await simulator_requests(base_url) - upstream_before
+            successes = stats["calls"] - stats["errors"]
+            stats["upstream_per_booking"] = round(stats["upstream_requests"] / successes, 2) if successes else None
+        finally:
+            await mcp.close()
+            process.terminate()
+            await process.wait()
+        results[mode] = stats
+        print_stats(mode, stats)
+        print(f"{'':>22}  booked {successes}  upstream requests {stats['upstream_requests']}  per booking {stats['upstream_per_booking']}")
+    return results
+
+async def bench_feed(simulator: AthenaSimulator, base_url: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Book a few appointments per round, then poll the same week in full and as changes since a cursor"""
+    rng = random.Random(args.seed)
+    start = date.today() + timedelta(days=1)
+    end = start + timedelta(days=6)
+    in_range = sorted(slot_id for slot_id in simulator.slots if start <= simulator.dates[slot_id] <= end)
+    bookings = [simulator.slots[slot_id] for slot_id in rng.sample(in_range, min(args.rounds * args.changes, len(in_range)))]
+    query = {"start_date": start.strftime("%m/%d/%Y"), "end_date": end.strftime("%m/%d/%Y")}
+
+    mcp = AthenaHealthMCP()
+    mcp.base_url = base_url
+    # Poll on every read so each round sees the bookings made just before it
+    mcp.feed_poll_interval = 0
+    await mcp.start()
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    sizes: Dict[str, List[int]] = defaultdict(list)
+    errors: Dict[str, int] = defaultdict(int)
+    try:
+        cursor = json.loads((await mcp.handle_call_tool("get_appointment_changes", query))[0].text)["cursor"]
+        for round_index in range(args.rounds):
+            for slot in bookings[round_index * args.changes:(round_index + 1) * args.changes]:
+                await mcp.handle_call_tool("create_appointment", {
+                    "patient_id": rng.choice(simulator.patients)["patientid"],
+                    "provider_id": slot["providerid"],
+                    "department_id": slot["departmentid"],
+                    "appointment_type_id": slot["appointmenttypeid"],
+                    "appointment_date": slot["date"],
+                    "appointment_time": slot["starttime"],
+                    "max_alternatives": 0,
+                })
+            for tool in ("get_appointments", "get_appointment_changes"):
+                arguments = dict(query, cursor=cursor) if tool == "get_appointment_changes" else query
+                started = time.perf_counter()
+                text = (await mcp.handle_call_tool(tool, arguments))[0].text
+                latencies[tool].append(time.perf_counter() - started)
+                sizes[tool].append(len(text.encode()))
+                if text.startswith("Error:"):
+                    errors[tool] += 1
+                elif tool == "get_appointment_changes":
+                    cursor = json.loads(text)["cursor"]
+    finally:
+        await mcp.close()
+
+    results = {}
+    for tool in ("get_appointments", "get_appointment_changes"):
+        stats = summarize(latencies[tool], errors[tool])
+        stats["bytes_per_poll"] = round(sum(sizes[tool]) / max(len(sizes[tool]), 1))
+        results[tool] = stats
+        print_stats(tool, stats)
+        print(f"{'':>22}  {stats['bytes_per_poll']:,d} bytes per poll")
+    return results
+
+def bench_serialization(count: int, repeat: int = 5) -> Dict[str, Any]:
+    """Compare bytes and serialization time of the tool output formats for a large appointment list"""
+    result = {
+        "appointments": [
+            {
+                "appointmentid": str(100000 + i),
+                "appointmentstatus": "f",
+                "appointmenttype": "Office Visit",
+                "appointmenttypeid": "82",
+                "date": "01/15/2024",
+                "starttime": f"{8 + i % 9:02d}:{(i * 15) % 60:02d}",
+                "duration": 15,
+                "departmentid": "1",
+                "providerid": "71",
+                "patientid": str(5000 + i),
+                "patientappointmenttypename": "Office Visit",
+                "chargeentrynotrequired": False,
+                "frozen": "false",
+            }
+            for i in range(count)
+        ],
+        "totalcount": count,
+    }
+    variants = [
+        ("json indent=2", lambda: json.dumps(result, indent=2)),
+        ("compact", lambda: serialize_result(result, {})),
+        ("compact + fields", lambda: serialize_result(result, {"fields": ["appointmentid", "date", "starttime"]})),
+        ("table", lambda: serialize_result(result, {"format": "table"})),
+    ]
+    results = {}
+    print(f"\nserializing {count} appointments:")
+    for label, serialize in variants:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            text = serialize()
+        elapsed = (time.perf_counter() - started) / repeat
+        results[label] = {"bytes": len(text.encode()), "ms": round(elapsed * 1000, 3)}
+        print(f"{label:>22}: {len(text.encode()):10,d} bytes  {elapsed * 1000:7.2f} ms")
+    return results
+
+def print_tool_stats(stats: Dict[str, Any]) -> None:
+    print_stats("all tools", stats)
+    for label, tool_stats in stats["by_label"].items():
+        print_stats(label, tool_stats)
+    details = [f"upstream requests {stats['upstream_requests']}"]
+    if "clients" in stats:
+        details.append(f"clients {stats['clients']}")
+    if stats.get("max_rss_mb") is not None:
+        details.append(f"max RSS {stats['max_rss_mb']} MB")
+    if "traced_peak_mb" in stats:
+        details.append(f"traced peak {stats['traced_peak_mb']} MB")
+    print(f"{'':>22}  " + "  ".join(details))
+
+def print_stats(label: str, stats: Dict[str, Any]) -> None:
+    throughput = f"{stats['calls_per_sec']:8.1f} calls/s  " if "calls_per_sec" in stats else " " * 18
+    print(
+        f"{label:>22}: {throughput}p50 {stats['p50_ms']:7.2f} ms  p95 {stats['p95_ms']:7.2f} ms  "
+        f"p99 {stats['p99_ms']:7.2f} ms  calls {stats['calls']}  errors {stats['errors']}"
+    )
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print the change in headline metrics relative to a saved run"""
+    if baseline.get("config", {}).get("workload") != results["config"]["workload"]:
+        print("\nwarning: baseline was run with different workload settings")
+    print("\nchange vs baseline:")
+    for suite, suite_results in results["results"].items():
+        old_suite = baseline.get("results", {}).get(suite, {})
+        rows = [("", suite_results, old_suite)] if "p50_ms" in suite_results else [
+            (label, stats, old_suite.get(label, {})) for label, stats in suite_results.items()
+        ]
+        for label, new, old in rows:
+            changes = [
+                f"{metric} {(new[metric] - old[metric]) / old[metric] * 100:+.1f}%"
+                for metric in ("calls_per_sec", "p50_ms", "p95_ms", "p99_ms", "ms", "bytes", "bytes_per_poll")
+                if metric in new and old.get(metric)
+            ]
+            if changes:
+                print(f"{(suite + ' ' + label).strip():>30}: {'  '.join(changes)}")
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", choices=["all", "pool", "tools", "http", "booking", "feed", "serialization"], default="all")
+    parser.add_argument("--calls", type=int, default=2000, help="calls per load suite")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=200, help="tool calls run before measuring")
+    parser.add_argument("--clients", type=int, default=10, help="MCP client sessions in the http suite")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0, help="simulated Athena latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- seconds around --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests the simulator fails with 503")
+    parser.add_argument("--page-size", type=int, default=100, help="maximum records per simulator page")
+    parser.add_argument("--patients", type=int, default=2000, help="patients in the simulator")
+    parser.add_argument("--bookings", type=int, default=100, help="booking agents in the booking suite")
+    parser.add_argument("--hot-slots", type=int, default=20, help="slots the booking agents race for")
+    parser.add_argument("--rounds", type=int, default=20, help="polls per tool in the feed suite")
+    parser.add_argument("--changes", type=int, default=5, help="bookings between polls in the feed suite")
+    parser.add_argument("--records", type=int, default=10000, help="appointments in the serialization benchmark")
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peak (slows the run)")
+    parser.add_argument("--output", help="write results as JSON to this file")
+    parser.add_argument("--baseline", help="compare against results saved with --output")
+    args = parser.parse_args()
+
+    workload = {
+        key: getattr(args, key)
+        for key in ("suite", "calls", "concurrency", "warmup", "clients", "seed", "latency", "jitter",
+                    "error_rate", "page_size", "patients", "bookings", "hot_slots", "rounds", "changes", "records")
+    }
+    results: Dict[str, Any] = {
+        "config": {
+            "workload": workload,
+            "python": platform.python_version(),
+            "aiohttp": aiohttp.__version__,
+            "platform": platform.platform(),
+        },
+        "results": {},
+    }
+
+    # Same seed as the simulator process, so workloads refer to slots and patients it has
+    simulator = AthenaSimulator(seed=args.seed, patients=args.patients)
+    base_url = f"http://127.0.0.1:{args.port}"
+    for suite, bench in (("pool", bench_pool), ("tools", bench_tools), ("http", bench_http), ("feed", bench_feed)):
+        if args.suite not in ("all", suite):
+            continue
+        # A fresh simulator per suite, so bookings made by one suite do not affect the next
+        process = await start_simulator(args)
+        try:
+            print(f"\n{suite}:")
+            results["results"][suite] = await bench(simulator, base_url, args)
+        finally:
+            process.terminate()
+            await process.wait()
+
+    if args.suite in ("all", "booking"):
+        print("\nbooking:")
+        results["results"]["booking"] = await bench_booking(simulator, base_url, args)
+
+    if args.suite in ("all", "serialization"):
+        results["results"]["serialization"] = bench_serialization(args.records)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            compare(results, json.load(f))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\nresults written to {args.output}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,14 +1,25 @@
 #!/usr/bin/env python3
 
 import asyncio
+import hmac
 import os
 import json
 import logging
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional
+import random
+import re
+import sqlite3
+import unicodedata
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager, closing
+from bisect import bisect_left
+from datetime import date, datetime, time as dt_time, timedelta, timezone
+from email.utils import parsedate_to_datetime
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
 import aiohttp
+from aiohttp import web
 import base64
-from urllib.parse import urlencode
+from urllib.parse import parse_qs, urlencode, urlparse
 from dotenv import load_dotenv
 from mcp.server.models import InitializationOptions
 from mcp.server import NotificationOptions, Server
@@ -17,39 +28,2415 @@ from mcp.types import (
 )
 import mcp.types as types
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 load_dotenv()
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("athena-health-mcp")
 
+class AthenaAPIError(Exception):
+    """Raised when Athena Health returns an unsuccessful response"""
+    
+    def __init__(self, status: int, error_text: str, retry_after: Optional[float] = None):
+        super().__init__(f"API request failed: {status} - {error_text}")
+        self.status = status
+        self.error_text = error_text
+        self.retry_after = retry_after
+
+class CircuitOpenError(Exception):
+    """Raised without contacting Athena while an endpoint's circuit breaker is open"""
+
+class SlotConflictError(Exception):
+    """Raised when a requested slot and every alternative tried were already taken"""
+
+class InvalidArgumentsError(ValueError):
+    """Raised before any request is sent when tool arguments do not match the tool's input schema"""
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header given either as seconds or as an HTTP date"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max((retry_at - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+# (endpoint, sorted (param, value) pairs)
+CacheKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+def make_request_key(endpoint: str, params: Optional[Dict[str, Any]] = None) -> CacheKey:
+    """Build a request key from the endpoint and its params, ignoring param order and value types"""
+    normalized = tuple(sorted(
+        (str(k), str(v)) for k, v in (params or {}).items() if v is not None
+    ))
+    return endpoint, normalized
+
+def practice_path(practice_id: str, endpoint: str) -> str:
+    """Qualify an endpoint with its practice, e.g. /195900/departments, so cached responses never cross practices"""
+    return f"/{practice_id}{endpoint}"
+
+def split_practice_path(path: str) -> Optional[Tuple[str, str]]:
+    """Split a practice-qualified path back into (practice ID, endpoint)"""
+    match = re.fullmatch(r"/(\d+)(/.*)", path)
+    return (match.group(1), match.group(2)) if match else None
+
+def parse_practice_credentials(spec: str) -> Dict[str, Tuple[str, str]]:
+    """Parse a comma-separated list of practice=client_id:client_secret entries"""
+    credentials = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        practice_id, _, pair = item.partition("=")
+        client_id, _, client_secret = pair.partition(":")
+        if not (practice_id.strip() and client_id.strip() and client_secret.strip()):
+            logger.error(f"Ignoring invalid practice credentials entry for {practice_id.strip()!r}")
+            continue
+        credentials[practice_id.strip()] = (client_id.strip(), client_secret.strip())
+    return credentials
+
+def parse_cache_ttls(spec: str, defaults: Dict[str, float]) -> Dict[str, float]:
+    """Parse a comma-separated list of endpoint=seconds pairs on top of the default TTLs"""
+    ttls = dict(defaults)
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        endpoint, _, seconds = item.partition("=")
+        try:
+            ttls[endpoint.strip()] = float(seconds)
+        except ValueError:
+            logger.error(f"Ignoring invalid cache TTL entry: {item!r}")
+    # A TTL of zero or less disables caching for that endpoint
+    return {endpoint: ttl for endpoint, ttl in ttls.items() if ttl > 0}
+
+# Output options accepted by every tool alongside its own arguments
+OUTPUT_PROPERTIES = {
+    "fields": {
+        "type": "array",
+        "items": {"type": "string"},
+        "description": "Optional list of fields to keep in each returned record, e.g. [\"appointmentid\", \"date\"]"
+    },
+    "format": {
+        "type": "string",
+        "enum": ["json", "table", "pretty"],
+        "description": "Output format: compact json (default), table (columns plus rows for lists) or pretty (indented json)"
+    }
+}
+
+# Accepted by every tool to address a practice other than the server's default
+PRACTICE_PROPERTIES = {
+    "practice_id": {
+        "type": "string",
+        "description": "Athena practice ID (default: the server's ATHENA_PRACTICE_ID)"
+    }
+}
+
+# Athena query and body parameter for each tool argument that is passed through unchanged
+ATHENA_PARAM_NAMES = {
+    "start_date": "startdate",
+    "end_date": "enddate",
+    "provider_id": "providerid",
+    "department_id": "departmentid",
+    "appointment_date": "appointmentdate",
+    "appointment_time": "appointmenttime",
+    "reason_for_visit": "reasonforvisit",
+    "cancellation_reason": "cancellationreason",
+    "notes": "notes",
+    "specialty": "specialty",
+    "first_name": "firstname",
+    "last_name": "lastname",
+    "date_of_birth": "dob",
+    "phone": "homephone",
+    "email": "email"
+}
+
+JSON_TYPES: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda value: isinstance(value, str),
+    "integer": lambda value: isinstance(value, int) and not isinstance(value, bool),
+    "number": lambda value: isinstance(value, (int, float)) and not isinstance(value, bool),
+    "boolean": lambda value: isinstance(value, bool),
+    "array": lambda value: isinstance(value, list),
+    "object": lambda value: isinstance(value, dict)
+}
+
+def compile_check(path: str, schema: Dict[str, Any]) -> Callable[[Any], None]:
+    """Compile a JSON schema into a function raising InvalidArgumentsError for values that do not match.
+    
+    Supports the subset the tool schemas use: type, enum, pattern, format "date" (YYYY-MM-DD or
+    MM/DD/YYYY), items, properties and required. For objects with start_date and end_date
+    properties, an end_date before start_date is rejected too.
+    """
+    checks: List[Callable[[Any], None]] = []
+    schema_type = schema.get("type")
+    if schema_type is not None:
+        is_type = JSON_TYPES[schema_type]
+        def check_type(value: Any) -> None:
+            if not is_type(value):
+                raise InvalidArgumentsError(f"{path or 'arguments'} must be of type {schema_type}")
+        checks.append(check_type)
+    
+    if "enum" in schema:
+        allowed = frozenset(schema["enum"])
+        def check_enum(value: Any) -> None:
+            if value not in allowed:
+                raise InvalidArgumentsError(f"{path} must be one of {', '.join(map(str, schema['enum']))}")
+        checks.append(check_enum)
+    
+    if "pattern" in schema:
+        pattern = re.compile(schema["pattern"])
+        def check_pattern(value: Any) -> None:
+            if not pattern.search(value):
+                raise InvalidArgumentsError(f"{path} must match {schema['pattern']}")
+        checks.append(check_pattern)
+    
+    if schema.get("format") == "date":
+        def check_date(value: Any) -> None:
+            if parse_date(value) is None:
+                raise InvalidArgumentsError(f"{path} must be a date in YYYY-MM-DD or MM/DD/YYYY format")
+        checks.append(check_date)
+    
+    if "items" in schema:
+        item_path = f"{path}[]"
+        check_item = compile_check(item_path, schema["items"])
+        def check_items(value: List[Any]) -> None:
+            for index, item in enumerate(value):
+                try:
+                    check_item(item)
+                except InvalidArgumentsError as e:
+                    raise InvalidArgumentsError(str(e).replace(item_path, f"{path}[{index}]", 1)) from None
+        checks.append(check_items)
+    
+    if "properties" in schema:
+        prefix = f"{path}." if path else ""
+        properties = {name: compile_check(prefix + name, prop) for name, prop in schema["properties"].items()}
+        required = tuple(schema.get("required", ()))
+        has_range = "start_date" in properties and "end_date" in properties
+        def check_properties(value: Dict[str, Any]) -> None:
+            for name in required:
+                if name not in value:
+                    raise InvalidArgumentsError(f"{prefix}{name} is required")
+            for name, item in value.items():
+                check = properties.get(name)
+                if check is not None:
+                    check(item)
+            if has_range and "start_date" in value and "end_date" in value:
+                start, end = parse_date(value["start_date"]), parse_date(value["end_date"])
+                if start is not None and end is not None and end[0] < start[0]:
+                    raise InvalidArgumentsError(f"{prefix}end_date is before {prefix}start_date")
+        checks.append(check_properties)
+    
+    if len(checks) == 1:
+        return checks[0]
+    def check_all(value: Any) -> None:
+        # Later checks assume earlier ones passed, e.g. the pattern check that the value is a string
+        for check in checks:
+            check(value)
+    return check_all
+
+class ToolSpec:
+    """A tool's handler with the argument validator and Athena parameter mapping compiled from its input schema"""
+    
+    __slots__ = ("name", "handler", "check", "params")
+    
+    def __init__(self, tool: Tool, handler: Callable[[Dict[str, Any]], Awaitable[Any]]):
+        self.name = tool.name
+        self.handler = handler
+        self.check = compile_check("", tool.inputSchema)
+        self.params = tuple(
+            (name, ATHENA_PARAM_NAMES[name]) for name in tool.inputSchema.get("properties", {}) if name in ATHENA_PARAM_NAMES
+        )
+
+    def validate(self, arguments: Dict[str, Any]) -> None:
+        try:
+            self.check(arguments)
+        except InvalidArgumentsError as e:
+            raise InvalidArgumentsError(f"Invalid arguments for {self.name}: {e}") from None
+
+    def athena_params(self, arguments: Dict[str, Any]) -> Dict[str, Any]:
+        """Map the tool's snake_case arguments to Athena parameter names"""
+        return {param: arguments[name] for name, param in self.params if name in arguments}
+
+def project_fields(value: Any, fields: List[str]) -> Any:
+    """Keep only the given fields in each record of a response.
+    
+    Records are the dicts inside top-level lists; a response without lists is treated as a
+    single record. Other top-level keys such as totalcount are kept. Returns new objects so
+    cached responses are never modified.
+    """
+    if isinstance(value, list):
+        return [
+            {k: item[k] for k in fields if k in item} if isinstance(item, dict) else item
+            for item in value
+        ]
+    if isinstance(value, dict):
+        if not any(isinstance(v, list) for v in value.values()):
+            return {k: value[k] for k in fields if k in value}
+        return {k: project_fields(v, fields) if isinstance(v, list) else v for k, v in value.items()}
+    return value
+
+def to_table(value: Any) -> Any:
+    """Convert lists of records into {"columns": [...], "rows": [[...]]} so field names appear once"""
+    if isinstance(value, dict):
+        return {k: to_table(v) if isinstance(v, list) else v for k, v in value.items()}
+    if not isinstance(value, list) or not all(isinstance(item, dict) for item in value):
+        return value
+    
+    columns: Dict[str, None] = {}
+    for item in value:
+        for key in item:
+            columns.setdefault(key, None)
+    return {
+        "columns": list(columns),
+        "rows": [[item.get(column) for column in columns] for item in value]
+    }
+
+def dumps_json(value: Any, pretty: bool = False) -> str:
+    """Serialize to JSON, using orjson when it is installed"""
+    if pretty:
+        return json.dumps(value, indent=2)
+    if orjson is not None:
+        try:
+            return orjson.dumps(value, default=str).decode()
+        except TypeError:
+            # e.g. integers beyond 64 bits, which the stdlib encoder handles
+            pass
+    return json.dumps(value, separators=(",", ":"), default=str)
+
+def serialize_result(result: Any, arguments: Dict[str, Any]) -> str:
+    """Apply the caller's field projection and output format to a tool result"""
+    if isinstance(result, str):
+        # Already-formatted text such as the Prometheus metrics exposition
+        return result
+    fields = arguments.get("fields")
+    if fields:
+        result = project_fields(result, fields)
+    
+    output_format = arguments.get("format", "json")
+    if output_format == "table":
+        result = to_table(result)
+    return dumps_json(result, pretty=output_format == "pretty")
+
+def escape_label_value(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_labels(labels: Tuple[Tuple[str, str], ...], extra: str = "") -> str:
+    parts = [f'{name}="{escape_label_value(value)}"' for name, value in labels]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+class MetricsRegistry:
+    """Counters and latency histograms rendered in the Prometheus text exposition format"""
+    
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+    
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.help: Dict[str, str] = {}
+        # name -> labels -> [per-bucket counts..., sum, count]
+        self.histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], List[float]]] = {}
+        self.counters: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+        # name -> callback returning (labels, value) pairs, evaluated at render time
+        self.gauges: Dict[str, Callable[[], List[Tuple[Dict[str, Any], float]]]] = {}
+
+    def histogram(self, name: str, help_text: str) -> None:
+        self.help[name] = help_text
+        self.histograms.setdefault(name, {})
+
+    def counter(self, name: str, help_text: str) -> None:
+        self.help[name] = help_text
+        self.counters.setdefault(name, {})
+
+    def gauge(self, name: str, help_text: str, collect: Callable[[], List[Tuple[Dict[str, Any], float]]]) -> None:
+        self.help[name] = help_text
+        self.gauges[name] = collect
+
+    def observe(self, name: str, value: float, **labels: Any) -> None:
+        """Record one observation in a histogram"""
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        series = self.histograms[name].get(key)
+        if series is None:
+            series = self.histograms[name][key] = [0.0] * (len(self.buckets) + 2)
+        index = bisect_left(self.buckets, value)
+        if index < len(self.buckets):
+            series[index] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def inc(self, name: str, amount: float = 1, **labels: Any) -> None:
+        """Increase a counter"""
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        self.counters[name][key] = self.counters[name].get(key, 0) + amount
+
+    def render(self) -> str:
+        """Return every metric in Prometheus text format"""
+        lines = []
+        for name, series in self.histograms.items():
+            lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, values in series.items():
+                cumulative = 0.0
+                for bound, count in zip(self.buckets, values):
+                    cumulative += count
+                    bucket_labels = format_labels(labels, 'le="%s"' % bound)
+                    lines.append(f"{name}_bucket{bucket_labels} {cumulative:g}")
+                bucket_labels = format_labels(labels, 'le="+Inf"')
+                lines.append(f"{name}_bucket{bucket_labels} {values[-1]:g}")
+                lines.append(f"{name}_sum{format_labels(labels)} {values[-2]:.6f}")
+                lines.append(f"{name}_count{format_labels(labels)} {values[-1]:g}")
+        for name, series in self.counters.items():
+            lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{format_labels(labels)} {value:g}")
+        for name, collect in self.gauges.items():
+            lines.append(f"# HELP {name} {self.help[name]}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in collect():
+                lines.append(f"{name}{format_labels(tuple(sorted((k, str(v)) for k, v in labels.items())))} {value:g}")
+        return "\n".join(lines) + "\n"
+
+class TokenManager:
+    """Caches an OAuth access token, coalescing concurrent refreshes and renewing it in the background"""
+    
+    def __init__(
+        self,
+        fetch_token: Callable[[], Awaitable[Tuple[str, float]]],
+        refresh_margin: float = 300,
+        expiry_buffer: float = 60,
+        retry_interval: float = 5
+    ):
+        self.fetch_token = fetch_token
+        # Renew this many seconds before expiry so callers never see an expired token
+        self.refresh_margin = refresh_margin
+        # Stop handing out a token this many seconds before Athena expires it
+        self.expiry_buffer = expiry_buffer
+        self.retry_interval = retry_interval
+        
+        self.access_token: Optional[str] = None
+        self.token_expiry = 0.0
+        self.refresh_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._renewal_task: Optional[asyncio.Task] = None
+
+    def is_valid(self) -> bool:
+        """Return True if the cached token can still be used"""
+        return self.access_token is not None and time.monotonic() < self.token_expiry
+
+    async def get_token(self) -> str:
+        """Return a valid access token, waiting on the token endpoint only when none is usable"""
+        if self.is_valid():
+            # Renew early without blocking the caller if the background task has not done so yet
+            if time.monotonic() >= self.refresh_at:
+                self._start_refresh()
+            return self.access_token
+        return await self.refresh()
+
+    async def refresh(self) -> str:
+        """Fetch a new token, sharing a single in-flight request between all concurrent callers"""
+        # Shield so a cancelled caller does not abort the refresh other callers are waiting on
+        return await asyncio.shield(self._start_refresh())
+
+    def invalidate(self, token: Optional[str] = None) -> None:
+        """Drop the cached token, unless it has already been replaced by a newer one"""
+        if token is None or token == self.access_token:
+            self.access_token = None
+            self.token_expiry = 0.0
+            self.refresh_at = 0.0
+
+    def start(self) -> None:
+        """Start renewing the token in the background ahead of expiry"""
+        if self._renewal_task is None or self._renewal_task.done():
+            self._renewal_task = asyncio.create_task(self._renew_forever())
+
+    async def stop(self) -> None:
+        """Stop background renewal and any in-flight refresh"""
+        for task in (self._renewal_task, self._refresh_task):
+            if task is not None and not task.done():
+                task.cancel()
+                try:
+                    await task
+                except (asyncio.CancelledError, Exception):
+                    pass
+        self._renewal_task = None
+        self._refresh_task = None
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._do_refresh())
+            self._refresh_task.add_done_callback(self._log_refresh_failure)
+        return self._refresh_task
+
+    @staticmethod
+    def _log_refresh_failure(task: asyncio.Task) -> None:
+        # Retrieve the exception so early renewals nobody awaited do not warn at shutdown
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Token refresh failed: {task.exception()}")
+
+    async def _do_refresh(self) -> str:
+        token, expires_in = await self.fetch_token()
+        now = time.monotonic()
+        self.access_token = token
+        self.token_expiry = now + max(expires_in - self.expiry_buffer, 0)
+        self.refresh_at = now + max(expires_in - self.refresh_margin, expires_in / 2)
+        return token
+
+    async def _renew_forever(self) -> None:
+        while True:
+            await asyncio.sleep(max(self.refresh_at - time.monotonic(), 0))
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Background token renewal failed: {e}")
+                await asyncio.sleep(self.retry_interval)
+
+class CacheEntry:
+    """A cached API response with its freshness deadlines"""
+    
+    __slots__ = ("value", "fresh_until", "stale_until")
+    
+    def __init__(self, value: Any, fresh_until: float, stale_until: float):
+        self.value = value
+        self.fresh_until = fresh_until
+        self.stale_until = stale_until
+
+class ResponseCache:
+    """TTL + LRU cache for GET responses with stale-while-revalidate"""
+    
+    def __init__(self, max_entries: int = 1000, stale_ttl: float = 600):
+        self.max_entries = max_entries
+        # How long an expired entry may still be served while it is refreshed in the background
+        self.stale_ttl = stale_ttl
+        self._entries: "OrderedDict[CacheKey, CacheEntry]" = OrderedDict()
+        self._revalidating: Dict[CacheKey, asyncio.Task] = {}
+        
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def get_or_fetch(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        ttl: float,
+        fetch: Callable[[], Awaitable[Any]],
+        on_outcome: Optional[Callable[[str], None]] = None
+    ) -> Any:
+        """Return a cached response, fetching it on a miss and revalidating stale entries in the background.
+        
+        Cached responses are shared between callers and must not be mutated. If on_outcome
+        is given it is called with "hit", "stale" or "miss" before the response is returned.
+        """
+        key = make_request_key(endpoint, params)
+        entry = self._entries.get(key)
+        now = time.monotonic()
+        
+        if entry is not None:
+            if now < entry.fresh_until:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                if on_outcome is not None:
+                    on_outcome("hit")
+                return entry.value
+            if now < entry.stale_until:
+                self.stale_hits += 1
+                self._entries.move_to_end(key)
+                self._revalidate(key, ttl, fetch)
+                if on_outcome is not None:
+                    on_outcome("stale")
+                return entry.value
+        
+        self.misses += 1
+        if on_outcome is not None:
+            on_outcome("miss")
+        value = await fetch()
+        self.set(key, value, ttl)
+        return value
+
+    def peek(self, key: CacheKey) -> Optional[Any]:
+        """Return a cached response even if it has expired, without counting a lookup"""
+        entry = self._entries.get(key)
+        return entry.value if entry is not None else None
+
+    def set(self, key: CacheKey, value: Any, ttl: float, age: float = 0.0) -> None:
+        """Store a response that is `age` seconds old, evicting the least recently used entries beyond the size bound"""
+        fresh_until = time.monotonic() + ttl - age
+        self._entries[key] = CacheEntry(value, fresh_until, fresh_until + self.stale_ttl)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def invalidate(self, endpoint: Optional[str] = None) -> int:
+        """Drop cached responses for an endpoint and the paths below it, or everything if no endpoint is given"""
+        if endpoint is None:
+            removed = len(self._entries)
+            self._entries.clear()
+            return removed
+        
+        prefix = endpoint + "/"
+        keys = [key for key in self._entries if key[0] == endpoint or key[0].startswith(prefix)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit, miss and eviction counters"""
+        lookups = self.hits + self.stale_hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "stale_hits": self.stale_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": round((self.hits + self.stale_hits) / lookups, 4) if lookups else 0.0
+        }
+
+    async def close(self) -> None:
+        """Cancel background revalidations still in flight"""
+        tasks = list(self._revalidating.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._revalidating.clear()
+
+    def _revalidate(self, key: CacheKey, ttl: float, fetch: Callable[[], Awaitable[Any]]) -> None:
+        if key in self._revalidating:
+            return
+        
+        async def refresh() -> None:
+            try:
+                self.set(key, await fetch(), ttl)
+            except Exception as e:
+                logger.warning(f"Background cache revalidation failed for {key[0]}: {e}")
+            finally:
+                self._revalidating.pop(key, None)
+        
+        self._revalidating[key] = asyncio.create_task(refresh())
+
+class DiskCache:
+    """SQLite-backed store for reference-data responses, shared by every server process using the same directory.
+    
+    WAL journaling lets concurrent processes read while one writes. Queries run in the default
+    executor so the event loop never blocks on disk.
+    """
+    
+    def __init__(self, directory: str, filename: str = "reference_cache.sqlite3"):
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, filename)
+        # ETag of each stored response, for conditional revalidation
+        self.etags: Dict[CacheKey, str] = {}
+        
+        with closing(self._connect()) as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "endpoint TEXT NOT NULL, params TEXT NOT NULL, body TEXT NOT NULL, "
+                "etag TEXT, fetched_at REAL NOT NULL, PRIMARY KEY (endpoint, params))"
+            )
+            conn.commit()
+
+    async def load(self) -> List[Tuple[CacheKey, Any, float]]:
+        """Return every stored response as (key, value, fetched_at wall-clock time)"""
+        rows = await asyncio.get_running_loop().run_in_executor(None, self._load)
+        entries = []
+        for endpoint, params, body, etag, fetched_at in rows:
+            try:
+                key = (endpoint, tuple(tuple(pair) for pair in json.loads(params)))
+                value = json.loads(body)
+            except (TypeError, ValueError):
+                continue
+            if etag:
+                self.etags[key] = etag
+            entries.append((key, value, fetched_at))
+        return entries
+
+    async def store(self, key: CacheKey, value: Any, etag: Optional[str]) -> None:
+        """Persist a freshly fetched or revalidated response"""
+        if etag:
+            self.etags[key] = etag
+        else:
+            self.etags.pop(key, None)
+        row = (key[0], json.dumps(key[1]), json.dumps(value), etag, time.time())
+        try:
+            await asyncio.get_running_loop().run_in_executor(None, self._store, row)
+        except sqlite3.Error as e:
+            logger.warning(f"Disk cache write failed for {key[0]}: {e}")
+
+    async def delete(self, endpoint: Optional[str] = None) -> None:
+        """Remove stored responses for an endpoint and the paths below it, or all of them"""
+        if endpoint is None:
+            self.etags.clear()
+        else:
+            prefix = endpoint + "/"
+            for key in [key for key in self.etags if key[0] == endpoint or key[0].startswith(prefix)]:
+                del self.etags[key]
+        await asyncio.get_running_loop().run_in_executor(None, self._delete, endpoint)
+
+    def _connect(self) -> sqlite3.Connection:
+        # Wait for other processes' write locks instead of failing immediately
+        return sqlite3.connect(self.path, timeout=5)
+
+    def _load(self) -> List[Tuple[str, str, str, Optional[str], float]]:
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT endpoint, params, body, etag, fetched_at FROM responses").fetchall()
+
+    def _delete(self, endpoint: Optional[str]) -> None:
+        with closing(self._connect()) as conn:
+            if endpoint is None:
+                conn.execute("DELETE FROM responses")
+            else:
+                conn.execute(
+                    "DELETE FROM responses WHERE endpoint = ? OR substr(endpoint, 1, ?) = ?",
+                    (endpoint, len(endpoint) + 1, endpoint + "/")
+                )
+            conn.commit()
+
+    def _store(self, row: Tuple[str, str, str, Optional[str], float]) -> None:
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (endpoint, params, body, etag, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                row
+            )
+            conn.commit()
+
+def normalize_name(value: Any) -> str:
+    """Lowercase a name and strip accents, punctuation and spaces"""
+    decomposed = unicodedata.normalize("NFKD", str(value or ""))
+    return "".join(c for c in decomposed if c.isalpha()).lower()
+
+def normalize_phone(value: Any) -> str:
+    """Reduce a phone number to its last ten digits"""
+    return re.sub(r"\D", "", str(value or ""))[-10:]
+
+def normalize_dob(value: Any) -> str:
+    """Normalize a date of birth to YYYY-MM-DD, or return an empty string if it cannot be parsed"""
+    parsed = parse_date(str(value or ""))
+    return parsed[0].isoformat() if parsed else ""
+
+def soundex(name: str) -> str:
+    """American Soundex code of a normalized name, so spelling variants like Smith/Smyth collide"""
+    if not name:
+        return ""
+    codes = {c: str(digit) for digit, letters in enumerate(("bfpv", "cgjkqsxz", "dt", "l", "mn", "r"), 1) for c in letters}
+    result = name[0].upper()
+    previous = codes.get(name[0], "")
+    for c in name[1:]:
+        code = codes.get(c, "")
+        if code and code != previous:
+            result += code
+        if c not in "hw":
+            previous = code
+    return (result + "000")[:4]
+
+def trigrams(name: str) -> set:
+    padded = f" {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def name_similarity(query: str, candidate: str) -> float:
+    """Similarity in [0, 1] from trigram overlap, with a floor for names that sound alike"""
+    if not query or not candidate:
+        return 0.0
+    if query == candidate:
+        return 1.0
+    query_grams, candidate_grams = trigrams(query), trigrams(candidate)
+    similarity = len(query_grams & candidate_grams) / len(query_grams | candidate_grams)
+    if soundex(query) == soundex(candidate):
+        similarity = max(similarity, 0.7)
+    return similarity
+
+class PatientIndex:
+    """Bounded in-memory index of patient demographics already fetched from Athena, for fuzzy lookups.
+    
+    Blocking keys (phone, date of birth, email and Soundex codes of each name) map to patient
+    IDs. Candidates sharing the most keys with the query are scored with trigram name
+    similarity and ranked. The least recently seen patients are evicted beyond max_patients.
+    """
+    
+    def __init__(self, max_patients: int = 10000, min_score: float = 0.75, max_candidates: int = 50):
+        self.max_patients = max_patients
+        self.min_score = min_score
+        self.max_candidates = max_candidates
+        # patient ID -> (record, normalized first name, normalized last name, DOB, phones, email)
+        self.patients: "OrderedDict[str, Tuple[Dict[str, Any], str, str, str, Tuple[str, ...], str]]" = OrderedDict()
+        self.postings: Dict[str, set] = {}
+        
+        self.lookups = 0
+        self.hits = 0
+        self.evictions = 0
+
+    def add(self, patient: Dict[str, Any]) -> None:
+        """Index or refresh one patient record"""
+        patient_id = str(patient.get("patientid", ""))
+        if not patient_id or self.max_patients <= 0:
+            return
+        if patient_id in self.patients:
+            self._remove(patient_id)
+        
+        entry = (
+            patient,
+            normalize_name(patient.get("firstname")),
+            normalize_name(patient.get("lastname")),
+            normalize_dob(patient.get("dob")),
+            tuple(p for p in (normalize_phone(patient.get(f)) for f in ("homephone", "mobilephone", "workphone")) if p),
+            str(patient.get("email") or "").strip().lower()
+        )
+        self.patients[patient_id] = entry
+        for key in self._keys(*entry[1:]):
+            self.postings.setdefault(key, set()).add(patient_id)
+        
+        while len(self.patients) > self.max_patients:
+            self._remove(next(iter(self.patients)))
+            self.evictions += 1
+
+    def search(
+        self,
+        first_name: Optional[str] = None,
+        last_name: Optional[str] = None,
+        date_of_birth: Optional[str] = None,
+        phone: Optional[str] = None,
+        email: Optional[str] = None,
+        limit: int = 10
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """Return (score, patient) pairs scoring at least min_score, best first"""
+        self.lookups += 1
+        first = normalize_name(first_name)
+        last = normalize_name(last_name)
+        dob = normalize_dob(date_of_birth) if date_of_birth else ""
+        phone = normalize_phone(phone)
+        email = (email or "").strip().lower()
+        
+        postings = [self.postings.get(key, set()) for key in self._keys(first, last, dob, (phone,) if phone else (), email)]
+        # Patients matching every key are the best candidates; if a typo leaves none, fall back to
+        # the patients sharing the most keys with the query
+        candidates = list(set.intersection(*postings)) if postings else []
+        if not candidates:
+            hits: Counter = Counter()
+            for posting in postings:
+                hits.update(posting)
+            candidates = [patient_id for patient_id, _ in hits.most_common(self.max_candidates)]
+        
+        scored = []
+        for patient_id in candidates[:self.max_candidates]:
+            _, p_first, p_last, p_dob, p_phones, p_email = self.patients[patient_id]
+            # Average similarity over the criteria the caller supplied
+            similarities = []
+            if first:
+                similarities.append(name_similarity(first, p_first))
+            if last:
+                similarities.append(name_similarity(last, p_last))
+            if dob:
+                similarities.append(1.0 if dob == p_dob else 0.0)
+            if phone:
+                similarities.append(1.0 if phone in p_phones else 0.0)
+            if email:
+                similarities.append(1.0 if email == p_email else 0.0)
+            score = sum(similarities) / len(similarities)
+            if score >= self.min_score:
+                scored.append((score, self.patients[patient_id][0]))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        
+        if scored:
+            self.hits += 1
+        return scored[:limit]
+
+    def strong_match(
+        self,
+        patient: Dict[str, Any],
+        date_of_birth: Optional[str] = None,
+        phone: Optional[str] = None,
+        email: Optional[str] = None
+    ) -> bool:
+        """Return True if the query gives a phone, date of birth or email and the patient matches each one exactly"""
+        entry = self.patients.get(str(patient.get("patientid", "")))
+        if entry is None or not (date_of_birth or phone or email):
+            return False
+        _, _, _, p_dob, p_phones, p_email = entry
+        return (
+            (not date_of_birth or normalize_dob(date_of_birth) == p_dob)
+            and (not phone or normalize_phone(phone) in p_phones)
+            and (not email or email.strip().lower() == p_email)
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "patients": len(self.patients),
+            "max_patients": self.max_patients,
+            "keys": len(self.postings),
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "evictions": self.evictions
+        }
+
+    @staticmethod
+    def _keys(first: str, last: str, dob: str, phones: Tuple[str, ...], email: str) -> List[str]:
+        keys = [f"phone:{phone}" for phone in phones]
+        if first:
+            keys.append(f"first:{soundex(first)}")
+        if last:
+            keys.append(f"last:{soundex(last)}")
+        if dob:
+            keys.append(f"dob:{dob}")
+        if email:
+            keys.append(f"email:{email}")
+        return keys
+
+    def _remove(self, patient_id: str) -> None:
+        entry = self.patients.pop(patient_id, None)
+        if entry is None:
+            return
+        for key in self._keys(*entry[1:]):
+            posting = self.postings.get(key)
+            if posting is not None:
+                posting.discard(patient_id)
+                if not posting:
+                    del self.postings[key]
+
+class RequestCoalescer:
+    """Shares one upstream request between concurrent identical GETs"""
+    
+    def __init__(self):
+        self._in_flight: Dict[CacheKey, asyncio.Task] = {}
+        self.requests = 0
+        self.coalesced = 0
+
+    async def run(
+        self,
+        endpoint: str,
+        params: Optional[Dict[str, Any]],
+        fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """Await the in-flight request for this endpoint and params, starting one if there is none.
+        
+        The parsed response is shared between callers and must not be mutated.
+        """
+        key = make_request_key(endpoint, params)
+        task = self._in_flight.get(key)
+        
+        if task is None:
+            self.requests += 1
+            task = asyncio.create_task(fetch())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        
+        # Shield so one caller being cancelled does not fail the request for everyone else
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """Return upstream request and coalesced caller counters"""
+        return {
+            "in_flight": len(self._in_flight),
+            "upstream_requests": self.requests,
+            "coalesced_requests": self.coalesced
+        }
+
+class TokenBucket:
+    """Token-bucket rate limiter that hands out request slots at a steady rate"""
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent; a rate of zero or less disables limiting"""
+        if self.rate <= 0:
+            return
+        
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        
+        # Reserve a token up front so concurrent waiters queue behind each other instead of racing
+        self.tokens -= 1
+        if self.tokens < 0:
+            try:
+                await asyncio.sleep(-self.tokens / self.rate)
+            except asyncio.CancelledError:
+                # Hand the reservation back so cancelled waiters do not delay everyone queued after them
+                self.tokens += 1
+                raise
+
+class AdaptiveConcurrencyLimiter:
+    """Bounds in-flight requests, backing off multiplicatively on throttling and recovering additively"""
+    
+    def __init__(self, max_limit: int, min_limit: int = 1):
+        self.max_limit = max(max_limit, 1)
+        self.min_limit = max(min(min_limit, self.max_limit), 1)
+        self.limit = float(self.max_limit)
+        self.active = 0
+        self.paused_until = 0.0
+        self.last_decrease = float("-inf")
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    async def acquire(self) -> None:
+        """Wait for a free slot, honoring any Retry-After pause"""
+        while True:
+            delay = self.paused_until - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+                continue
+            if self.active < int(self.limit):
+                break
+            
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+        
+        self.active += 1
+
+    def release(self) -> None:
+        """Free a slot and wake waiters that now fit under the limit"""
+        self.active -= 1
+        self._wake()
+
+    def on_success(self) -> None:
+        """Additive increase: grow the limit by roughly one slot per window of successful requests"""
+        if self.limit < self.max_limit:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._wake()
+
+    def on_throttled(self, retry_after: Optional[float] = None, sent_at: Optional[float] = None) -> None:
+        """Multiplicative decrease, pausing all requests for Retry-After seconds if given.
+        
+        A request sent before the last decrease was already in flight when it happened, so
+        throttling it reports the same overload: the limit is halved at most once per round trip.
+        """
+        if sent_at is None or sent_at >= self.last_decrease:
+            self.limit = max(self.min_limit, self.limit / 2)
+            self.last_decrease = time.monotonic()
+        if retry_after:
+            self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _wake(self) -> None:
+        available = int(self.limit) - self.active
+        while available > 0 and self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                available -= 1
+
+class RateLimiter:
+    """Client-side throttling: per-endpoint-class token buckets in front of an adaptive concurrency limit"""
+    
+    # Responses that mean Athena wants us to slow down
+    THROTTLE_STATUSES = (429, 503)
+    
+    def __init__(self, rates: Dict[str, float], burst: float, max_concurrency: int, min_concurrency: int = 1):
+        self.buckets = {name: TokenBucket(rate, burst) for name, rate in rates.items()}
+        self.concurrency = AdaptiveConcurrencyLimiter(max_concurrency, min_concurrency)
+        
+        self.waiting = 0
+        self.requests = 0
+        self.throttled = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @staticmethod
+    def endpoint_class(method: str) -> str:
+        """Group requests into the classes that share a rate"""
+        return "read" if method == "GET" else "write"
+
+    @asynccontextmanager
+    async def throttle(self, method: str) -> AsyncIterator[None]:
+        """Hold a rate-limited request slot for the duration of one upstream call"""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            bucket = self.buckets.get(self.endpoint_class(method))
+            if bucket is not None:
+                await bucket.acquire()
+            await self.concurrency.acquire()
+        finally:
+            self.waiting -= 1
+        
+        waited = time.monotonic() - started
+        self.requests += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        try:
+            yield
+        finally:
+            self.concurrency.release()
+
+    def record_response(self, status: int, retry_after: Optional[float] = None, sent_at: Optional[float] = None) -> None:
+        """Feed an upstream response status, and the monotonic time its request was sent, back into the concurrency limit"""
+        if status in self.THROTTLE_STATUSES:
+            self.throttled += 1
+            self.concurrency.on_throttled(retry_after, sent_at)
+        else:
+            self.concurrency.on_success()
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, wait time and concurrency metrics"""
+        return {
+            "queue_depth": self.waiting,
+            "in_flight": self.concurrency.active,
+            "concurrency_limit": round(self.concurrency.limit, 2),
+            "max_concurrency": self.concurrency.max_limit,
+            "requests": self.requests,
+            "throttled_responses": self.throttled,
+            "avg_wait_ms": round(self.total_wait / self.requests * 1000, 3) if self.requests else 0.0,
+            "max_wait_ms": round(self.max_wait * 1000, 3),
+            "paused_for_s": round(max(self.concurrency.paused_until - time.monotonic(), 0.0), 3),
+            "rates": {name: bucket.rate for name, bucket in self.buckets.items()}
+        }
+
+class RetryPolicy:
+    """Jittered exponential backoff for idempotent requests, bounded by a retry budget and deadlines"""
+    
+    # POST creates appointments, so only methods that are safe to repeat are retried
+    RETRYABLE_METHODS = ("GET", "PUT")
+    RETRYABLE_STATUSES = (429, 500, 502, 503, 504)
+    
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        base_delay: float = 0.2,
+        max_delay: float = 5,
+        budget_ratio: float = 0.2,
+        budget_max: float = 10,
+        attempt_timeout: float = 10,
+        deadline: float = 30
+    ):
+        self.max_attempts = max(max_attempts, 1)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        # Each request earns budget_ratio retries, so retries stay a bounded fraction of traffic
+        self.budget_ratio = budget_ratio
+        self.budget_max = budget_max
+        self.budget = budget_max
+        self.attempt_timeout = attempt_timeout
+        self.deadline = deadline
+        
+        self.retries = 0
+        self.budget_exhausted = 0
+
+    def is_retryable(self, method: str, error: Exception) -> bool:
+        """Return True if the failed request may be sent again"""
+        if method not in self.RETRYABLE_METHODS:
+            return False
+        if isinstance(error, AthenaAPIError):
+            return error.status in self.RETRYABLE_STATUSES
+        return isinstance(error, (aiohttp.ClientConnectionError, asyncio.TimeoutError, TimeoutError))
+
+    def record_request(self) -> None:
+        self.budget = min(self.budget_max, self.budget + self.budget_ratio)
+
+    def try_spend(self) -> bool:
+        """Withdraw one retry from the budget, returning False if it is exhausted"""
+        if self.budget < 1:
+            self.budget_exhausted += 1
+            return False
+        self.budget -= 1
+        self.retries += 1
+        return True
+
+    def backoff(self, attempt: int, retry_after: Optional[float] = None) -> float:
+        """Full-jitter exponential delay before the given retry, never shorter than Retry-After"""
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+        return max(delay, retry_after or 0.0)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "retries": self.retries,
+            "budget_remaining": round(self.budget, 2),
+            "budget_exhausted": self.budget_exhausted
+        }
+
+class CircuitBreaker:
+    """Fails fast after repeated upstream failures, letting a single probe through once it cools down"""
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold: int = 5, recovery_timeout: float = 30):
+        self.failure_threshold = max(failure_threshold, 1)
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.probe_started_at = 0.0
+        self.rejected = 0
+
+    def before_request(self, endpoint: str) -> None:
+        """Raise CircuitOpenError if the request must not be sent"""
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_timeout:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit open for {endpoint}: Athena is failing, not sending request")
+            self.state = self.HALF_OPEN
+            self.probe_in_flight = False
+        
+        if self.state == self.HALF_OPEN:
+            # A probe whose caller was cancelled never reports back, so stop waiting on it eventually
+            probe_running = self.probe_in_flight and time.monotonic() - self.probe_started_at < self.recovery_timeout
+            if probe_running:
+                self.rejected += 1
+                raise CircuitOpenError(f"Circuit half-open for {endpoint}: waiting on probe request")
+            self.probe_in_flight = True
+            self.probe_started_at = time.monotonic()
+
+    def record_success(self) -> None:
+        self.state = self.CLOSED
+        self.failures = 0
+        self.probe_in_flight = False
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        self.probe_in_flight = False
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Opening circuit after {self.failures} consecutive failures")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"state": self.state, "consecutive_failures": self.failures, "rejected": self.rejected}
+
+def circuit_key(endpoint: str) -> str:
+    """Collapse IDs in an endpoint path so e.g. every /appointments/{id} shares one breaker"""
+    return re.sub(r"/\d+", "/{id}", endpoint)
+
+def next_page_offset(page: Dict[str, Any], offset: int, count: int) -> Optional[int]:
+    """Return the offset of the page after this one, or None if this is the last page"""
+    next_link = page.get("next")
+    if not next_link or count == 0:
+        return None
+    next_offset = parse_qs(urlparse(next_link).query).get("offset")
+    if next_offset:
+        try:
+            return int(next_offset[0])
+        except ValueError:
+            pass
+    return offset + count
+
+# Date formats accepted for start_date/end_date, in the order they are tried
+DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y")
+
+# Fast paths for zero-padded dates in DATE_FORMATS, with the positions of year, month and day
+DATE_PATTERNS = (
+    (re.compile(r"(\d{4})-(\d{2})-(\d{2})"), DATE_FORMATS[0], (0, 1, 2)),
+    (re.compile(r"(\d{2})/(\d{2})/(\d{4})"), DATE_FORMATS[1], (2, 0, 1))
+)
+
+def parse_date(value: str) -> Optional[Tuple[date, str]]:
+    """Parse a date string, returning it with the format it was written in"""
+    if isinstance(value, str):
+        for pattern, fmt, (year, month, day) in DATE_PATTERNS:
+            match = pattern.fullmatch(value)
+            if match:
+                groups = match.groups()
+                try:
+                    return date(int(groups[year]), int(groups[month]), int(groups[day])), fmt
+                except ValueError:
+                    return None
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date(), fmt
+        except (TypeError, ValueError):
+            continue
+    return None
+
+def parse_datetime(value: str) -> Optional[datetime]:
+    """Parse a date with an optional HH:MM time, e.g. 2024-01-15 or 2024-01-15 14:00"""
+    date_part, _, time_part = value.strip().partition(" ")
+    parsed = parse_date(date_part)
+    if parsed is None:
+        return None
+    if not time_part:
+        return datetime.combine(parsed[0], dt_time.min)
+    parsed_time = parse_time(time_part)
+    return datetime.combine(parsed[0], parsed_time) if parsed_time else None
+
+def parse_time(value: str) -> Optional[dt_time]:
+    """Parse an HH:MM time"""
+    try:
+        return datetime.strptime(value.strip(), "%H:%M").time()
+    except (AttributeError, ValueError):
+        return None
+
+def plan_range_queries(params: Dict[str, Any], chunk_days: int) -> List[Dict[str, Any]]:
+    """Split a query into one query per date chunk and per department, in date order.
+    
+    Ranges that cannot be parsed, or that fit in a single chunk, are left whole.
+    """
+    departments = [d.strip() for d in str(params.get("departmentid", "")).split(",") if d.strip()] or [None]
+    
+    date_chunks = [(params.get("startdate"), params.get("enddate"))]
+    start = parse_date(params.get("startdate"))
+    end = parse_date(params.get("enddate"))
+    if start and end and chunk_days > 0 and start[0] <= end[0]:
+        date_chunks = []
+        chunk_start, fmt = start[0], start[1]
+        while chunk_start <= end[0]:
+            chunk_end = min(chunk_start + timedelta(days=chunk_days - 1), end[0])
+            date_chunks.append((chunk_start.strftime(fmt), chunk_end.strftime(fmt)))
+            chunk_start = chunk_end + timedelta(days=1)
+    
+    queries = []
+    for chunk_start, chunk_end in date_chunks:
+        for department in departments:
+            query = dict(params, startdate=chunk_start, enddate=chunk_end)
+            if department is not None:
+                query["departmentid"] = department
+            queries.append(query)
+    return queries
+
+def record_start_key(record: Dict[str, Any]) -> Tuple[date, str]:
+    """Sort key ordering appointment and slot records by date and start time, undated records last"""
+    parsed = parse_date(record.get("date", ""))
+    return (parsed[0] if parsed else date.max, record.get("starttime") or "")
+
+class Paginator:
+    """Lazily streams the records of a limit/offset paginated Athena list endpoint.
+    
+    At most the current page and one prefetched page are held at a time, so memory is
+    bounded by the page size rather than the size of the full result. Callers that stop
+    early should close the iterator (e.g. with contextlib.aclosing) to drop the prefetch.
+    """
+    
+    def __init__(
+        self,
+        fetch_page: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        list_key: str,
+        page_size: int = 100,
+        max_results: Optional[int] = None,
+        prefetch: bool = True
+    ):
+        self.fetch_page = fetch_page
+        self.list_key = list_key
+        self.page_size = max(page_size, 1)
+        self.max_results = max_results
+        self.prefetch = prefetch
+        self.total_count: Optional[int] = None
+        self.truncated = False
+
+    async def pages(self) -> AsyncIterator[List[Dict[str, Any]]]:
+        """Yield each page's records, fetching the next page concurrently while the caller works"""
+        remaining = self.max_results
+        if remaining is not None and remaining <= 0:
+            return
+        offset = 0
+        pending: Optional[asyncio.Future] = self._fetch(offset, remaining)
+        try:
+            while pending is not None:
+                page = await pending
+                pending = None
+                if self.total_count is None and "totalcount" in page:
+                    self.total_count = page["totalcount"]
+                
+                records = page.get(self.list_key, [])
+                next_offset = next_page_offset(page, offset, len(records))
+                if remaining is not None:
+                    records = records[:remaining]
+                    remaining -= len(records)
+                    if remaining <= 0 and next_offset is not None:
+                        self.truncated = True
+                        next_offset = None
+                
+                if next_offset is not None and self.prefetch:
+                    pending = self._fetch(next_offset, remaining)
+                if records:
+                    yield records
+                if next_offset is not None and pending is None:
+                    pending = self._fetch(next_offset, remaining)
+                offset = next_offset if next_offset is not None else offset
+        finally:
+            if pending is not None and not pending.done():
+                pending.cancel()
+
+    async def records(self) -> AsyncIterator[Dict[str, Any]]:
+        """Yield records one at a time across all pages"""
+        pages = self.pages()
+        try:
+            async for page in pages:
+                for record in page:
+                    yield record
+        finally:
+            await pages.aclose()
+
+    def _fetch(self, offset: int, remaining: Optional[int]) -> asyncio.Future:
+        limit = self.page_size if remaining is None else min(self.page_size, remaining)
+        return asyncio.ensure_future(self.fetch_page({"limit": limit, "offset": offset}))
+
+class SlotStore:
+    """In-process inventory of open appointment slots, indexed for fast range and first-N queries.
+    
+    Each synced department's slots are refreshed on a schedule; departments touched by bookings
+    made through this server are marked dirty and re-synced ahead of schedule.
+    """
+    
+    # Record fields that get a secondary index, each a sorted list of (start, slot ID)
+    INDEXED_FIELDS = ("departmentid", "providerid", "appointmenttypeid")
+    
+    def __init__(
+        self,
+        fetch_slots: Callable[[str, date, date], Awaitable[List[Dict[str, Any]]]],
+        departments: Optional[List[str]] = None,
+        sync_interval: float = 300,
+        sync_days: int = 14,
+        max_age: Optional[float] = None,
+        max_tracked_appointments: int = 10000,
+        resync_delay: float = 2
+    ):
+        self.fetch_slots = fetch_slots
+        self.departments = list(departments or [])
+        self.sync_interval = sync_interval
+        self.sync_days = max(sync_days, 1)
+        # Data older than this is not served even if no sync has replaced it yet
+        self.max_age = max_age if max_age is not None else sync_interval * 2
+        self.max_tracked_appointments = max_tracked_appointments
+        # Debounce so a burst of bookings triggers one re-sync rather than one per booking
+        self.resync_delay = resync_delay
+        
+        self.slots: Dict[str, Dict[str, Any]] = {}
+        self.starts: Dict[str, datetime] = {}
+        self.indexes: Dict[Tuple[str, str], List[Tuple[datetime, str]]] = {}
+        self.all_slots: List[Tuple[datetime, str]] = []
+        # department -> (monotonic sync time, first synced date, last synced date)
+        self.synced: Dict[str, Tuple[float, date, date]] = {}
+        self.dirty: set = set()
+        # department -> (consecutive sync failures, monotonic time before which it is not retried)
+        self.failures: Dict[str, Tuple[int, float]] = {}
+        # Departments of appointments booked through this server, so later updates can be targeted
+        self.appointment_departments: "OrderedDict[str, str]" = OrderedDict()
+        
+        self.syncs = 0
+        self.sync_failures = 0
+        self.queries = 0
+        self._sync_locks: Dict[str, asyncio.Lock] = {}
+        self._wakeup = asyncio.Event()
+        self._sync_task: Optional[asyncio.Task] = None
+
+    @staticmethod
+    def slot_start(slot: Dict[str, Any]) -> Optional[datetime]:
+        """Return the slot's start as a datetime, or None if its date or time cannot be parsed"""
+        parsed = parse_date(slot.get("date", ""))
+        if parsed is None:
+            return None
+        try:
+            start_time = datetime.strptime(slot.get("starttime", "00:00"), "%H:%M").time()
+        except (TypeError, ValueError):
+            return None
+        return datetime.combine(parsed[0], start_time)
+
+    def replace_department(self, department_id: str, slots: List[Dict[str, Any]], start: date, end: date) -> None:
+        """Swap in a freshly synced set of slots for one department"""
+        for slot_id in [slot_id for slot_id, slot in self.slots.items() if str(slot.get("departmentid")) == department_id]:
+            del self.slots[slot_id]
+            del self.starts[slot_id]
+        
+        for slot in slots:
+            slot_id = str(slot.get("appointmentid", ""))
+            slot_start = self.slot_start(slot)
+            if not slot_id or slot_start is None:
+                continue
+            self.slots[slot_id] = dict(slot, departmentid=str(slot.get("departmentid", department_id)))
+            self.starts[slot_id] = slot_start
+        
+        self.synced[department_id] = (time.monotonic(), start, end)
+        self.dirty.discard(department_id)
+        self._rebuild_indexes()
+
+    def remove(self, slot_id: str) -> bool:
+        """Drop a slot that is no longer open"""
+        slot = self.slots.pop(slot_id, None)
+        if slot is None:
+            return False
+        entry = (self.starts.pop(slot_id), slot_id)
+        for index in [self.all_slots] + [self.indexes.get((field, str(slot.get(field)))) for field in self.INDEXED_FIELDS]:
+            if index:
+                position = bisect_left(index, entry)
+                if position < len(index) and index[position] == entry:
+                    del index[position]
+        return True
+
+    def remove_matching(self, department_id: str, provider_id: str, appointment_date: str, appointment_time: str) -> Optional[str]:
+        """Drop the slot at this department, provider and start time, returning its ID if found"""
+        parsed = parse_date(appointment_date)
+        try:
+            start = datetime.combine(parsed[0], datetime.strptime(appointment_time, "%H:%M").time()) if parsed else None
+        except ValueError:
+            start = None
+        if start is None:
+            return None
+        
+        for slot in self.query(department_id=department_id, provider_id=provider_id, start=start, end=start):
+            slot_id = str(slot["appointmentid"])
+            self.remove(slot_id)
+            return slot_id
+        return None
+
+    def track_appointment(self, appointment_id: str, department_id: str) -> None:
+        """Remember which department an appointment booked through this server belongs to"""
+        self.appointment_departments[appointment_id] = department_id
+        self.appointment_departments.move_to_end(appointment_id)
+        while len(self.appointment_departments) > self.max_tracked_appointments:
+            self.appointment_departments.popitem(last=False)
+
+    def mark_dirty(self, department_id: Optional[str] = None) -> None:
+        """Schedule an early re-sync of one department, or of every synced department"""
+        if department_id is None:
+            self.dirty.update(self.synced)
+        elif department_id in self.synced:
+            self.dirty.add(department_id)
+        self._wakeup.set()
+
+    def covers(self, department_id: str, start: date, end: date) -> bool:
+        """Return True if the store holds fresh, complete data for this department and date range.
+        
+        Dirty departments still count: local bookings are applied immediately and the
+        background re-sync follows within resync_delay.
+        """
+        synced = self.synced.get(department_id)
+        if synced is None:
+            return False
+        synced_at, synced_start, synced_end = synced
+        return time.monotonic() - synced_at < self.max_age and synced_start <= start and end <= synced_end
+
+    def query(
+        self,
+        department_id: Optional[str] = None,
+        provider_id: Optional[str] = None,
+        appointment_type_id: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        earliest_time: Optional[dt_time] = None,
+        latest_time: Optional[dt_time] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Return matching slots in start order, scanning the most selective index from `start`"""
+        self.queries += 1
+        filters = {
+            field: str(value)
+            for field, value in zip(self.INDEXED_FIELDS, (department_id, provider_id, appointment_type_id))
+            if value is not None
+        }
+        
+        index = self.all_slots
+        for key in filters.items():
+            candidate = self.indexes.get(key, [])
+            if len(candidate) < len(index) or index is self.all_slots:
+                index = candidate
+        
+        results: List[Dict[str, Any]] = []
+        position = bisect_left(index, (start,)) if start is not None else 0
+        for slot_start, slot_id in index[position:]:
+            if end is not None and slot_start > end:
+                break
+            if earliest_time is not None and slot_start.time() < earliest_time:
+                continue
+            if latest_time is not None and slot_start.time() > latest_time:
+                continue
+            slot = self.slots[slot_id]
+            if all(str(slot.get(field)) == value for field, value in filters.items()):
+                results.append(slot)
+                if limit is not None and len(results) >= limit:
+                    break
+        return results
+
+    async def sync_department(self, department_id: str, if_stale: bool = False) -> None:
+        """Fetch open slots for the sync horizon of one department and replace what is stored.
+        
+        With if_stale, skip the fetch if the department already holds fresh data, e.g. because a
+        concurrent caller synced it while this one waited for the lock.
+        """
+        lock = self._sync_locks.setdefault(department_id, asyncio.Lock())
+        async with lock:
+            start = date.today()
+            if if_stale and self.covers(department_id, start, start):
+                return
+            end = start + timedelta(days=self.sync_days - 1)
+            try:
+                slots = await self.fetch_slots(department_id, start, end)
+            except Exception as e:
+                self.sync_failures += 1
+                # Back off exponentially from resync_delay up to sync_interval so an outage is not retried every second
+                failures = self.failures.get(department_id, (0, 0.0))[0] + 1
+                backoff = min(self.resync_delay * 2 ** failures, self.sync_interval)
+                self.failures[department_id] = (failures, time.monotonic() + backoff)
+                logger.warning(f"Slot sync failed for department {department_id}, retrying in {backoff:.0f}s: {e}")
+                raise
+            self.failures.pop(department_id, None)
+            self.syncs += 1
+            self.replace_department(department_id, slots, start, end)
+
+    def start(self) -> None:
+        """Start syncing configured and on-demand departments in the background"""
+        if self._sync_task is None or self._sync_task.done():
+            self._sync_task = asyncio.create_task(self._sync_forever())
+
+    async def stop(self) -> None:
+        """Stop background syncing"""
+        if self._sync_task is not None and not self._sync_task.done():
+            self._sync_task.cancel()
+            try:
+                await self._sync_task
+            except asyncio.CancelledError:
+                pass
+        self._sync_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "slots": len(self.slots),
+            "departments": {
+                department_id: {
+                    "age_s": round(now - synced_at, 1),
+                    "start": synced_start.isoformat(),
+                    "end": synced_end.isoformat(),
+                    "dirty": department_id in self.dirty
+                }
+                for department_id, (synced_at, synced_start, synced_end) in self.synced.items()
+            },
+            "failing": {
+                department_id: {"failures": failures, "retry_in_s": round(max(retry_at - now, 0.0), 1)}
+                for department_id, (failures, retry_at) in self.failures.items()
+            },
+            "syncs": self.syncs,
+            "sync_failures": self.sync_failures,
+            "queries": self.queries
+        }
+
+    def _rebuild_indexes(self) -> None:
+        self.all_slots = sorted((slot_start, slot_id) for slot_id, slot_start in self.starts.items())
+        self.indexes = {}
+        for entry in self.all_slots:
+            slot = self.slots[entry[1]]
+            for field in self.INDEXED_FIELDS:
+                if slot.get(field) is not None:
+                    self.indexes.setdefault((field, str(slot[field])), []).append(entry)
+
+    async def _sync_forever(self) -> None:
+        while True:
+            now = time.monotonic()
+            due = [department_id for department_id in self._background_departments() if self._next_sync_at(department_id) <= now]
+            for department_id in due:
+                try:
+                    await self.sync_department(department_id)
+                except Exception:
+                    pass
+            
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self._seconds_until_next_sync())
+                await asyncio.sleep(self.resync_delay)
+            except asyncio.TimeoutError:
+                pass
+
+    def _background_departments(self) -> List[str]:
+        return list(dict.fromkeys(self.departments + list(self.synced)))
+
+    def _next_sync_at(self, department_id: str) -> float:
+        """Monotonic time the department is next due: when dirty or stale, but not before its failure backoff ends"""
+        synced = self.synced.get(department_id)
+        due = float("-inf") if synced is None or department_id in self.dirty else synced[0] + self.sync_interval
+        failure = self.failures.get(department_id)
+        return max(due, failure[1]) if failure else due
+
+    def _seconds_until_next_sync(self) -> float:
+        departments = self._background_departments()
+        if not departments:
+            return self.sync_interval
+        next_sync = min(self._next_sync_at(department_id) for department_id in departments)
+        return max(next_sync - time.monotonic(), 1.0)
+
+def appointment_department(
+    slot_store: SlotStore, appointment_id: str, response: Any, args: Dict[str, Any]
+) -> Optional[str]:
+    """Department of an updated or cancelled appointment, or None if it cannot be told.
+    
+    Checked in order: appointments booked through this server, the department Athena returns
+    in the PUT response, and the department_id the caller passed.
+    """
+    department_id = slot_store.appointment_departments.get(appointment_id)
+    if department_id is None:
+        records = response if isinstance(response, list) else [response]
+        department_id = next(
+            (str(record["departmentid"]) for record in records if isinstance(record, dict) and record.get("departmentid")),
+            None
+        )
+    if department_id is None and args.get("department_id"):
+        department_id = str(args["department_id"])
+    return department_id
+
+# Department, provider and start time of a bookable slot
+SlotKey = Tuple[str, str, datetime]
+
+def slot_key(slot: Dict[str, Any]) -> SlotKey:
+    return (str(slot.get("departmentid")), str(slot.get("providerid")), SlotStore.slot_start(slot))
+
+class SlotHolds:
+    """Per-slot booking locks and short-lived holds on slots known to be taken.
+    
+    Booking attempts for the same slot run one at a time, so only the first reaches Athena.
+    A slot this server booked, or that Athena reported as taken, is held for hold_ttl seconds
+    and later attempts on it fail locally until the slot inventory has caught up.
+    """
+    
+    def __init__(self, hold_ttl: float = 60):
+        self.hold_ttl = hold_ttl
+        self.locks: Dict[SlotKey, asyncio.Lock] = {}
+        self.lock_users: Counter = Counter()
+        # slot -> (monotonic expiry, appointment ID if booked through this server)
+        self.holds: Dict[SlotKey, Tuple[float, Optional[str]]] = {}
+        self.appointments: Dict[str, SlotKey] = {}
+        # Open slots fetched beyond the slot inventory, shared by callers looking for alternatives nearby
+        self.windows: Dict[Tuple[Any, ...], Tuple[float, List[Dict[str, Any]]]] = {}
+        
+        self.booked = 0
+        self.conflicts = 0
+        self.local_conflicts = 0
+        self.waits = 0
+
+    @asynccontextmanager
+    async def lock(self, key: SlotKey) -> AsyncIterator[None]:
+        """Serialize booking attempts for one slot"""
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        if lock.locked():
+            self.waits += 1
+        self.lock_users[key] += 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self.lock_users[key] -= 1
+            if not self.lock_users[key]:
+                del self.lock_users[key]
+                del self.locks[key]
+
+    def hold(self, key: SlotKey, appointment_id: Optional[str] = None) -> None:
+        """Mark a slot as taken for hold_ttl seconds"""
+        self._purge()
+        self.holds[key] = (time.monotonic() + self.hold_ttl, appointment_id)
+        if appointment_id is not None:
+            self.appointments[appointment_id] = key
+
+    def is_held(self, key: SlotKey) -> bool:
+        hold = self.holds.get(key)
+        return hold is not None and hold[0] > time.monotonic()
+
+    def is_busy(self, key: SlotKey) -> bool:
+        """Return True if the slot is held or another booking attempt for it is in flight"""
+        return key in self.locks or self.is_held(key)
+
+    def recent_window(self, key: Tuple[Any, ...]) -> Optional[List[Dict[str, Any]]]:
+        """Return open slots fetched for this window within hold_ttl; holds cover slots booked since"""
+        window = self.windows.get(key)
+        return window[1] if window is not None and window[0] > time.monotonic() else None
+
+    def remember_window(self, key: Tuple[Any, ...], slots: List[Dict[str, Any]]) -> None:
+        self._purge()
+        self.windows[key] = (time.monotonic() + self.hold_ttl, slots)
+
+    def release_appointment(self, appointment_id: str) -> None:
+        """Drop the hold on a slot whose appointment was cancelled, so it can be booked again"""
+        key = self.appointments.pop(appointment_id, None)
+        if key is not None:
+            self.holds.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        self._purge()
+        return {
+            "held": len(self.holds),
+            "booking": len(self.locks),
+            "booked": self.booked,
+            "conflicts": self.conflicts,
+            "local_conflicts": self.local_conflicts,
+            "waits": self.waits
+        }
+
+    def _purge(self) -> None:
+        now = time.monotonic()
+        for key in [key for key, (expiry, _) in self.holds.items() if expiry <= now]:
+            _, appointment_id = self.holds.pop(key)
+            if appointment_id is not None:
+                self.appointments.pop(appointment_id, None)
+        for key in [key for key, (expiry, _) in self.windows.items() if expiry <= now]:
+            del self.windows[key]
+
+class AppointmentSnapshot:
+    """Latest known appointments of one query, versioned so callers can ask what changed since a cursor.
+    
+    Each poll is diffed against the snapshot by hashing every record; an appointment that is added,
+    changed or disappears gets the poll's version. Removals are remembered as tombstones, up to
+    max_tombstones, so older cursors can still be answered.
+    """
+    
+    def __init__(self, query: Dict[str, Any], max_tombstones: int = 10000):
+        self.query = query
+        self.max_tombstones = max_tombstones
+        # Tells this snapshot's cursors apart from those of an earlier snapshot of the same query
+        self.epoch = os.urandom(4).hex()
+        self.version = 0
+        # appointment ID -> (record hash, version added, version last changed, record)
+        self.records: Dict[str, Tuple[int, int, int, Dict[str, Any]]] = {}
+        # appointment ID -> version removed, in version order
+        self.removed: "OrderedDict[str, int]" = OrderedDict()
+        # Cursors older than this may have missed removals whose tombstones were dropped
+        self.horizon = 0
+        self.truncated = False
+        self.polled_at: Optional[float] = None
+        self.as_of: Optional[str] = None
+        self.last_read = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    def cursor(self) -> str:
+        return f"{self.epoch}-{self.version}"
+
+    def parse_cursor(self, cursor: Optional[str]) -> Optional[int]:
+        """Return the version a cursor of this snapshot points at, or None if it cannot be answered"""
+        epoch, _, version = (cursor or "").partition("-")
+        if epoch != self.epoch or not version.isdigit():
+            return None
+        version = int(version)
+        return version if self.horizon <= version <= self.version else None
+
+    def apply(self, appointments: List[Dict[str, Any]], complete: bool = True) -> int:
+        """Diff a freshly fetched list against the snapshot, returning how many appointments changed.
+        
+        Appointments missing from an incomplete (truncated) list are not treated as removed.
+        """
+        version = self.version + 1
+        seen = set()
+        changed = 0
+        for record in appointments:
+            appointment_id = str(record.get("appointmentid", ""))
+            if not appointment_id:
+                continue
+            seen.add(appointment_id)
+            digest = hash(dumps_json(record))
+            current = self.records.get(appointment_id)
+            if current is None:
+                self.records[appointment_id] = (digest, version, version, record)
+                self.removed.pop(appointment_id, None)
+                changed += 1
+            elif current[0] != digest:
+                self.records[appointment_id] = (digest, current[1], version, record)
+                changed += 1
+        
+        if complete:
+            for appointment_id in [appointment_id for appointment_id in self.records if appointment_id not in seen]:
+                del self.records[appointment_id]
+                self.removed[appointment_id] = version
+                changed += 1
+            while len(self.removed) > self.max_tombstones:
+                self.horizon = self.removed.popitem(last=False)[1]
+        
+        if changed:
+            self.version = version
+        self.truncated = not complete
+        self.polled_at = time.monotonic()
+        self.as_of = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        return changed
+
+    def changes_since(self, version: Optional[int]) -> Dict[str, Any]:
+        """Appointments added, changed and removed after a version, or everything if version is None"""
+        if version is None:
+            added = [record for _, _, _, record in self.records.values()]
+            changed: List[Dict[str, Any]] = []
+            removed: List[str] = []
+        else:
+            added = [record for _, created, _, record in self.records.values() if created > version]
+            changed = [record for _, created, updated, record in self.records.values() if created <= version < updated]
+            removed = []
+            for appointment_id, removed_version in reversed(self.removed.items()):
+                if removed_version <= version:
+                    break
+                removed.append(appointment_id)
+        
+        result: Dict[str, Any] = {
+            "cursor": self.cursor(),
+            "reset": version is None,
+            "added": added,
+            "changed": changed,
+            "removed": removed,
+            "totalcount": len(self.records),
+            "as_of": self.as_of
+        }
+        if self.truncated:
+            result["truncated"] = True
+        return result
+
+class AppointmentFeeds:
+    """Per-practice appointment snapshots, polled in the background while callers keep reading them.
+    
+    Snapshots are created on first read and dropped once unread for idle_timeout seconds or when
+    more than max_feeds exist, least recently read first.
+    """
+    
+    def __init__(
+        self,
+        fetch: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+        poll_interval: float = 30,
+        idle_timeout: float = 600,
+        max_feeds: int = 20
+    ):
+        self.fetch = fetch
+        self.poll_interval = poll_interval
+        self.idle_timeout = idle_timeout
+        self.max_feeds = max(max_feeds, 1)
+        self.feeds: "OrderedDict[Tuple[Tuple[str, Any], ...], AppointmentSnapshot]" = OrderedDict()
+        
+        self.polls = 0
+        self.poll_failures = 0
+        self._wakeup = asyncio.Event()
+        self._poll_task: Optional[asyncio.Task] = None
+
+    async def read(self, query: Dict[str, Any], cursor: Optional[str] = None) -> Dict[str, Any]:
+        """Return what changed in a query's appointments since the cursor, polling now if the snapshot is not fresh"""
+        key = tuple(sorted(query.items()))
+        snapshot = self.feeds.get(key)
+        if snapshot is None:
+            snapshot = self.feeds[key] = AppointmentSnapshot(query)
+            while len(self.feeds) > self.max_feeds:
+                self.feeds.popitem(last=False)
+            self.start()
+        else:
+            self.feeds.move_to_end(key)
+        snapshot.last_read = time.monotonic()
+        
+        await self.poll(snapshot, max_age=self.poll_interval)
+        return snapshot.changes_since(snapshot.parse_cursor(cursor))
+
+    async def poll(self, snapshot: AppointmentSnapshot, max_age: Optional[float] = None) -> None:
+        """Fetch a snapshot's query and apply the differences, unless it was polled within max_age"""
+        async with snapshot.lock:
+            if max_age is not None and snapshot.polled_at is not None and time.monotonic() - snapshot.polled_at < max_age:
+                return
+            try:
+                result = await self.fetch(snapshot.query)
+            except Exception:
+                self.poll_failures += 1
+                raise
+            self.polls += 1
+            snapshot.apply(result.get("appointments", []), complete=not result.get("truncated"))
+
+    def start(self) -> None:
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_forever())
+
+    async def stop(self) -> None:
+        if self._poll_task is not None and not self._poll_task.done():
+            self._poll_task.cancel()
+            try:
+                await self._poll_task
+            except asyncio.CancelledError:
+                pass
+        self._poll_task = None
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "feeds": [
+                {
+                    **snapshot.query,
+                    "appointments": len(snapshot.records),
+                    "version": snapshot.version,
+                    "age_s": round(now - snapshot.polled_at, 1) if snapshot.polled_at is not None else None
+                }
+                for snapshot in self.feeds.values()
+            ],
+            "polls": self.polls,
+            "poll_failures": self.poll_failures
+        }
+
+    async def _poll_forever(self) -> None:
+        while self.feeds:
+            now = time.monotonic()
+            for key in [key for key, snapshot in self.feeds.items() if now - snapshot.last_read >= self.idle_timeout]:
+                del self.feeds[key]
+            
+            due = [
+                snapshot for snapshot in self.feeds.values()
+                if snapshot.polled_at is None or now - snapshot.polled_at >= self.poll_interval
+            ]
+            for outcome in await asyncio.gather(*(self.poll(snapshot) for snapshot in due), return_exceptions=True):
+                if isinstance(outcome, Exception):
+                    logger.warning(f"Appointment feed poll failed: {outcome}")
+            
+            polled = [snapshot.polled_at for snapshot in self.feeds.values() if snapshot.polled_at is not None]
+            delay = min(polled) + self.poll_interval - time.monotonic() if polled else self.poll_interval
+            await asyncio.sleep(max(delay, 1.0))
+
+class PracticeState:
+    """Per-practice state that cannot be shared: the slot inventory, slot holds, patient index and appointment feeds"""
+    
+    __slots__ = ("practice_id", "slot_store", "slot_holds", "patient_index", "feeds", "last_used")
+    
+    def __init__(
+        self,
+        practice_id: str,
+        slot_store: SlotStore,
+        slot_holds: SlotHolds,
+        patient_index: PatientIndex,
+        feeds: AppointmentFeeds
+    ):
+        self.practice_id = practice_id
+        self.slot_store = slot_store
+        self.slot_holds = slot_holds
+        self.patient_index = patient_index
+        self.feeds = feeds
+        self.last_used = time.monotonic()
+
+class PracticeRegistry:
+    """Lazily created per-practice state with LRU eviction.
+    
+    At most max_practices are kept, evicting the least recently used first. Practices unused
+    for idle_timeout seconds are evicted on the next access. Pinned practices are never evicted.
+    """
+    
+    def __init__(
+        self,
+        create: Callable[[str], PracticeState],
+        close: Callable[[PracticeState], Awaitable[None]],
+        max_practices: int = 50,
+        idle_timeout: float = 3600,
+        pinned: Tuple[str, ...] = ()
+    ):
+        self.create = create
+        self.close_practice = close
+        self.max_practices = max(max_practices, 1)
+        self.idle_timeout = idle_timeout
+        self.pinned = set(pinned)
+        self._practices: "OrderedDict[str, PracticeState]" = OrderedDict()
+        
+        self.created = 0
+        self.evictions = 0
+
+    async def get(self, practice_id: str) -> PracticeState:
+        """Return the practice's state, creating it on first use"""
+        state = self._practices.get(practice_id)
+        if state is None:
+            state = self.create(practice_id)
+            self._practices[practice_id] = state
+            self.created += 1
+        else:
+            self._practices.move_to_end(practice_id)
+        state.last_used = time.monotonic()
+        await self._evict()
+        return state
+
+    def peek(self, practice_id: str) -> Optional[PracticeState]:
+        return self._practices.get(practice_id)
+
+    async def close(self) -> None:
+        """Close every practice"""
+        states = list(self._practices.values())
+        self._practices.clear()
+        for state in states:
+            await self.close_practice(state)
+
+    def stats(self) -> Dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "active": len(self._practices),
+            "max_practices": self.max_practices,
+            "created": self.created,
+            "evictions": self.evictions,
+            "practices": {
+                practice_id: {
+                    "idle_s": round(now - state.last_used, 1),
+                    "slots": len(state.slot_store.slots),
+                    "held_slots": len(state.slot_holds.holds),
+                    "feeds": len(state.feeds.feeds),
+                    "indexed_patients": len(state.patient_index.patients)
+                }
+                for practice_id, state in self._practices.items()
+            }
+        }
+
+    async def _evict(self) -> None:
+        now = time.monotonic()
+        evictable = [practice_id for practice_id in self._practices if practice_id not in self.pinned]
+        excess = len(self._practices) - self.max_practices
+        victims = []
+        # Oldest first, so the least recently used go when over the limit
+        for practice_id in evictable:
+            if excess > 0 or now - self._practices[practice_id].last_used >= self.idle_timeout:
+                victims.append(self._practices.pop(practice_id))
+                excess -= 1
+        for state in victims:
+            self.evictions += 1
+            logger.info(f"Evicting practice {state.practice_id}")
+            await self.close_practice(state)
+
 class AthenaHealthMCP:
+    
     def __init__(self):
-        self.server = Server("athena-health-scheduling")
+        self.server = Server("athena-health-scheduling", version="0.1.0")
         
         # Configuration from environment variables
         self.base_url = os.getenv("ATHENA_BASE_URL", "https://api.athenahealth.com")
         self.client_id = os.getenv("ATHENA_CLIENT_ID", "")
         self.client_secret = os.getenv("ATHENA_CLIENT_SECRET", "")
         self.practice_id = os.getenv("ATHENA_PRACTICE_ID", "")
+        # Practices with their own API client; others use ATHENA_CLIENT_ID and share its token
+        self.practice_credentials = parse_practice_credentials(os.getenv("ATHENA_PRACTICE_CREDENTIALS", ""))
+        # Practices tools may address with practice_id: by default the ones this server is configured for;
+        # "*" allows any practice the default API client can reach
+        allowed_practices = {p.strip() for p in os.getenv("ATHENA_PRACTICE_IDS", "").split(",") if p.strip()}
+        self.allowed_practices = None if "*" in allowed_practices else (
+            (allowed_practices or set(self.practice_credentials)) | {self.practice_id}
+        )
+        
+        # HTTP connection pool settings
+        self.pool_limit = int(os.getenv("ATHENA_HTTP_POOL_LIMIT", "100"))
+        self.pool_limit_per_host = int(os.getenv("ATHENA_HTTP_POOL_LIMIT_PER_HOST", "20"))
+        self.keepalive_timeout = float(os.getenv("ATHENA_HTTP_KEEPALIVE_TIMEOUT", "30"))
+        self.dns_cache_ttl = int(os.getenv("ATHENA_HTTP_DNS_CACHE_TTL", "300"))
+        self.request_timeout = float(os.getenv("ATHENA_HTTP_TIMEOUT", "30"))
+        self.connect_timeout = float(os.getenv("ATHENA_HTTP_CONNECT_TIMEOUT", "10"))
+        self.session: Optional[aiohttp.ClientSession] = None
+        
+        # Response cache for reference data that rarely changes, keyed by endpoint
+        self.cache_ttls = parse_cache_ttls(os.getenv("ATHENA_CACHE_TTLS", ""), {
+            "/departments": 3600,
+            "/providers": 3600,
+            "/appointmenttypes": 3600
+        })
+        self.response_cache = ResponseCache(
+            max_entries=int(os.getenv("ATHENA_CACHE_MAX_ENTRIES", "1000")),
+            stale_ttl=float(os.getenv("ATHENA_CACHE_STALE_TTL", "600"))
+        )
+        
+        # Optional on-disk copy of cached reference data so new processes start warm
+        cache_dir = os.getenv("ATHENA_CACHE_DIR", "")
+        self.disk_cache = DiskCache(cache_dir) if cache_dir else None
+        self._disk_cache_task: Optional[asyncio.Task] = None
+        
+        # Concurrent identical GETs share one upstream request
+        self.request_coalescer = RequestCoalescer()
+        
+        # Client-side throttling to stay inside Athena's quotas, which apply per practice: each practice
+        # gets its own limiter so one practice's 429s do not slow down the others
+        self.rate_limits = {
+            "read": float(os.getenv("ATHENA_RATE_LIMIT_READ", "15")),
+            "write": float(os.getenv("ATHENA_RATE_LIMIT_WRITE", "5"))
+        }
+        self.rate_limit_burst = float(os.getenv("ATHENA_RATE_LIMIT_BURST", "10"))
+        self.max_concurrency = int(os.getenv("ATHENA_MAX_CONCURRENCY", "20"))
+        self.min_concurrency = int(os.getenv("ATHENA_MIN_CONCURRENCY", "1"))
+        self.rate_limiters: Dict[str, RateLimiter] = {}
+        
+        # Retries for idempotent requests and per-endpoint circuit breakers
+        self.retry_policy = RetryPolicy(
+            max_attempts=int(os.getenv("ATHENA_RETRY_MAX_ATTEMPTS", "3")),
+            base_delay=float(os.getenv("ATHENA_RETRY_BASE_DELAY", "0.2")),
+            max_delay=float(os.getenv("ATHENA_RETRY_MAX_DELAY", "5")),
+            budget_ratio=float(os.getenv("ATHENA_RETRY_BUDGET_RATIO", "0.2")),
+            attempt_timeout=float(os.getenv("ATHENA_RETRY_ATTEMPT_TIMEOUT", "10")),
+            deadline=float(os.getenv("ATHENA_RETRY_DEADLINE", "30"))
+        )
+        self.circuit_failure_threshold = int(os.getenv("ATHENA_CIRCUIT_FAILURE_THRESHOLD", "5"))
+        self.circuit_recovery_timeout = float(os.getenv("ATHENA_CIRCUIT_RECOVERY_TIMEOUT", "30"))
+        # (practice, endpoint) -> breaker, so one practice's outage does not fail requests for the others
+        self.circuit_breakers: Dict[Tuple[str, str], CircuitBreaker] = {}
+        
+        # Pagination defaults for list endpoints
+        self.page_size = int(os.getenv("ATHENA_PAGE_SIZE", "100"))
+        self.max_results = int(os.getenv("ATHENA_MAX_RESULTS", "1000"))
+        
+        # Large date ranges and department lists are split into concurrent sub-queries
+        self.fanout_chunk_days = int(os.getenv("ATHENA_FANOUT_CHUNK_DAYS", "7"))
+        self.fanout_concurrency = int(os.getenv("ATHENA_FANOUT_CONCURRENCY", "4"))
+        
+        # Local open-slot inventory, synced in the background for the configured departments of the default practice
+        self.slot_sync_departments = [d.strip() for d in os.getenv("ATHENA_SLOT_SYNC_DEPARTMENTS", "").split(",") if d.strip()]
+        self.slot_sync_interval = float(os.getenv("ATHENA_SLOT_SYNC_INTERVAL", "300"))
+        self.slot_sync_days = int(os.getenv("ATHENA_SLOT_SYNC_DAYS", "14"))
+        
+        # Booking: how long slots known to be taken are held locally, and how conflicts fall back to other slots
+        self.slot_hold_ttl = float(os.getenv("ATHENA_SLOT_HOLD_TTL", "60"))
+        self.booking_alternatives = int(os.getenv("ATHENA_BOOKING_ALTERNATIVES", "3"))
+        self.booking_window_hours = float(os.getenv("ATHENA_BOOKING_WINDOW_HOURS", "72"))
+        
+        # Appointment change feeds: how often watched ranges are polled and how long unread feeds are kept
+        self.feed_poll_interval = float(os.getenv("ATHENA_FEED_POLL_INTERVAL", "30"))
+        self.feed_idle_timeout = float(os.getenv("ATHENA_FEED_IDLE_TIMEOUT", "600"))
+        self.max_feeds = int(os.getenv("ATHENA_MAX_FEEDS", "20"))
+        self.feed_max_appointments = int(os.getenv("ATHENA_FEED_MAX_APPOINTMENTS", "5000"))
+        
+        # Fuzzy search over patient demographics this server has already fetched
+        self.patient_index_size = int(os.getenv("ATHENA_PATIENT_INDEX_SIZE", "10000"))
+        self.patient_index_min_score = float(os.getenv("ATHENA_PATIENT_INDEX_MIN_SCORE", "0.75"))
+        
+        # Slot inventory and patient index per practice, created on first use. The token, connection
+        # pool, response cache and rate limiter are shared by every practice
+        self.practices = PracticeRegistry(
+            self.create_practice,
+            self.close_practice,
+            max_practices=int(os.getenv("ATHENA_MAX_PRACTICES", "50")),
+            idle_timeout=float(os.getenv("ATHENA_PRACTICE_IDLE_TIMEOUT", "3600")),
+            pinned=(self.practice_id,)
+        )
+        
+        # Batch tool limits
+        self.batch_parallelism = int(os.getenv("ATHENA_BATCH_PARALLELISM", "5"))
+        self.batch_max_items = int(os.getenv("ATHENA_BATCH_MAX_ITEMS", "100"))
+        
+        # Tool calls run at once across every connected client; further calls wait their turn
+        self.tool_concurrency = int(os.getenv("ATHENA_TOOL_CONCURRENCY", "32"))
+        self.tool_semaphore = asyncio.Semaphore(max(self.tool_concurrency, 1))
+        self.tool_calls_in_flight = 0
+        
+        # HTTP transport settings
+        self.http_host = os.getenv("ATHENA_HTTP_HOST", "127.0.0.1")
+        self.http_port = int(os.getenv("ATHENA_HTTP_PORT", "8000"))
+        self.http_stateless = os.getenv("ATHENA_HTTP_STATELESS", "false").lower() == "true"
+        self.http_shutdown_timeout = float(os.getenv("ATHENA_HTTP_SHUTDOWN_TIMEOUT", "30"))
+        # Bearer token clients must send; required unless the server only listens on loopback
+        self.http_auth_token = os.getenv("ATHENA_HTTP_AUTH_TOKEN", "")
+        # Host and Origin headers accepted (DNS rebinding protection); loopback names by default on a loopback host
+        self.http_allowed_hosts = [h.strip() for h in os.getenv("ATHENA_HTTP_ALLOWED_HOSTS", "").split(",") if h.strip()]
+        self.http_allowed_origins = [o.strip() for o in os.getenv("ATHENA_HTTP_ALLOWED_ORIGINS", "").split(",") if o.strip()]
+        
+        # Latency metrics, exposed by the get_server_metrics tool and an optional local HTTP listener
+        self.metrics = MetricsRegistry()
+        self.setup_metrics()
+        metrics_port = os.getenv("ATHENA_METRICS_PORT")
+        self.metrics_port = int(metrics_port) if metrics_port else None
+        self.metrics_host = os.getenv("ATHENA_METRICS_HOST", "127.0.0.1")
+        self._metrics_runner: Optional[web.AppRunner] = None
         
         # Authentication state
-        self.access_token = None
-        self.token_expiry = None
+        self.token_refresh_margin = float(os.getenv("ATHENA_TOKEN_REFRESH_MARGIN", "300"))
+        self.token_manager = TokenManager(
+            lambda: self.request_token(self.client_id, self.client_secret),
+            refresh_margin=self.token_refresh_margin
+        )
+        # Token managers of practices with their own credentials, keyed by client ID
+        self.token_managers: Dict[str, TokenManager] = {}
         
         if not all([self.client_id, self.client_secret, self.practice_id]):
             logger.error("Missing required environment variables: ATHENA_CLIENT_ID, ATHENA_CLIENT_SECRET, ATHENA_PRACTICE_ID")
         
         self.setup_handlers()
 
-    async def authenticate(self) -> str:
-        """Authenticate with Athena Health API and return access token"""
-        # Check if token is still valid
-        if (self.access_token and self.token_expiry and 
-            datetime.now() < self.token_expiry):
-            return self.access_token
+    async def start(self) -> None:
+        """Create the shared HTTP session and start background token renewal and slot sync"""
+        await self.get_session()
+        self.token_manager.start()
+        if self.practice_id:
+            await self.practices.get(self.practice_id)
+        if self.disk_cache is not None:
+            await self.load_disk_cache()
+        if self.metrics_port is not None:
+            await self.start_metrics_server()
+
+    async def close(self) -> None:
+        """Stop background tasks, close the shared HTTP session and release pooled connections"""
+        if self._metrics_runner is not None:
+            await self._metrics_runner.cleanup()
+            self._metrics_runner = None
+        await self.token_manager.stop()
+        for token_manager in self.token_managers.values():
+            await token_manager.stop()
+        await self.practices.close()
+        if self._disk_cache_task is not None and not self._disk_cache_task.done():
+            self._disk_cache_task.cancel()
+            await asyncio.gather(self._disk_cache_task, return_exceptions=True)
+        await self.response_cache.close()
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """Return the shared HTTP session, creating it on first use"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_limit,
+                limit_per_host=self.pool_limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+                ttl_dns_cache=self.dns_cache_ttl,
+                use_dns_cache=True
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.request_timeout,
+                connect=self.connect_timeout
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=timeout,
+                trace_configs=[self.connection_trace_config()]
+            )
+        return self.session
+
+    @staticmethod
+    def connection_trace_config() -> aiohttp.TraceConfig:
+        """Trace how long each request waits for a pooled or newly opened connection.
+        
+        Requests that pass a dict as trace_request_ctx get its "connection" key set to the
+        seconds between the request starting and a connection being assigned.
+        """
+        async def on_request_start(session, context, params) -> None:
+            context.started = time.perf_counter()
+        
+        async def on_connection_ready(session, context, params) -> None:
+            if isinstance(context.trace_request_ctx, dict):
+                context.trace_request_ctx["connection"] = time.perf_counter() - context.started
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_request_start)
+        trace_config.on_connection_create_end.append(on_connection_ready)
+        trace_config.on_connection_reuseconn.append(on_connection_ready)
+        return trace_config
+
+    def setup_metrics(self) -> None:
+        """Register histograms, counters and gauges"""
+        metrics = self.metrics
+        metrics.histogram("athena_tool_duration_seconds", "Tool call latency by tool and outcome")
+        metrics.histogram("athena_tool_serialization_seconds", "Time spent serializing tool results")
+        metrics.histogram(
+            "athena_api_request_duration_seconds",
+            "Athena API read/write latency as seen by tools, including cache hits and coalesced waits"
+        )
+        metrics.histogram(
+            "athena_upstream_request_duration_seconds",
+            "Latency of requests sent to Athena, including retries, by final status"
+        )
+        metrics.histogram(
+            "athena_upstream_phase_duration_seconds",
+            "Per-attempt time spent in token, throttle, connection, response and decode phases"
+        )
+        metrics.counter("athena_upstream_retries_total", "Requests to Athena retried after an error")
+        metrics.counter(
+            "athena_booking_attempts_total",
+            "Slot booking attempts by outcome: booked, conflict, or local_conflict when answered from a hold"
+        )
+        metrics.gauge(
+            "athena_tool_calls_in_flight",
+            "Tool calls currently running, across all clients",
+            lambda: [({}, self.tool_calls_in_flight)]
+        )
+        metrics.gauge(
+            "athena_cache_entries",
+            "Responses held in the in-memory cache",
+            lambda: [({}, self.response_cache.stats()["entries"])]
+        )
+        metrics.gauge(
+            "athena_rate_limiter_queue_depth",
+            "Requests waiting for a practice's client-side rate limiter",
+            lambda: [({"practice": practice_id}, limiter.waiting) for practice_id, limiter in self.rate_limiters.items()]
+        )
+        metrics.gauge(
+            "athena_rate_limiter_concurrency_limit",
+            "Current adaptive concurrency limit of a practice",
+            lambda: [({"practice": practice_id}, limiter.concurrency.limit) for practice_id, limiter in self.rate_limiters.items()]
+        )
+        metrics.gauge(
+            "athena_circuit_open",
+            "1 while a practice endpoint's circuit breaker is rejecting requests",
+            lambda: [
+                ({"practice": practice_id, "endpoint": endpoint}, 1 if breaker.state == "open" else 0)
+                for (practice_id, endpoint), breaker in self.circuit_breakers.items()
+            ]
+        )
+
+    async def start_metrics_server(self) -> None:
+        """Serve Prometheus metrics over HTTP at /metrics"""
+        async def handle_metrics(request: web.Request) -> web.Response:
+            return web.Response(text=self.metrics.render(), content_type="text/plain", charset="utf-8")
+        
+        app = web.Application()
+        app.router.add_get("/metrics", handle_metrics)
+        self._metrics_runner = web.AppRunner(app, access_log=None)
+        await self._metrics_runner.setup()
+        await web.TCPSite(self._metrics_runner, self.metrics_host, self.metrics_port).start()
+        logger.info(f"Serving metrics on http://{self.metrics_host}:{self.metrics_port}/metrics")
+
+    def create_practice(self, practice_id: str) -> PracticeState:
+        """Create a practice's slot inventory and patient index and start its slot sync"""
+        slot_store = SlotStore(
+            lambda department_id, start, end: self.fetch_open_slots(department_id, start, end, practice_id),
+            departments=self.slot_sync_departments if practice_id == self.practice_id else [],
+            sync_interval=self.slot_sync_interval,
+            sync_days=self.slot_sync_days
+        )
+        slot_store.start()
+        patient_index = PatientIndex(max_patients=self.patient_index_size, min_score=self.patient_index_min_score)
+        feeds = AppointmentFeeds(
+            lambda query: self.get_appointments(dict(query, practice_id=practice_id, max_results=self.feed_max_appointments)),
+            poll_interval=self.feed_poll_interval,
+            idle_timeout=self.feed_idle_timeout,
+            max_feeds=self.max_feeds
+        )
+        return PracticeState(practice_id, slot_store, SlotHolds(self.slot_hold_ttl), patient_index, feeds)
+
+    async def close_practice(self, state: PracticeState) -> None:
+        """Stop a practice's slot sync and feed polling and drop its cached responses, idle rate limiter and breakers"""
+        await state.slot_store.stop()
+        await state.feeds.stop()
+        self.response_cache.invalidate(practice_path(state.practice_id, ""))
+        limiter = self.rate_limiters.get(state.practice_id)
+        if limiter is not None and not limiter.waiting and not limiter.concurrency.active:
+            del self.rate_limiters[state.practice_id]
+        for key in [key for key in self.circuit_breakers if key[0] == state.practice_id]:
+            if self.circuit_breakers[key].state == CircuitBreaker.CLOSED:
+                del self.circuit_breakers[key]
+
+    def practice_for(self, args: Dict[str, Any]) -> str:
+        """Return the practice a tool call addresses, defaulting to ATHENA_PRACTICE_ID"""
+        practice_id = str(args.get("practice_id") or self.practice_id)
+        if not practice_id.isdigit():
+            raise ValueError(f"Invalid practice_id: {practice_id!r}")
+        if self.allowed_practices is not None and practice_id not in self.allowed_practices:
+            raise ValueError(f"Practice {practice_id} is not enabled on this server")
+        return practice_id
 
+    async def get_practice(self, args: Dict[str, Any]) -> PracticeState:
+        return await self.practices.get(self.practice_for(args))
+
+    def token_manager_for(self, practice_id: Optional[str]) -> TokenManager:
+        """Return the token manager for the practice's API client, creating it on first use"""
+        credentials = self.practice_credentials.get(practice_id) if practice_id else None
+        if credentials is None or credentials[0] == self.client_id:
+            return self.token_manager
+        client_id, client_secret = credentials
+        token_manager = self.token_managers.get(client_id)
+        if token_manager is None:
+            token_manager = TokenManager(
+                lambda: self.request_token(client_id, client_secret),
+                refresh_margin=self.token_refresh_margin
+            )
+            token_manager.start()
+            self.token_managers[client_id] = token_manager
+        return token_manager
+
+    async def authenticate(self, practice_id: Optional[str] = None) -> str:
+        """Return a valid access token for the practice, refreshing it only when necessary"""
+        return await self.token_manager_for(practice_id).get_token()
+
+    async def request_token(self, client_id: str, client_secret: str) -> Tuple[str, float]:
+        """Request a new access token from Athena Health and return it with its lifetime in seconds"""
         auth_string = base64.b64encode(
-            f"{self.client_id}:{self.client_secret}".encode()
+            f"{client_id}:{client_secret}".encode()
         ).decode()
         
         headers = {
@@ -62,442 +2449,1576 @@ class AthenaHealthMCP:
             "scope": "athena/service/Athenanet.MDP.*"
         }
         
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.post(
-                    f"{self.base_url}/oauth2/v1/token",
-                    headers=headers,
-                    data=urlencode(data)
-                ) as response:
-                    if response.status == 200:
-                        token_data = await response.json()
-                        self.access_token = token_data["access_token"]
-                        # Set expiry with 1 minute buffer
-                        expires_in = token_data.get("expires_in", 3600)
-                        self.token_expiry = datetime.now() + timedelta(seconds=expires_in - 60)
-                        return self.access_token
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"Authentication failed: {response.status} - {error_text}")
-            
-            except Exception as e:
-                logger.error(f"Authentication error: {e}")
-                raise
+        session = await self.get_session()
+        try:
+            async with session.post(
+                f"{self.base_url}/oauth2/v1/token",
+                headers=headers,
+                data=urlencode(data)
+            ) as response:
+                if response.status == 200:
+                    token_data = await response.json()
+                    return token_data["access_token"], float(token_data.get("expires_in", 3600))
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"Authentication failed: {response.status} - {error_text}")
+        
+        except Exception as e:
+            logger.error(f"Authentication error: {e}")
+            raise
 
     async def make_api_request(
         self, 
         endpoint: str, 
         method: str = "GET", 
         data: Optional[Dict[str, Any]] = None,
-        params: Optional[Dict[str, Any]] = None
+        params: Optional[Dict[str, Any]] = None,
+        practice_id: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Make authenticated API request to Athena Health for a practice, by default ATHENA_PRACTICE_ID"""
+        practice_id = practice_id or self.practice_id
+        started = time.perf_counter()
+        outcome = {"cache": "none"}
+        try:
+            return await self._make_api_request(endpoint, method, data, params, practice_id, outcome)
+        finally:
+            self.metrics.observe(
+                "athena_api_request_duration_seconds",
+                time.perf_counter() - started,
+                endpoint=circuit_key(endpoint),
+                method=method,
+                cache=outcome["cache"]
+            )
+
+    async def _make_api_request(
+        self,
+        endpoint: str,
+        method: str,
+        data: Optional[Dict[str, Any]],
+        params: Optional[Dict[str, Any]],
+        practice_id: str,
+        outcome: Dict[str, str]
     ) -> Dict[str, Any]:
-        """Make authenticated API request to Athena Health"""
-        token = await self.authenticate()
+        # Only reads are cached or coalesced; mutations always go upstream individually
+        if method != "GET":
+            return await self.send_api_request(endpoint, method, data, params, practice_id=practice_id)
         
-        headers = {
-            "Authorization": f"Bearer {token}",
-            "Content-Type": "application/json"
-        }
+        ttl = self.cache_ttls.get(endpoint)
+        path = practice_path(practice_id, endpoint)
+        
+        def fetch() -> Awaitable[Dict[str, Any]]:
+            return self.request_coalescer.run(
+                path, params,
+                lambda: self.fetch_reference_data(endpoint, params, practice_id) if ttl
+                else self.send_api_request(endpoint, method, data, params, practice_id=practice_id)
+            )
+        
+        if ttl:
+            return await self.response_cache.get_or_fetch(
+                path, params, ttl, fetch,
+                on_outcome=lambda cache_outcome: outcome.__setitem__("cache", cache_outcome)
+            )
+        return await fetch()
+
+    async def fetch_reference_data(self, endpoint: str, params: Optional[Dict[str, Any]], practice_id: str) -> Dict[str, Any]:
+        """Fetch a cacheable response, revalidating with its ETag and persisting it when the disk cache is enabled"""
+        if self.disk_cache is None:
+            return await self.send_api_request(endpoint, params=params, practice_id=practice_id)
+        
+        key = make_request_key(practice_path(practice_id, endpoint), params)
+        etag = self.disk_cache.etags.get(key)
+        cached = self.response_cache.peek(key) if etag else None
+        
+        response_meta: Dict[str, Any] = {}
+        value = await self.send_api_request(
+            endpoint,
+            params=params,
+            extra_headers={"If-None-Match": etag} if cached is not None else None,
+            response_meta=response_meta,
+            practice_id=practice_id
+        )
+        if value is None:
+            # 304 Not Modified: the cached copy is still current
+            value = cached
+        else:
+            etag = response_meta.get("etag")
+        await self.disk_cache.store(key, value, etag)
+        return value
+
+    async def load_disk_cache(self) -> None:
+        """Warm the response cache from disk, revalidating expired entries in the background"""
+        try:
+            entries = await self.disk_cache.load()
+        except sqlite3.Error as e:
+            logger.warning(f"Could not load disk cache: {e}")
+            return
+        
+        now = time.time()
+        expired = []
+        for key, value, fetched_at in entries:
+            # Keys are practice-qualified; rows written before multi-practice support are skipped
+            parts = split_practice_path(key[0])
+            ttl = self.cache_ttls.get(parts[1]) if parts else None
+            if not ttl:
+                continue
+            age = max(now - fetched_at, 0.0)
+            self.response_cache.set(key, value, ttl, age=age)
+            if age >= ttl:
+                expired.append(key)
+        logger.info(f"Loaded {len(entries)} cached responses from disk, revalidating {len(expired)}")
+        
+        if expired:
+            self._disk_cache_task = asyncio.create_task(self._revalidate_disk_entries(expired))
+
+    async def _revalidate_disk_entries(self, keys: List[CacheKey]) -> None:
+        for path, params in keys:
+            practice_id, endpoint = split_practice_path(path)
+            ttl = self.cache_ttls[endpoint]
+            try:
+                value = await self.request_coalescer.run(
+                    path, dict(params),
+                    lambda: self.fetch_reference_data(endpoint, dict(params), practice_id)
+                )
+                self.response_cache.set((path, params), value, ttl)
+            except Exception as e:
+                logger.warning(f"Disk cache revalidation failed for {endpoint}: {e}")
+
+    def get_circuit_breaker(self, endpoint: str, practice_id: Optional[str] = None) -> CircuitBreaker:
+        """Return the circuit breaker shared by all requests to this endpoint of a practice, by default ATHENA_PRACTICE_ID"""
+        key = (practice_id or self.practice_id, circuit_key(endpoint))
+        breaker = self.circuit_breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker(self.circuit_failure_threshold, self.circuit_recovery_timeout)
+            self.circuit_breakers[key] = breaker
+        return breaker
+
+    def new_rate_limiter(self) -> RateLimiter:
+        return RateLimiter(
+            rates=self.rate_limits,
+            burst=self.rate_limit_burst,
+            max_concurrency=self.max_concurrency,
+            min_concurrency=self.min_concurrency
+        )
+
+    def rate_limiter_for(self, practice_id: Optional[str] = None) -> RateLimiter:
+        """Return the practice's rate limiter, creating it on first use"""
+        practice_id = practice_id or self.practice_id
+        limiter = self.rate_limiters.get(practice_id)
+        if limiter is None:
+            limiter = self.rate_limiters[practice_id] = self.new_rate_limiter()
+        return limiter
+
+    async def send_api_request(
+        self, 
+        endpoint: str, 
+        method: str = "GET", 
+        data: Optional[Dict[str, Any]] = None,
+        params: Optional[Dict[str, Any]] = None,
+        extra_headers: Optional[Dict[str, str]] = None,
+        response_meta: Optional[Dict[str, Any]] = None,
+        practice_id: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Send an authenticated request for a practice to Athena Health, bypassing the response cache.
         
-        url = f"{self.base_url}/v1/{self.practice_id}{endpoint}"
+        Idempotent requests are retried with jittered exponential backoff while the retry
+        budget and overall deadline allow; the endpoint's circuit breaker fails fast while
+        Athena is degraded. Returns None for a 304 response to a conditional request, and
+        records the final status, retry count and response ETag in response_meta if one is passed.
+        """
+        if response_meta is None:
+            response_meta = {}
+        started = time.perf_counter()
+        try:
+            return await self._send_with_retries(
+                endpoint, method, data, params, extra_headers, response_meta, practice_id or self.practice_id
+            )
+        except CircuitOpenError:
+            response_meta["status"] = "circuit_open"
+            raise
+        except Exception:
+            response_meta.setdefault("status", "error")
+            raise
+        finally:
+            self.metrics.observe(
+                "athena_upstream_request_duration_seconds",
+                time.perf_counter() - started,
+                endpoint=circuit_key(endpoint),
+                method=method,
+                status=response_meta.get("status", "error"),
+                retries=response_meta.get("retries", 0)
+            )
+
+    async def _send_with_retries(
+        self,
+        endpoint: str,
+        method: str,
+        data: Optional[Dict[str, Any]],
+        params: Optional[Dict[str, Any]],
+        extra_headers: Optional[Dict[str, str]],
+        response_meta: Dict[str, Any],
+        practice_id: str
+    ) -> Optional[Dict[str, Any]]:
+        policy = self.retry_policy
+        breaker = self.get_circuit_breaker(endpoint, practice_id)
+        deadline = time.monotonic() + policy.deadline
+        policy.record_request()
         
-        async with aiohttp.ClientSession() as session:
+        for attempt in range(policy.max_attempts):
+            breaker.before_request(endpoint)
+            # Status of this attempt; a timeout or connection error leaves it unset
+            response_meta.pop("status", None)
+            response_meta.pop("sent", None)
             try:
-                async with session.request(
-                    method,
-                    url,
-                    headers=headers,
-                    json=data,
-                    params=params
-                ) as response:
-                    if response.status in [200, 201]:
-                        return await response.json()
+                result = await self._send_once(endpoint, method, data, params, extra_headers, response_meta, practice_id, deadline)
+            except Exception as e:
+                # Only requests that reached Athena say anything about its health; time spent
+                # waiting for a token or a rate limit slot is local queueing
+                if response_meta.get("sent"):
+                    # Client errors mean our request was wrong, not that Athena is unhealthy
+                    if not isinstance(e, AthenaAPIError) or e.status >= 500:
+                        breaker.record_failure()
                     else:
-                        error_text = await response.text()
-                        logger.error(f"API request failed: {response.status} - {error_text}")
-                        raise Exception(f"API request failed: {response.status} - {error_text}")
-                        
+                        breaker.record_success()
+                
+                if attempt + 1 >= policy.max_attempts or not policy.is_retryable(method, e):
+                    raise e
+                delay = policy.backoff(attempt, getattr(e, "retry_after", None))
+                if time.monotonic() + delay >= deadline or not policy.try_spend():
+                    raise e
+                logger.warning(f"Retrying {method} {endpoint} in {delay:.2f}s after error: {e}")
+                response_meta["retries"] = attempt + 1
+                self.metrics.inc("athena_upstream_retries_total", endpoint=circuit_key(endpoint))
+                await asyncio.sleep(delay)
+                continue
+            
+            breaker.record_success()
+            return result
+
+    async def _send_once(
+        self, 
+        endpoint: str, 
+        method: str, 
+        data: Optional[Dict[str, Any]],
+        params: Optional[Dict[str, Any]],
+        extra_headers: Optional[Dict[str, str]],
+        response_meta: Dict[str, Any],
+        practice_id: str,
+        deadline: float
+    ) -> Optional[Dict[str, Any]]:
+        url = f"{self.base_url}/v1/{practice_id}{endpoint}"
+        session = await self.get_session()
+        token_manager = self.token_manager_for(practice_id)
+        rate_limiter = self.rate_limiter_for(practice_id)
+        label = circuit_key(endpoint)
+        
+        def observe_phase(phase: str, seconds: float) -> None:
+            self.metrics.observe("athena_upstream_phase_duration_seconds", seconds, endpoint=label, phase=phase)
+        
+        async def exchange(headers: Dict[str, str], retry_unauthorized: bool) -> Tuple[int, Optional[Dict[str, Any]]]:
+            trace: Dict[str, float] = {}
+            sent_at = time.monotonic()
+            started = time.perf_counter()
+            async with session.request(
+                method,
+                url,
+                headers=headers,
+                json=data,
+                params=params,
+                trace_request_ctx=trace
+            ) as response:
+                # Time to first response headers, split into waiting for a connection and the upstream response
+                elapsed = time.perf_counter() - started
+                connection = trace.get("connection", 0.0)
+                observe_phase("connection", connection)
+                observe_phase("response", max(elapsed - connection, 0.0))
+                response_meta["status"] = response.status
+                retry_after = parse_retry_after(response.headers.get("Retry-After"))
+                rate_limiter.record_response(response.status, retry_after, sent_at)
+                
+                if response.status == 401 and retry_unauthorized:
+                    return response.status, None
+                response_meta["etag"] = response.headers.get("ETag")
+                if response.status == 304 and extra_headers:
+                    return response.status, None
+                if response.status in [200, 201]:
+                    started = time.perf_counter()
+                    result = await response.json()
+                    observe_phase("decode", time.perf_counter() - started)
+                    return response.status, result
+                else:
+                    error_text = await response.text()
+                    logger.error(f"API request failed: {response.status} - {error_text}")
+                    raise AthenaAPIError(response.status, error_text, retry_after)
+        
+        # A 401 means the token was revoked or expired early: refresh it and retry exactly once
+        for attempt in range(2):
+            started = time.perf_counter()
+            token = await token_manager.get_token()
+            observe_phase("token", time.perf_counter() - started)
+            
+            headers = {
+                "Authorization": f"Bearer {token}",
+                "Content-Type": "application/json",
+                **(extra_headers or {})
+            }
+            
+            try:
+                started = time.perf_counter()
+                async with rate_limiter.throttle(method):
+                    observe_phase("throttle", time.perf_counter() - started)
+                    # The attempt timeout covers only the HTTP exchange, so time spent queued
+                    # for a token or a rate limit slot does not count against it
+                    timeout = min(self.retry_policy.attempt_timeout, deadline - time.monotonic())
+                    if timeout <= 0:
+                        raise TimeoutError(f"API request to {endpoint} missed its deadline while queued")
+                    response_meta["sent"] = True
+                    try:
+                        status, result = await asyncio.wait_for(exchange(headers, attempt == 0), timeout=timeout)
+                    except asyncio.TimeoutError:
+                        raise TimeoutError(f"API request to {endpoint} timed out after {timeout:.1f}s")
             except Exception as e:
                 logger.error(f"API request error: {e}")
                 raise
+            
+            if status == 401 and attempt == 0:
+                logger.warning(f"Access token rejected for {endpoint}, refreshing and retrying")
+                token_manager.invalidate(token)
+                continue
+            return result
 
-    def setup_handlers(self):
-        """Setup MCP server handlers"""
+    def paginate(
+        self,
+        endpoint: str,
+        list_key: str,
+        params: Optional[Dict[str, Any]] = None,
+        page_size: Optional[int] = None,
+        max_results: Optional[int] = None,
+        prefetch: bool = True,
+        practice_id: Optional[str] = None
+    ) -> Paginator:
+        """Return a Paginator that streams every page of a list endpoint"""
+        base_params = dict(params or {})
+        return Paginator(
+            lambda page_params: self.make_api_request(
+                endpoint, params={**base_params, **page_params}, practice_id=practice_id
+            ),
+            list_key,
+            page_size=page_size or self.page_size,
+            max_results=max_results,
+            prefetch=prefetch
+        )
+
+    async def fetch_all_pages(
+        self,
+        endpoint: str,
+        list_key: str,
+        params: Dict[str, Any],
+        args: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Collect pages of a list endpoint up to the caller's max_results into one response"""
+        paginator = self.paginate(
+            endpoint,
+            list_key,
+            params=params,
+            page_size=args.get("page_size"),
+            max_results=args.get("max_results", self.max_results),
+            practice_id=self.practice_for(args)
+        )
+        records: List[Dict[str, Any]] = []
+        async for page in paginator.pages():
+            records.extend(page)
         
-        @self.server.list_tools()
-        async def handle_list_tools() -> List[Tool]:
-            """List available tools"""
-            return [
-                Tool(
-                    name="get_appointments",
-                    description="Get appointments for a specific date range and optional provider",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "start_date": {
-                                "type": "string",
-                                "description": "Start date in YYYY-MM-DD format"
-                            },
-                            "end_date": {
-                                "type": "string", 
-                                "description": "End date in YYYY-MM-DD format"
-                            },
-                            "provider_id": {
-                                "type": "string",
-                                "description": "Optional provider ID to filter appointments"
-                            },
-                            "department_id": {
-                                "type": "string",
-                                "description": "Optional department ID to filter appointments"
-                            }
+        result: Dict[str, Any] = {list_key: records}
+        result["totalcount"] = paginator.total_count if paginator.total_count is not None else len(records)
+        if paginator.truncated:
+            result["truncated"] = True
+        return result
+
+    async def fan_out(
+        self,
+        queries: List[Dict[str, Any]],
+        fetch: Callable[[Dict[str, Any], Optional[int]], Awaitable[Dict[str, Any]]],
+        list_key: str,
+        max_results: Optional[int] = None,
+        page_size: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """Run sub-queries concurrently and merge their records in date order, de-duplicated by appointment ID.
+        
+        With max_results, queries start in date order and each is passed the budget left after the
+        records of completed queries for earlier date chunks; once those fill it, the remaining
+        queries are skipped. Only as many queries run at once as the budget has pages left, so a
+        small max_results is served by one chunk at a time instead of a full page from every chunk.
+        """
+        page_size = page_size or self.page_size
+        windows = [(query.get("startdate"), query.get("enddate")) for query in queries]
+        first_index = {window: windows.index(window) for window in windows}
+        counts = [0] * len(queries)
+        responses: List[Optional[Dict[str, Any]]] = [None] * len(queries)
+        pending = deque(range(len(queries)))
+        running: Dict[asyncio.Task, int] = {}
+        
+        def budget_for(index: int) -> Optional[int]:
+            if max_results is None:
+                return None
+            # Only records from strictly earlier date chunks can push this chunk's records out
+            return max_results - sum(counts[:first_index[windows[index]]])
+        
+        try:
+            while pending or running:
+                while pending:
+                    budget = budget_for(pending[0])
+                    if budget is not None and budget <= 0:
+                        pending.popleft()
+                        continue
+                    # Every running query fetches at least a page, so run no more than the budget has pages for
+                    parallelism = self.fanout_concurrency if budget is None else min(self.fanout_concurrency, -(-budget // page_size))
+                    if len(running) >= max(parallelism, 1):
+                        break
+                    index = pending.popleft()
+                    running[asyncio.ensure_future(fetch(queries[index], budget))] = index
+                if not running:
+                    break
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    index = running.pop(task)
+                    responses[index] = task.result()
+                    counts[index] = len(responses[index].get(list_key, []))
+        finally:
+            for task in running:
+                task.cancel()
+        
+        records: List[Dict[str, Any]] = []
+        seen = set()
+        for response in responses:
+            for record in (response or {}).get(list_key, []):
+                record_id = record.get("appointmentid")
+                if record_id is not None:
+                    if record_id in seen:
+                        continue
+                    seen.add(record_id)
+                records.append(record)
+        # Department queries for the same dates come back one after another; interleave them by start
+        records.sort(key=record_start_key)
+        
+        # A skipped query may have had records too
+        truncated = any(response is None or response.get("truncated") for response in responses)
+        if max_results is not None and len(records) > max_results:
+            records = records[:max_results]
+            truncated = True
+        
+        result: Dict[str, Any] = {list_key: records, "totalcount": len(records)}
+        if truncated:
+            result["truncated"] = True
+        return result
+
+    def initialization_options(self) -> InitializationOptions:
+        return InitializationOptions(
+            server_name="athena-health-scheduling",
+            server_version="0.1.0",
+            capabilities=self.server.get_capabilities(
+                notification_options=NotificationOptions(),
+                experimental_capabilities={},
+            ),
+        )
+
+    def tool_definitions(self) -> List[Tool]:
+        """Build the tools with their input schemas"""
+        tools = [
+            Tool(
+                name="get_appointments",
+                description="Get appointments for a specific date range and optional provider, following pages up to max_results",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "start_date": {
+                            "type": "string",
+                            "format": "date",
+                            "description": "Start date in YYYY-MM-DD format"
                         },
-                        "required": ["start_date", "end_date"]
-                    }
-                ),
-                Tool(
-                    name="get_available_slots",
-                    description="Get available appointment slots for scheduling",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "department_id": {
-                                "type": "string",
-                                "description": "Department ID"
-                            },
-                            "start_date": {
-                                "type": "string",
-                                "description": "Start date in YYYY-MM-DD format"
-                            },
-                            "end_date": {
-                                "type": "string",
-                                "description": "End date in YYYY-MM-DD format"
-                            }
+                        "end_date": {
+                            "type": "string",
+                            "format": "date",
+                            "description": "End date in YYYY-MM-DD format"
                         },
-                        "required": ["department_id", "start_date", "end_date"]
-                    }
-                ),
-                Tool(
-                    name="create_appointment",
-                    description="Create a new appointment",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "patient_id": {
-                                "type": "string",
-                                "description": "Patient ID"
-                            },
-                            "provider_id": {
-                                "type": "string",
-                                "description": "Provider ID"
-                            },
-                            "department_id": {
-                                "type": "string",
-                                "description": "Department ID"
-                            },
-                            "appointment_type_id": {
-                                "type": "string",
-                                "description": "Appointment type ID"
-                            },
-                            "appointment_date": {
-                                "type": "string",
-                                "description": "Appointment date in YYYY-MM-DD format"
-                            },
-                            "appointment_time": {
-                                "type": "string",
-                                "description": "Appointment time in HH:MM format"
-                            },
-                            "reason_for_visit": {
-                                "type": "string",
-                                "description": "Reason for the visit"
-                            }
+                        "provider_id": {
+                            "type": "string",
+                            "description": "Optional provider ID to filter appointments"
                         },
-                        "required": ["patient_id", "provider_id", "department_id", "appointment_type_id", "appointment_date", "appointment_time"]
-                    }
-                ),
-                Tool(
-                    name="update_appointment",
-                    description="Update an existing appointment",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "appointment_id": {
-                                "type": "string",
-                                "description": "Appointment ID to update"
-                            },
-                            "appointment_date": {
-                                "type": "string",
-                                "description": "New appointment date in YYYY-MM-DD format"
-                            },
-                            "appointment_time": {
-                                "type": "string",
-                                "description": "New appointment time in HH:MM format"
-                            },
-                            "reason_for_visit": {
-                                "type": "string",
-                                "description": "Updated reason for the visit"
-                            },
-                            "notes": {
-                                "type": "string",
-                                "description": "Additional notes"
-                            }
+                        "department_id": {
+                            "type": "string",
+                            "description": "Optional department ID, or comma-separated department IDs, to filter appointments"
+                        },
+                        "max_results": {
+                            "type": "integer",
+                            "description": "Maximum number of records to return across all pages (default 1000)"
+                        },
+                        "page_size": {
+                            "type": "integer",
+                            "description": "Number of records fetched per upstream request (default 100)"
+                        },
+                        "chunk_days": {
+                            "type": "integer",
+                            "description": "Split the date range into chunks of this many days fetched in parallel (default 7)"
+                        }
+                    },
+                    "required": ["start_date", "end_date"]
+                }
+            ),
+            Tool(
+                name="get_available_slots",
+                description="Get available appointment slots for scheduling",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "department_id": {
+                            "type": "string",
+                            "description": "Department ID, or comma-separated department IDs"
+                        },
+                        "start_date": {
+                            "type": "string",
+                            "format": "date",
+                            "description": "Start date in YYYY-MM-DD format"
+                        },
+                        "end_date": {
+                            "type": "string",
+                            "format": "date",
+                            "description": "End date in YYYY-MM-DD format"
+                        },
+                        "chunk_days": {
+                            "type": "integer",
+                            "description": "Split the date range into chunks of this many days fetched in parallel (default 7)"
+                        }
+                    },
+                    "required": ["department_id", "start_date", "end_date"]
+                }
+            ),
+            Tool(
+                name="create_appointment",
+                description="Create a new appointment. If the slot is already taken, nearby open slots are tried automatically and the booked slot is returned",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "patient_id": {
+                            "type": "string",
+                            "description": "Patient ID"
+                        },
+                        "provider_id": {
+                            "type": "string",
+                            "description": "Provider ID"
+                        },
+                        "department_id": {
+                            "type": "string",
+                            "description": "Department ID"
+                        },
+                        "appointment_type_id": {
+                            "type": "string",
+                            "description": "Appointment type ID"
+                        },
+                        "appointment_date": {
+                            "type": "string",
+                            "format": "date",
+                            "description": "Appointment date in YYYY-MM-DD format"
+                        },
+                        "appointment_time": {
+                            "type": "string",
+                            "pattern": "^([01]\\d|2[0-3]):[0-5]\\d$",
+                            "description": "Appointment time in HH:MM format"
+                        },
+                        "reason_for_visit": {
+                            "type": "string",
+                            "description": "Reason for the visit"
+                        },
+                        "max_alternatives": {
+                            "type": "integer",
+                            "description": "Alternative slots to try if the requested slot is taken; 0 to fail instead (default: ATHENA_BOOKING_ALTERNATIVES)"
+                        },
+                        "any_provider": {
+                            "type": "boolean",
+                            "description": "Allow alternatives with other providers in the department (default: false)"
+                        }
+                    },
+                    "required": ["patient_id", "provider_id", "department_id", "appointment_type_id", "appointment_date", "appointment_time"]
+                }
+            ),
+            Tool(
+                name="update_appointment",
+                description="Update an existing appointment",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "appointment_id": {
+                            "type": "string",
+                            "description": "Appointment ID to update"
+                        },
+                        "department_id": {
+                            "type": "string",
+                            "description": "Optional department of the appointment, so only that department's slot inventory is refreshed"
+                        },
+                        "appointment_date": {
+                            "type": "string",
+                            "format": "date",
+                            "description": "New appointment date in YYYY-MM-DD format"
+                        },
+                        "appointment_time": {
+                            "type": "string",
+                            "pattern": "^([01]\\d|2[0-3]):[0-5]\\d$",
+                            "description": "New appointment time in HH:MM format"
+                        },
+                        "reason_for_visit": {
+                            "type": "string",
+                            "description": "Updated reason for the visit"
                         },
-                        "required": ["appointment_id"]
+                        "notes": {
+                            "type": "string",
+                            "description": "Additional notes"
+                        }
+                    },
+                    "required": ["appointment_id"]
+                }
+            ),
+            Tool(
+                name="cancel_appointment",
+                description="Cancel an appointment",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "appointment_id": {
+                            "type": "string",
+                            "description": "Appointment ID to cancel"
+                        },
+                        "department_id": {
+                            "type": "string",
+                            "description": "Optional department of the appointment, so only that department's slot inventory is refreshed"
+                        },
+                        "cancellation_reason": {
+                            "type": "string",
+                            "description": "Reason for cancellation"
+                        }
+                    },
+                    "required": ["appointment_id"]
+                }
+            ),
+            Tool(
+                name="get_providers",
+                description="Get list of providers",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "department_id": {
+                            "type": "string",
+                            "description": "Optional department ID to filter providers"
+                        },
+                        "specialty": {
+                            "type": "string",
+                            "description": "Optional specialty to filter providers"
+                        }
                     }
-                ),
-                Tool(
-                    name="cancel_appointment",
-                    description="Cancel an appointment",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "appointment_id": {
-                                "type": "string",
-                                "description": "Appointment ID to cancel"
-                            },
-                            "cancellation_reason": {
-                                "type": "string",
-                                "description": "Reason for cancellation"
-                            }
+                }
+            ),
+            Tool(
+                name="get_departments",
+                description="Get list of departments",
+                inputSchema={
+                    "type": "object",
+                    "properties": {}
+                }
+            ),
+            Tool(
+                name="get_appointment_types",
+                description="Get available appointment types",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "department_id": {
+                            "type": "string",
+                            "description": "Optional department ID to filter appointment types"
                         },
-                        "required": ["appointment_id"]
+                        "provider_id": {
+                            "type": "string",
+                            "description": "Optional provider ID to filter appointment types"
+                        }
                     }
-                ),
-                Tool(
-                    name="get_providers",
-                    description="Get list of providers",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "department_id": {
-                                "type": "string",
-                                "description": "Optional department ID to filter providers"
-                            },
-                            "specialty": {
-                                "type": "string",
-                                "description": "Optional specialty to filter providers"
-                            }
+                }
+            ),
+            Tool(
+                name="search_patients",
+                description="Search for patients by name, DOB, or phone, following pages up to max_results",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "first_name": {
+                            "type": "string",
+                            "description": "Patient first name"
+                        },
+                        "last_name": {
+                            "type": "string",
+                            "description": "Patient last name"
+                        },
+                        "date_of_birth": {
+                            "type": "string",
+                            "format": "date",
+                            "description": "Date of birth in YYYY-MM-DD format"
+                        },
+                        "phone": {
+                            "type": "string",
+                            "description": "Phone number"
+                        },
+                        "email": {
+                            "type": "string",
+                            "description": "Email address"
+                        },
+                        "fuzzy": {
+                            "type": "boolean",
+                            "description": "Also rank spelling variants and partial matches from patients already fetched by this server; Athena is skipped only when one matches the phone, date of birth or email exactly"
+                        },
+                        "max_results": {
+                            "type": "integer",
+                            "description": "Maximum number of records to return across all pages (default 1000)"
+                        },
+                        "page_size": {
+                            "type": "integer",
+                            "description": "Number of records fetched per upstream request (default 100)"
                         }
                     }
-                ),
-                Tool(
-                    name="get_departments",
-                    description="Get list of departments",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {}
+                }
+            ),
+            Tool(
+                name="get_cache_stats",
+                description="Get response cache hit, miss and eviction statistics and in-flight request coalescing counters",
+                inputSchema={
+                    "type": "object",
+                    "properties": {}
+                }
+            ),
+            Tool(
+                name="clear_cache",
+                description="Invalidate cached reference data so the next call fetches it from Athena",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "endpoint": {
+                            "type": "string",
+                            "description": "Optional endpoint to invalidate, e.g. /providers. Clears everything if neither endpoint nor practice_id is given"
+                        }
                     }
+                }
+            ),
+            Tool(
+                name="get_rate_limit_stats",
+                description="Get client-side rate limiter queue depth, wait times, concurrency limit, retry budget and circuit breaker states",
+                inputSchema={
+                    "type": "object",
+                    "properties": {}
+                }
+            ),
+            Tool(
+                name="get_server_metrics",
+                description="Get per-tool and per-endpoint latency histograms, retries and cache outcomes in Prometheus text format",
+                inputSchema={
+                    "type": "object",
+                    "properties": {}
+                }
+            ),
+            Tool(
+                name="find_open_slots",
+                description=(
+                    "Find the next open appointment slots, e.g. the first free slot for a type in a department after 2pm. "
+                    "Served from the local slot inventory, with Athena queried for dates past its sync horizon. "
+                    "searched_until is the last date searched; truncated means later slots may exist"
                 ),
-                Tool(
-                    name="get_appointment_types",
-                    description="Get available appointment types",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "department_id": {
-                                "type": "string",
-                                "description": "Optional department ID to filter appointment types"
-                            },
-                            "provider_id": {
-                                "type": "string",
-                                "description": "Optional provider ID to filter appointment types"
-                            }
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "department_id": {
+                            "type": "string",
+                            "description": "Department ID"
+                        },
+                        "provider_id": {
+                            "type": "string",
+                            "description": "Optional provider ID"
+                        },
+                        "appointment_type_id": {
+                            "type": "string",
+                            "description": "Optional appointment type ID"
+                        },
+                        "after": {
+                            "type": "string",
+                            "description": "Earliest slot start as YYYY-MM-DD or YYYY-MM-DD HH:MM (default now)"
+                        },
+                        "before": {
+                            "type": "string",
+                            "description": "Optional latest slot start as YYYY-MM-DD or YYYY-MM-DD HH:MM"
+                        },
+                        "earliest_time": {
+                            "type": "string",
+                            "pattern": "^([01]\\d|2[0-3]):[0-5]\\d$",
+                            "description": "Optional earliest time of day in HH:MM format, applied to every day"
+                        },
+                        "latest_time": {
+                            "type": "string",
+                            "pattern": "^([01]\\d|2[0-3]):[0-5]\\d$",
+                            "description": "Optional latest time of day in HH:MM format, applied to every day"
+                        },
+                        "limit": {
+                            "type": "integer",
+                            "description": "Maximum number of slots to return (default 10)"
                         }
-                    }
+                    },
+                    "required": ["department_id"]
+                }
+            ),
+            Tool(
+                name="get_appointment_changes",
+                description=(
+                    "Watch appointments in a date range: returns only appointments added, changed or removed since "
+                    "the cursor from the previous call. Omit the cursor for the full list; the range is then polled in the background"
                 ),
-                Tool(
-                    name="search_patients",
-                    description="Search for patients by name, DOB, or phone",
-                    inputSchema={
-                        "type": "object",
-                        "properties": {
-                            "first_name": {
-                                "type": "string",
-                                "description": "Patient first name"
-                            },
-                            "last_name": {
-                                "type": "string",
-                                "description": "Patient last name"
-                            },
-                            "date_of_birth": {
-                                "type": "string",
-                                "description": "Date of birth in YYYY-MM-DD format"
-                            },
-                            "phone": {
-                                "type": "string",
-                                "description": "Phone number"
-                            },
-                            "email": {
-                                "type": "string",
-                                "description": "Email address"
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "start_date": {
+                            "type": "string",
+                            "format": "date",
+                            "description": "Start date in YYYY-MM-DD format"
+                        },
+                        "end_date": {
+                            "type": "string",
+                            "format": "date",
+                            "description": "End date in YYYY-MM-DD format"
+                        },
+                        "provider_id": {
+                            "type": "string",
+                            "description": "Optional provider ID to filter appointments"
+                        },
+                        "department_id": {
+                            "type": "string",
+                            "description": "Optional department ID, or comma-separated department IDs, to filter appointments"
+                        },
+                        "cursor": {
+                            "type": "string",
+                            "description": "Cursor returned by the previous call for the same range"
+                        }
+                    },
+                    "required": ["start_date", "end_date"]
+                }
+            ),
+            Tool(
+                name="batch",
+                description="Run many tool calls concurrently in one request; results are returned in order with per-item success or error",
+                inputSchema={
+                    "type": "object",
+                    "properties": {
+                        "items": {
+                            "type": "array",
+                            "description": "Tool calls to run",
+                            "items": {
+                                "type": "object",
+                                "properties": {
+                                    "tool": {
+                                        "type": "string",
+                                        "description": "Name of the tool to call"
+                                    },
+                                    "arguments": {
+                                        "type": "object",
+                                        "description": "Arguments for the tool, including optional fields projection"
+                                    }
+                                },
+                                "required": ["tool"]
                             }
+                        },
+                        "max_parallel": {
+                            "type": "integer",
+                            "description": f"Maximum number of items run at the same time (default and upper limit {self.batch_parallelism})"
                         }
-                    }
-                )
-            ]
+                    },
+                    "required": ["items"]
+                }
+            )
+        ]
+        for tool in tools:
+            tool.inputSchema["properties"].update(PRACTICE_PROPERTIES)
+            tool.inputSchema["properties"].update(OUTPUT_PROPERTIES)
+        return tools
+
+    def setup_handlers(self):
+        """Setup MCP server handlers"""
+        # Built once: each tool's schema is compiled into an argument validator and Athena parameter mapping
+        self.tools = self.tool_definitions()
+        self.tool_specs = {tool.name: ToolSpec(tool, getattr(self, tool.name)) for tool in self.tools}
+        
+        @self.server.list_tools()
+        async def handle_list_tools() -> List[Tool]:
+            """List available tools"""
+            return self.tools
 
-        @self.server.call_tool()
+        # Arguments are checked by the compiled validators instead of the SDK's per-call jsonschema validation
+        @self.server.call_tool(validate_input=False)
         async def handle_call_tool(name: str, arguments: Dict[str, Any]) -> List[types.TextContent]:
             """Handle tool calls"""
-            try:
-                if name == "get_appointments":
-                    result = await self.get_appointments(arguments)
-                elif name == "get_available_slots":
-                    result = await self.get_available_slots(arguments)
-                elif name == "create_appointment":
-                    result = await self.create_appointment(arguments)
-                elif name == "update_appointment":
-                    result = await self.update_appointment(arguments)
-                elif name == "cancel_appointment":
-                    result = await self.cancel_appointment(arguments)
-                elif name == "get_providers":
-                    result = await self.get_providers(arguments)
-                elif name == "get_departments":
-                    result = await self.get_departments(arguments)
-                elif name == "get_appointment_types":
-                    result = await self.get_appointment_types(arguments)
-                elif name == "search_patients":
-                    result = await self.search_patients(arguments)
-                else:
-                    raise ValueError(f"Unknown tool: {name}")
-                
-                return [types.TextContent(type="text", text=json.dumps(result, indent=2))]
-                
-            except Exception as e:
-                logger.error(f"Tool call error: {e}")
-                return [types.TextContent(type="text", text=f"Error: {str(e)}")]
+            return await self.handle_call_tool(name, arguments)
+
+    async def handle_call_tool(self, name: str, arguments: Dict[str, Any]) -> List[types.TextContent]:
+        """Run a tool call and serialize its result, reporting errors as text like the MCP handler does"""
+        try:
+            async with self.tool_semaphore:
+                self.tool_calls_in_flight += 1
+                try:
+                    result = await self.call_tool(name, arguments)
+                finally:
+                    self.tool_calls_in_flight -= 1
+            started = time.perf_counter()
+            text = serialize_result(result, arguments)
+            self.metrics.observe(
+                "athena_tool_serialization_seconds",
+                time.perf_counter() - started,
+                tool=name
+            )
+            return [types.TextContent(type="text", text=text)]
+            
+        except Exception as e:
+            logger.error(f"Tool call error: {e}")
+            return [types.TextContent(type="text", text=f"Error: {str(e)}")]
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        """Dispatch a tool call to its implementation and return the unserialized result"""
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await self._dispatch_tool(name, arguments)
+            outcome = "ok"
+            return result
+        except InvalidArgumentsError:
+            outcome = "invalid"
+            raise
+        finally:
+            # Bound label cardinality: names that are not tools share one series
+            tool = name if name in self.tool_specs else "unknown"
+            self.metrics.observe(
+                "athena_tool_duration_seconds",
+                time.perf_counter() - started,
+                tool=tool,
+                outcome=outcome
+            )
+
+    async def _dispatch_tool(self, name: str, arguments: Dict[str, Any]) -> Any:
+        spec = self.tool_specs.get(name)
+        if spec is None:
+            raise ValueError(f"Unknown tool: {name}")
+        # Reject malformed calls before they cost an upstream round trip
+        spec.validate(arguments)
+        return await spec.handler(arguments)
 
     # Tool implementation methods
     async def get_appointments(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Get appointments for date range"""
-        params = {
-            "startdate": args["start_date"],
-            "enddate": args["end_date"]
-        }
-        
-        if "provider_id" in args:
-            params["providerid"] = args["provider_id"]
-        if "department_id" in args:
-            params["departmentid"] = args["department_id"]
-            
-        return await self.make_api_request("/appointments", params=params)
+        params = self.tool_specs["get_appointments"].athena_params(args)
+        queries = plan_range_queries(params, args.get("chunk_days", self.fanout_chunk_days))
+        if len(queries) == 1:
+            return await self.fetch_all_pages("/appointments", "appointments", queries[0], args)
+        return await self.fan_out(
+            queries,
+            lambda query, budget: self.fetch_all_pages("/appointments", "appointments", query, dict(args, max_results=budget)),
+            "appointments",
+            max_results=args.get("max_results", self.max_results),
+            page_size=args.get("page_size")
+        )
+
+    async def get_appointment_changes(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Get appointments added, changed or removed in a date range since the caller's cursor"""
+        query = {"start_date": args["start_date"], "end_date": args["end_date"]}
+        for field in ("provider_id", "department_id"):
+            if field in args:
+                query[field] = str(args[field])
+        practice = await self.get_practice(args)
+        return await practice.feeds.read(query, args.get("cursor"))
 
     async def get_available_slots(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Get available appointment slots"""
+        # Serve from the local slot inventory when it holds fresh data for the whole request
+        # A practice with no state has no inventory yet; asking must not start one
+        practice_id = self.practice_for(args)
+        practice = self.practices.peek(practice_id)
+        departments = [d.strip() for d in str(args["department_id"]).split(",") if d.strip()]
+        start = parse_date(args["start_date"])
+        end = parse_date(args["end_date"])
+        if (practice is not None and start and end and departments
+                and all(practice.slot_store.covers(d, start[0], end[0]) for d in departments)):
+            slot_store = practice.slot_store
+            slots: List[Dict[str, Any]] = []
+            for department_id in departments:
+                slots.extend(slot_store.query(
+                    department_id=department_id,
+                    start=datetime.combine(start[0], dt_time.min),
+                    end=datetime.combine(end[0], dt_time.max)
+                ))
+            # Same order as the live fan-out, so the answer does not depend on where it came from
+            slots.sort(key=record_start_key)
+            return {"appointments": slots, "totalcount": len(slots)}
+        
+        params = self.tool_specs["get_available_slots"].athena_params(args)
+        params["reasonid"] = -1
+        return await self.fetch_slots_live(params, args.get("chunk_days", self.fanout_chunk_days), practice_id)
+
+    async def fetch_slots_live(self, params: Dict[str, Any], chunk_days: int, practice_id: Optional[str] = None) -> Dict[str, Any]:
+        """Query /appointments/open upstream, fanning out large ranges and department lists"""
+        queries = plan_range_queries(params, chunk_days)
+        if len(queries) == 1:
+            return await self.make_api_request("/appointments/open", params=queries[0], practice_id=practice_id)
+        return await self.fan_out(
+            queries,
+            lambda query, budget: self.make_api_request("/appointments/open", params=query, practice_id=practice_id),
+            "appointments"
+        )
+
+    async def fetch_open_slots(
+        self,
+        department_id: str,
+        start: date,
+        end: date,
+        practice_id: Optional[str] = None,
+        provider_id: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Fetch every open slot of one department, optionally for one provider, in a date range"""
         params = {
-            "departmentid": args["department_id"],
-            # "appointmenttypeid": args["appointment_type_id"],
-            "startdate": args["start_date"],
-            "enddate": args["end_date"],
+            "departmentid": department_id,
+            "startdate": start.strftime(DATE_FORMATS[0]),
+            "enddate": end.strftime(DATE_FORMATS[0]),
             "reasonid": -1
         }
+        if provider_id is not None:
+            params["providerid"] = provider_id
+        
+        # Page through each chunk; a truncated inventory would hide open slots from queries and booking alternatives
+        async def fetch(query: Dict[str, Any], budget: Optional[int]) -> Dict[str, Any]:
+            slots: List[Dict[str, Any]] = []
+            async for page in self.paginate("/appointments/open", "appointments", params=query, practice_id=practice_id).pages():
+                slots.extend(page)
+            return {"appointments": slots}
+        
+        result = await self.fan_out(plan_range_queries(params, self.fanout_chunk_days), fetch, "appointments")
+        return result["appointments"]
+
+    async def find_open_slots(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Find the first open slots after a point in time from the local slot inventory"""
+        department_id = str(args["department_id"])
+        after = parse_datetime(args["after"]) if "after" in args else datetime.now()
+        before = parse_datetime(args["before"]) if "before" in args else None
+        if after is None or ("before" in args and before is None):
+            raise ValueError("after and before must be YYYY-MM-DD or YYYY-MM-DD HH:MM")
+        
+        # Slots are only known up to the sync horizon. On the first query for a department, or once
+        # its data has gone stale, sync it now; the background task keeps it fresh afterwards
+        practice = await self.get_practice(args)
+        slot_store = practice.slot_store
+        await slot_store.sync_department(department_id, if_stale=True)
         
-        return await self.make_api_request("/appointments/open", params=params)
+        limit = args.get("limit", 10)
+        provider_id = str(args["provider_id"]) if "provider_id" in args else None
+        appointment_type_id = str(args["appointment_type_id"]) if "appointment_type_id" in args else None
+        earliest_time = parse_time(args["earliest_time"]) if "earliest_time" in args else None
+        latest_time = parse_time(args["latest_time"]) if "latest_time" in args else None
+        slots = slot_store.query(
+            department_id=department_id,
+            provider_id=provider_id,
+            appointment_type_id=appointment_type_id,
+            start=after,
+            end=before,
+            earliest_time=earliest_time,
+            latest_time=latest_time,
+            limit=limit
+        )
+        horizon = slot_store.synced[department_id][2]
+        searched_until = horizon
+        
+        # Past the sync horizon nothing is known locally, which must not read as "no availability":
+        # ask Athena for the rest of the range, or one more horizon's worth of days if it is open-ended
+        if len(slots) < limit and (before is None or before.date() > horizon):
+            start = max(after.date(), horizon + timedelta(days=1))
+            end = before.date() if before is not None else start + timedelta(days=slot_store.sync_days - 1)
+            beyond = []
+            for slot in await self.fetch_slot_window(practice, department_id, provider_id, start, end):
+                slot_start = SlotStore.slot_start(slot)
+                if slot_start is None or slot_start < after or (before is not None and slot_start > before):
+                    continue
+                if earliest_time is not None and slot_start.time() < earliest_time:
+                    continue
+                if latest_time is not None and slot_start.time() > latest_time:
+                    continue
+                if appointment_type_id is None or str(slot.get("appointmenttypeid")) == appointment_type_id:
+                    beyond.append((slot_start, slot))
+            beyond.sort(key=lambda item: item[0])
+            slots = slots + [slot for _, slot in beyond[:limit - len(slots)]]
+            searched_until = end
+        
+        result: Dict[str, Any] = {"appointments": slots, "totalcount": len(slots), "searched_until": searched_until.isoformat()}
+        if before is None and len(slots) < limit:
+            # Later slots may exist beyond the searched range
+            result["truncated"] = True
+        return result
+
+    async def fetch_slot_window(
+        self, practice: PracticeState, department_id: str, provider_id: Optional[str], start: date, end: date
+    ) -> List[Dict[str, Any]]:
+        """Fetch open slots of a date range from Athena, sharing the response with other callers for the hold TTL"""
+        window_key = (department_id, provider_id, start, end)
+        fetched = practice.slot_holds.recent_window(window_key)
+        if fetched is None:
+            fetched = await self.fetch_open_slots(department_id, start, end, practice.practice_id, provider_id)
+            practice.slot_holds.remember_window(window_key, fetched)
+        return fetched
 
     async def create_appointment(self, args: Dict[str, Any]) -> Dict[str, Any]:
-        """Create a new appointment"""
-        data = {
-            "patientid": args["patient_id"],
-            "providerid": args["provider_id"],
-            "departmentid": args["department_id"],
-            "appointmenttypeid": args["appointment_type_id"],
-            "appointmentdate": args["appointment_date"],
-            "appointmenttime": args["appointment_time"]
+        """Create a new appointment, falling back to ranked alternative slots if the requested one is taken"""
+        practice = await self.get_practice(args)
+        requested = {
+            "departmentid": str(args["department_id"]),
+            "providerid": str(args["provider_id"]),
+            "appointmenttypeid": str(args["appointment_type_id"]),
+            "date": args["appointment_date"],
+            "starttime": args["appointment_time"]
         }
+        requested_start = SlotStore.slot_start(requested)
+        if requested_start is None:
+            raise ValueError("appointment_date must be YYYY-MM-DD or MM/DD/YYYY and appointment_time HH:MM")
+        
+        max_alternatives = max(args.get("max_alternatives", self.booking_alternatives), 0)
+        alternatives: Optional[List[Dict[str, Any]]] = None
+        conflicts: List[Dict[str, Any]] = []
+        tried = set()
+        slot: Optional[Dict[str, Any]] = requested
+        while slot is not None:
+            key = slot_key(slot)
+            tried.add(key)
+            result = await self.book_slot(practice, args, slot, key)
+            if result is not None:
+                return {
+                    "appointment": result,
+                    "booked_slot": slot,
+                    "alternative": slot is not requested,
+                    "conflicts": conflicts
+                }
+            
+            conflicts.append(slot)
+            if len(conflicts) > max_alternatives:
+                break
+            if alternatives is None:
+                alternatives = await self.rank_alternative_slots(practice, requested, requested_start, args.get("any_provider", False))
+            # Skip slots another caller is booking right now, so racing callers spread out instead of queueing
+            slot = next(
+                (
+                    alternative for alternative in alternatives
+                    if slot_key(alternative) not in tried and not practice.slot_holds.is_busy(slot_key(alternative))
+                ),
+                None
+            )
         
-        if "reason_for_visit" in args:
-            data["reasonforvisit"] = args["reason_for_visit"]
+        raise SlotConflictError(
+            f"The requested slot is not available and no alternative could be booked ({len(conflicts)} slots tried)"
+        )
+
+    async def book_slot(
+        self, practice: PracticeState, args: Dict[str, Any], slot: Dict[str, Any], key: SlotKey
+    ) -> Optional[Any]:
+        """Book one slot, returning Athena's response, or None if the slot was already taken"""
+        slot_holds = practice.slot_holds
+        slot_store = practice.slot_store
+        department_id = slot["departmentid"]
+        async with slot_holds.lock(key):
+            if slot_holds.is_held(key):
+                slot_holds.local_conflicts += 1
+                self.metrics.inc("athena_booking_attempts_total", outcome="local_conflict")
+                return None
+            
+            data = {
+                "patientid": args["patient_id"],
+                "providerid": slot["providerid"],
+                "departmentid": department_id,
+                "appointmenttypeid": args["appointment_type_id"],
+                "appointmentdate": slot["date"],
+                "appointmenttime": slot["starttime"]
+            }
+            if "reason_for_visit" in args:
+                data["reasonforvisit"] = args["reason_for_visit"]
+            
+            try:
+                result = await self.make_api_request("/appointments", method="POST", data=data, practice_id=practice.practice_id)
+            except AthenaAPIError as e:
+                if e.status != 409:
+                    raise
+                # Someone else got the slot first: hold it so later attempts here fail without a round trip
+                slot_holds.hold(key)
+                slot_holds.conflicts += 1
+                self.metrics.inc("athena_booking_attempts_total", outcome="conflict")
+                slot_store.remove_matching(department_id, slot["providerid"], slot["date"], slot["starttime"])
+                slot_store.mark_dirty(department_id)
+                return None
             
-        return await self.make_api_request("/appointments", method="POST", data=data)
+            # The booked slot is no longer open; re-sync the department in case Athena split or merged slots
+            appointment_ids = [
+                str(appointment["appointmentid"])
+                for appointment in (result if isinstance(result, list) else [result])
+                if isinstance(appointment, dict) and appointment.get("appointmentid") is not None
+            ]
+            slot_holds.hold(key, appointment_ids[0] if appointment_ids else None)
+            slot_holds.booked += 1
+            self.metrics.inc("athena_booking_attempts_total", outcome="booked")
+            slot_store.remove_matching(department_id, slot["providerid"], slot["date"], slot["starttime"])
+            for appointment_id in appointment_ids:
+                slot_store.track_appointment(appointment_id, department_id)
+            slot_store.mark_dirty(department_id)
+            return result
+
+    async def rank_alternative_slots(
+        self, practice: PracticeState, requested: Dict[str, Any], requested_start: datetime, any_provider: bool
+    ) -> List[Dict[str, Any]]:
+        """Open slots of the same department and appointment type near the requested time, best first.
+        
+        Slots with the requested provider come first, then the rest by distance from the requested start.
+        """
+        slot_store = practice.slot_store
+        department_id = requested["departmentid"]
+        provider_id = None if any_provider else requested["providerid"]
+        window = timedelta(hours=self.booking_window_hours)
+        start = max(requested_start - window, datetime.now())
+        end = requested_start + window
+        
+        if end.date() < date.today() + timedelta(days=slot_store.sync_days):
+            try:
+                await slot_store.sync_department(department_id, if_stale=True)
+            except Exception:
+                pass
+        if slot_store.covers(department_id, start.date(), end.date()):
+            slots = slot_store.query(
+                department_id=department_id,
+                provider_id=provider_id,
+                appointment_type_id=requested["appointmenttypeid"],
+                start=start,
+                end=end
+            )
+        else:
+            # Beyond the synced horizon: fetch just this window from Athena
+            try:
+                fetched = await self.fetch_slot_window(practice, department_id, provider_id, start.date(), end.date())
+            except Exception:
+                return []
+            slots = [
+                slot for slot in fetched
+                if (provider_id is None or str(slot.get("providerid")) == provider_id)
+                and str(slot.get("appointmenttypeid")) == requested["appointmenttypeid"]
+                and start <= (SlotStore.slot_start(slot) or datetime.min) <= end
+            ]
+        
+        return sorted(
+            slots,
+            key=lambda slot: (
+                str(slot.get("providerid")) != requested["providerid"],
+                abs(SlotStore.slot_start(slot) - requested_start)
+            )
+        )
 
     async def update_appointment(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Update an existing appointment"""
         appointment_id = args["appointment_id"]
-        data = {}
-        
-        if "appointment_date" in args:
-            data["appointmentdate"] = args["appointment_date"]
-        if "appointment_time" in args:
-            data["appointmenttime"] = args["appointment_time"]
-        if "reason_for_visit" in args:
-            data["reasonforvisit"] = args["reason_for_visit"]
-        if "notes" in args:
-            data["notes"] = args["notes"]
-            
-        return await self.make_api_request(f"/appointments/{appointment_id}", method="PUT", data=data)
+        data = self.tool_specs["update_appointment"].athena_params(args)
+        # department_id only tells us which inventory to refresh; it is not a change to the appointment
+        data.pop("departmentid", None)
+        practice_id = self.practice_for(args)
+        result = await self.make_api_request(
+            f"/appointments/{appointment_id}", method="PUT", data=data, practice_id=practice_id
+        )
+        # Only a practice that already holds inventory has anything to refresh
+        practice = self.practices.peek(practice_id)
+        if practice is not None:
+            practice.slot_store.mark_dirty(appointment_department(practice.slot_store, str(appointment_id), result, args))
+        return result
 
     async def cancel_appointment(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Cancel an appointment"""
         appointment_id = args["appointment_id"]
-        data = {"appointmentstatus": "x"}  # 'x' typically means cancelled
-        
-        if "cancellation_reason" in args:
-            data["cancellationreason"] = args["cancellation_reason"]
-            
-        return await self.make_api_request(f"/appointments/{appointment_id}", method="PUT", data=data)
+        data = self.tool_specs["cancel_appointment"].athena_params(args)
+        data.pop("departmentid", None)
+        data["appointmentstatus"] = "x"  # 'x' typically means cancelled
+        practice_id = self.practice_for(args)
+        result = await self.make_api_request(
+            f"/appointments/{appointment_id}", method="PUT", data=data, practice_id=practice_id
+        )
+        # A cancelled appointment may reopen its slot
+        practice = self.practices.peek(practice_id)
+        if practice is not None:
+            practice.slot_holds.release_appointment(str(appointment_id))
+            practice.slot_store.mark_dirty(appointment_department(practice.slot_store, str(appointment_id), result, args))
+        return result
 
     async def get_providers(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Get list of providers"""
-        params = {}
-        
-        if "department_id" in args:
-            params["departmentid"] = args["department_id"]
-        if "specialty" in args:
-            params["specialty"] = args["specialty"]
-            
-        return await self.make_api_request("/providers", params=params)
+        params = self.tool_specs["get_providers"].athena_params(args)
+        return await self.make_api_request("/providers", params=params, practice_id=self.practice_for(args))
 
     async def get_departments(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Get list of departments"""
-        return await self.make_api_request("/departments")
+        return await self.make_api_request("/departments", practice_id=self.practice_for(args))
 
     async def get_appointment_types(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Get appointment types"""
-        params = {}
-        
-        if "department_id" in args:
-            params["departmentid"] = args["department_id"]
-        if "provider_id" in args:
-            params["providerid"] = args["provider_id"]
-            
-        return await self.make_api_request("/appointmenttypes", params=params)
+        params = self.tool_specs["get_appointment_types"].athena_params(args)
+        return await self.make_api_request("/appointmenttypes", params=params, practice_id=self.practice_for(args))
 
     async def search_patients(self, args: Dict[str, Any]) -> Dict[str, Any]:
         """Search for patients"""
-        params = {}
-        
-        if "first_name" in args:
-            params["firstname"] = args["first_name"]
-        if "last_name" in args:
-            params["lastname"] = args["last_name"]
-        if "date_of_birth" in args:
-            params["dob"] = args["date_of_birth"]
-        if "phone" in args:
-            params["homephone"] = args["phone"]
-        if "email" in args:
-            params["email"] = args["email"]
-            
-        return await self.make_api_request("/patients", params=params)
+        params = self.tool_specs["search_patients"].athena_params(args)
+        patient_index = (await self.get_practice(args)).patient_index
+        matches: List[Tuple[float, Dict[str, Any]]] = []
+        if args.get("fuzzy"):
+            matches = patient_index.search(
+                first_name=args.get("first_name"),
+                last_name=args.get("last_name"),
+                date_of_birth=args.get("date_of_birth"),
+                phone=args.get("phone"),
+                email=args.get("email"),
+                limit=args.get("max_results", 10)
+            )
+            # A similar name alone may be a different patient, so only an exact phone, date of birth
+            # or email match is trusted without asking Athena
+            strong_keys = {field: args.get(field) for field in ("date_of_birth", "phone", "email")}
+            if any(patient_index.strong_match(patient, **strong_keys) for _, patient in matches):
+                patients = [dict(patient, matchscore=round(score, 3)) for score, patient in matches]
+                return {"patients": patients, "totalcount": len(patients), "source": "local_index"}
+        
+        result = await self.fetch_all_pages("/patients", "patients", params, args)
+        for patient in result.get("patients", []):
+            patient_index.add(patient)
+        if not args.get("fuzzy"):
+            return result
+        
+        # Athena matches exactly; add the indexed near matches it missed, e.g. misspelled names
+        found = {str(patient.get("patientid")) for patient in result.get("patients", [])}
+        extra = [
+            dict(patient, matchscore=round(score, 3))
+            for score, patient in matches
+            if str(patient.get("patientid")) not in found
+        ]
+        result = dict(result, patients=result.get("patients", []) + extra, source="athena")
+        if extra:
+            result["totalcount"] = result.get("totalcount", 0) + len(extra)
+            result["source"] = "athena+local_index"
+        return result
+
+    async def get_cache_stats(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Get response cache statistics"""
+        stats = self.response_cache.stats()
+        stats["ttls"] = self.cache_ttls
+        stats["coalescing"] = self.request_coalescer.stats()
+        # Reporting must not create state (and a slot sync task) for a practice nobody is using
+        practice_id = self.practice_for(args)
+        practice = self.practices.peek(practice_id)
+        stats["practice_id"] = practice_id
+        stats["practice_active"] = practice is not None
+        if practice is not None:
+            stats["slot_store"] = practice.slot_store.stats()
+            stats["slot_holds"] = practice.slot_holds.stats()
+            stats["appointment_feeds"] = practice.feeds.stats()
+            stats["patient_index"] = practice.patient_index.stats()
+        stats["practices"] = self.practices.stats()
+        return stats
+
+    async def clear_cache(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Invalidate cached responses"""
+        # Everything, one practice's responses, or one endpoint of a practice
+        path = None
+        if args.get("endpoint") or args.get("practice_id"):
+            path = practice_path(self.practice_for(args), args.get("endpoint", ""))
+        removed = self.response_cache.invalidate(path)
+        if self.disk_cache is not None:
+            await self.disk_cache.delete(path)
+        return {"invalidated": removed}
+
+    async def batch(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Run many tool calls concurrently, keeping per-item results in request order"""
+        items = args["items"]
+        if len(items) > self.batch_max_items:
+            raise ValueError(f"Batch has {len(items)} items, the maximum is {self.batch_max_items}")
+        # Items bypass tool_semaphore, so the server-wide setting caps how many one batch may run at once
+        semaphore = asyncio.Semaphore(max(min(args.get("max_parallel", self.batch_parallelism), self.batch_parallelism), 1))
+        
+        async def run(index: int, item: Dict[str, Any]) -> Dict[str, Any]:
+            name = item.get("tool")
+            arguments = item.get("arguments") or {}
+            if "practice_id" in args and "practice_id" not in arguments:
+                # Items default to the batch's practice
+                arguments = {**arguments, "practice_id": args["practice_id"]}
+            try:
+                if name == "batch":
+                    raise ValueError("Batches cannot be nested")
+                async with semaphore:
+                    result = await self.call_tool(name, arguments)
+                if arguments.get("fields"):
+                    result = project_fields(result, arguments["fields"])
+                return {"index": index, "tool": name, "ok": True, "result": result}
+            except Exception as e:
+                logger.error(f"Batch item {index} ({name}) error: {e}")
+                return {"index": index, "tool": name, "ok": False, "error": str(e)}
+        
+        results = await asyncio.gather(*(run(index, item) for index, item in enumerate(items)))
+        succeeded = sum(1 for result in results if result["ok"])
+        return {
+            "results": results,
+            "succeeded": succeeded,
+            "failed": len(results) - succeeded
+        }
+
+    async def get_rate_limit_stats(self, args: Dict[str, Any]) -> Dict[str, Any]:
+        """Get a practice's rate limiter and circuit breaker statistics, and the shared retry budget"""
+        practice_id = self.practice_for(args)
+        # An unused practice reports a fresh limiter rather than registering one
+        stats = (self.rate_limiters.get(practice_id) or self.new_rate_limiter()).stats()
+        stats["practice_id"] = practice_id
+        stats["retry"] = self.retry_policy.stats()
+        stats["circuit_breakers"] = {
+            endpoint: breaker.stats()
+            for (breaker_practice, endpoint), breaker in self.circuit_breakers.items()
+            if breaker_practice == practice_id
+        }
+        return stats
+
+    async def get_server_metrics(self, args: Dict[str, Any]) -> str:
+        """Get latency histograms and counters in Prometheus text format"""
+        return self.metrics.render()
 
 async def main():
     """Main function to run the MCP server"""
     mcp = AthenaHealthMCP()
     
+    # One long-running process can serve many clients over HTTP
+    if os.getenv("ATHENA_TRANSPORT", "stdio") == "http":
+        await serve_http(mcp)
+        return
+    
     # Run the server using stdin/stdout streams
     from mcp.server.stdio import stdio_server
     
-    async with stdio_server() as (read_stream, write_stream):
-        await mcp.server.run(
-            read_stream,
-            write_stream,
-            InitializationOptions(
-                server_name="athena-health-scheduling",
-                server_version="0.1.0",
-                capabilities=mcp.server.get_capabilities(
-                    notification_options=NotificationOptions(),
-                    experimental_capabilities={},
-                ),
-            ),
+    await mcp.start()
+    try:
+        async with stdio_server() as (read_stream, write_stream):
+            await mcp.server.run(
+                read_stream,
+                write_stream,
+                mcp.initialization_options(),
+            )
+    finally:
+        await mcp.close()
+
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "::1")
+
+class BearerAuthMiddleware:
+    """ASGI middleware rejecting HTTP requests without the configured bearer token.
+    
+    Written against raw ASGI rather than BaseHTTPMiddleware so SSE streams pass through unbuffered.
+    """
+    
+    def __init__(self, app, token: str):
+        self.app = app
+        self.expected = f"Bearer {token}".encode()
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        authorization = dict(scope["headers"]).get(b"authorization", b"")
+        if hmac.compare_digest(authorization, self.expected):
+            await self.app(scope, receive, send)
+            return
+        from starlette.responses import JSONResponse
+        response = JSONResponse({"error": "unauthorized"}, status_code=401, headers={"WWW-Authenticate": "Bearer"})
+        await response(scope, receive, send)
+
+def create_http_app(mcp: AthenaHealthMCP):
+    """Build an ASGI app serving MCP over streamable HTTP at /mcp and legacy SSE at /sse.
+    
+    Every client session runs against the same AthenaHealthMCP, so they share its token,
+    connection pool, caches, rate limiter and slot inventory. Clients must send
+    ATHENA_HTTP_AUTH_TOKEN as a bearer token if it is set; it is required on any
+    non-loopback host, since tools expose patient data and act with the server's credentials.
+    """
+    from starlette.applications import Starlette
+    from starlette.middleware import Middleware
+    from starlette.responses import Response
+    from starlette.routing import Mount, Route
+    from mcp.server.sse import SseServerTransport
+    from mcp.server.streamable_http_manager import StreamableHTTPSessionManager
+    from mcp.server.transport_security import TransportSecuritySettings
+    
+    loopback = mcp.http_host in LOOPBACK_HOSTS
+    if not loopback and not mcp.http_auth_token:
+        raise ValueError(f"ATHENA_HTTP_AUTH_TOKEN must be set to serve HTTP on non-loopback host {mcp.http_host}")
+    
+    # Reject requests whose Host or Origin is not expected, so web pages cannot reach the server via DNS rebinding
+    allowed_hosts = mcp.http_allowed_hosts or (["127.0.0.1:*", "localhost:*", "[::1]:*"] if loopback else [])
+    allowed_origins = mcp.http_allowed_origins or (
+        ["http://127.0.0.1:*", "http://localhost:*", "http://[::1]:*"] if loopback else []
+    )
+    # Origins are only checked together with hosts; browsers sending any other Origin are rejected
+    security_settings = None
+    if allowed_hosts:
+        security_settings = TransportSecuritySettings(
+            enable_dns_rebinding_protection=True,
+            allowed_hosts=allowed_hosts,
+            allowed_origins=allowed_origins,
         )
+    session_manager = StreamableHTTPSessionManager(
+        app=mcp.server,
+        stateless=mcp.http_stateless,
+        security_settings=security_settings,
+    )
+    sse = SseServerTransport("/messages/", security_settings=security_settings)
+    
+    class StreamableHTTPEndpoint:
+        # A class instance, so Starlette routes it as a raw ASGI app
+        async def __call__(self, scope, receive, send) -> None:
+            await session_manager.handle_request(scope, receive, send)
+    
+    async def handle_sse(request) -> Response:
+        async with sse.connect_sse(request.scope, request.receive, request._send) as (read_stream, write_stream):
+            await mcp.server.run(read_stream, write_stream, mcp.initialization_options())
+        return Response()
+    
+    @asynccontextmanager
+    async def lifespan(app) -> AsyncIterator[None]:
+        await mcp.start()
+        try:
+            async with session_manager.run():
+                yield
+        finally:
+            await mcp.close()
+    
+    return Starlette(
+        routes=[
+            Route("/mcp", endpoint=StreamableHTTPEndpoint()),
+            Route("/sse", endpoint=handle_sse),
+            Mount("/messages/", app=sse.handle_post_message),
+        ],
+        middleware=[Middleware(BearerAuthMiddleware, token=mcp.http_auth_token)] if mcp.http_auth_token else [],
+        lifespan=lifespan,
+    )
+
+async def serve_http(mcp: AthenaHealthMCP) -> None:
+    """Serve many MCP clients from this process until SIGINT or SIGTERM.
+    
+    On shutdown the server stops accepting connections, waits up to
+    ATHENA_HTTP_SHUTDOWN_TIMEOUT seconds for in-flight requests, then closes sessions
+    and releases the shared HTTP pool.
+    """
+    import uvicorn
+    
+    config = uvicorn.Config(
+        create_http_app(mcp),
+        host=mcp.http_host,
+        port=mcp.http_port,
+        timeout_graceful_shutdown=mcp.http_shutdown_timeout,
+        log_level="info",
+        access_log=False,
+    )
+    logger.info(f"Serving MCP on http://{mcp.http_host}:{mcp.http_port}/mcp (SSE at /sse)")
+    await uvicorn.Server(config).serve()
 
 if __name__ == "__main__":
     # Required environment variables check
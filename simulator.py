@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Local Athena Health API simulator for benchmarks and development.
+
+Serves the OAuth token endpoint and the practice endpoints this server uses
+(appointments, open slots, providers, departments, appointment types and
+patients) from deterministic, seeded in-memory data. Latency, error rate and
+the maximum page size are configurable. Run standalone and point the MCP
+server at it with ATHENA_BASE_URL:
+
+    python simulator.py --port 8765 --latency 0.05 --error-rate 0.01
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+FIRST_NAMES = [
+    "James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+    "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+    "Thomas", "Sarah", "Charles", "Karen", "Daniel", "Nancy", "Matthew", "Lisa"
+]
+LAST_NAMES = [
+    "Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+    "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson",
+    "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson", "White"
+]
+SPECIALTIES = ["Family Medicine", "Internal Medicine", "Pediatrics", "Cardiology", "Dermatology"]
+PATIENT_SEARCH_FIELDS = ("firstname", "lastname", "dob", "homephone", "email")
+APPOINTMENT_TYPES = [("82", "Office Visit", 15), ("83", "New Patient", 30), ("84", "Follow Up", 15), ("85", "Physical", 30)]
+
+def parse_date(value: str) -> Optional[date]:
+    """Parse a YYYY-MM-DD or MM/DD/YYYY date"""
+    for fmt in ("%Y-%m-%d", "%m/%d/%Y"):
+        try:
+            return datetime.strptime(value, fmt).date()
+        except (TypeError, ValueError):
+            continue
+    return None
+
+class AthenaSimulator:
+    """In-memory Athena API with seeded data, injected latency and injected 503 errors"""
+
+    def __init__(
+        self,
+        practice_ids: Tuple[str, ...] = ("1",),
+        seed: int = 0,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        page_size: int = 100,
+        departments: int = 5,
+        providers_per_department: int = 4,
+        patients: int = 2000,
+        days: int = 30,
+        slot_minutes: int = 30,
+        start_date: Optional[date] = None
+    ):
+        # Every practice serves the same data set
+        self.practice_ids = set(practice_ids)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        # Largest page returned regardless of the limit asked for, like Athena's own cap
+        self.page_size = page_size
+        # Separate generators so injected faults do not change the generated data
+        self.fault_random = random.Random(seed + 1)
+        data_random = random.Random(seed)
+
+        self.requests: Counter = Counter()
+        self.practice_requests: Counter = Counter()
+        self.errors_injected = 0
+        self._runner: Optional[web.AppRunner] = None
+
+        self.departments = [
+            {"departmentid": str(i), "name": f"Department {i}", "state": "MA", "timezonename": "America/New_York"}
+            for i in range(1, departments + 1)
+        ]
+        self.providers = [
+            {
+                "providerid": str(100 + (d - 1) * providers_per_department + p),
+                "firstname": data_random.choice(FIRST_NAMES),
+                "lastname": data_random.choice(LAST_NAMES),
+                "specialty": data_random.choice(SPECIALTIES),
+                "departmentid": str(d)
+            }
+            for d in range(1, departments + 1)
+            for p in range(providers_per_department)
+        ]
+        self.appointment_types = [
+            {"appointmenttypeid": type_id, "name": name, "duration": duration}
+            for type_id, name, duration in APPOINTMENT_TYPES
+        ]
+        self.patients = [
+            {
+                "patientid": str(5000 + i),
+                "firstname": data_random.choice(FIRST_NAMES),
+                "lastname": data_random.choice(LAST_NAMES),
+                "dob": f"{data_random.randint(1, 12):02d}/{data_random.randint(1, 28):02d}/{data_random.randint(1940, 2020)}",
+                "homephone": f"617555{i:04d}",
+                "email": f"patient{i}@example.com"
+            }
+            for i in range(patients)
+        ]
+
+        # Patients indexed by each searchable field's lowercased value
+        self.patient_index: Dict[Tuple[str, str], List[Dict[str, Any]]] = {}
+        for patient in self.patients:
+            for field in PATIENT_SEARCH_FIELDS:
+                self.patient_index.setdefault((field, patient[field].lower()), []).append(patient)
+
+        # Open slots keyed by appointment ID, also indexed by department; booking moves a slot into self.booked
+        self.slots: Dict[str, Dict[str, Any]] = {}
+        self.open_by_department: Dict[str, Dict[str, Dict[str, Any]]] = {d["departmentid"]: {} for d in self.departments}
+        self.booked: Dict[str, Dict[str, Any]] = {}
+        self.dates: Dict[str, date] = {}
+        first_day = start_date or date.today()
+        next_id = 1000000
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            if day.weekday() >= 5:
+                continue
+            for provider in self.providers:
+                minute = 8 * 60
+                while minute < 17 * 60:
+                    type_id, type_name, duration = data_random.choice(APPOINTMENT_TYPES)
+                    slot = {
+                        "appointmentid": str(next_id),
+                        "date": day.strftime("%m/%d/%Y"),
+                        "starttime": f"{minute // 60:02d}:{minute % 60:02d}",
+                        "duration": duration,
+                        "departmentid": provider["departmentid"],
+                        "providerid": provider["providerid"],
+                        "appointmenttypeid": type_id,
+                        "appointmenttype": type_name,
+                        "appointmentstatus": "o"
+                    }
+                    self.dates[slot["appointmentid"]] = day
+                    next_id += 1
+                    minute += slot_minutes
+                    # Roughly a third of the schedule is already booked
+                    if data_random.random() < 0.35:
+                        slot["appointmentstatus"] = "f"
+                        slot["patientid"] = data_random.choice(self.patients)["patientid"] if self.patients else None
+                        self.booked[slot["appointmentid"]] = slot
+                    else:
+                        self.open_slot(slot)
+
+    def open_slot(self, slot: Dict[str, Any]) -> None:
+        self.slots[slot["appointmentid"]] = slot
+        self.open_by_department[slot["departmentid"]][slot["appointmentid"]] = slot
+
+    def make_app(self) -> web.Application:
+        """Build the aiohttp application serving the simulated API"""
+        prefix = "/v1/{practice_id}"
+        app = web.Application(middlewares=[self.inject_faults])
+        app.router.add_get("/simulator/stats", self.handle_stats)
+        app.router.add_post("/oauth2/v1/token", self.handle_token)
+        app.router.add_get(f"{prefix}/departments", self.handle_departments)
+        app.router.add_get(f"{prefix}/providers", self.handle_providers)
+        app.router.add_get(f"{prefix}/appointmenttypes", self.handle_appointment_types)
+        app.router.add_get(f"{prefix}/patients", self.handle_patients)
+        app.router.add_get(f"{prefix}/appointments/open", self.handle_open_slots)
+        app.router.add_get(f"{prefix}/appointments", self.handle_appointments)
+        app.router.add_post(f"{prefix}/appointments", self.handle_book)
+        app.router.add_put(f"{prefix}/appointments/{{appointment_id}}", self.handle_update)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8765) -> str:
+        """Start serving and return the base URL; port 0 picks a free port"""
+        self._runner = web.AppRunner(self.make_app(), access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        port = self._runner.addresses[0][1]
+        return f"http://{host}:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Return request counts per route and the number of injected errors"""
+        return {
+            "requests": sum(self.requests.values()),
+            "by_route": dict(self.requests),
+            "by_practice": dict(self.practice_requests),
+            "errors_injected": self.errors_injected
+        }
+
+    @web.middleware
+    async def inject_faults(self, request: web.Request, handler) -> web.StreamResponse:
+        if request.path.startswith("/simulator/"):
+            return await handler(request)
+        route = request.match_info.route.resource.canonical if request.match_info.route.resource else request.path
+        self.requests[f"{request.method} {route}"] += 1
+        practice_id = request.match_info.get("practice_id")
+        if practice_id is not None:
+            if practice_id not in self.practice_ids:
+                return web.json_response({"error": "Practice not found"}, status=404)
+            self.practice_requests[practice_id] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(max(self.latency + self.fault_random.uniform(-self.jitter, self.jitter), 0.0))
+        if self.error_rate and self.fault_random.random() < self.error_rate:
+            self.errors_injected += 1
+            return web.json_response({"error": "Service temporarily unavailable"}, status=503)
+        return await handler(request)
+
+    def paginate(self, request: web.Request, list_key: str, records: List[Dict[str, Any]]) -> web.Response:
+        """Return one limit/offset page with totalcount and a next link while more records remain"""
+        try:
+            limit = min(int(request.query.get("limit", self.page_size)), self.page_size)
+            offset = max(int(request.query.get("offset", 0)), 0)
+        except ValueError:
+            return web.json_response({"error": "Invalid limit or offset"}, status=400)
+        limit = max(limit, 1)
+        page: Dict[str, Any] = {list_key: records[offset:offset + limit], "totalcount": len(records)}
+        if offset + limit < len(records):
+            query = dict(request.query, offset=str(offset + limit), limit=str(limit))
+            page["next"] = str(request.rel_url.with_query(query))
+        return web.json_response(page)
+
+    @staticmethod
+    def cacheable(request: web.Request, body: Dict[str, Any]) -> web.Response:
+        """Return a reference data response with an ETag, answering If-None-Match with 304"""
+        text = json.dumps(body)
+        etag = '"' + hashlib.sha1(text.encode()).hexdigest() + '"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(text=text, content_type="application/json", headers={"ETag": etag})
+
+    @staticmethod
+    def date_range(request: web.Request) -> Tuple[Optional[date], Optional[date]]:
+        return parse_date(request.query.get("startdate", "")), parse_date(request.query.get("enddate", ""))
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        return web.json_response(self.stats())
+
+    async def handle_token(self, request: web.Request) -> web.Response:
+        form = await request.post()
+        if form.get("grant_type") != "client_credentials" or not request.headers.get("Authorization", "").startswith("Basic "):
+            return web.json_response({"error": "invalid_client"}, status=401)
+        return web.json_response({"access_token": f"sim-{self.fault_random.getrandbits(64):016x}", "expires_in": 3600})
+
+    async def handle_departments(self, request: web.Request) -> web.Response:
+        return self.cacheable(request, {"departments": self.departments, "totalcount": len(self.departments)})
+
+    async def handle_providers(self, request: web.Request) -> web.Response:
+        providers = self.providers
+        if "departmentid" in request.query:
+            providers = [p for p in providers if p["departmentid"] == request.query["departmentid"]]
+        if "specialty" in request.query:
+            providers = [p for p in providers if p["specialty"].lower() == request.query["specialty"].lower()]
+        return self.cacheable(request, {"providers": providers, "totalcount": len(providers)})
+
+    async def handle_appointment_types(self, request: web.Request) -> web.Response:
+        return self.cacheable(request, {"appointmenttypes": self.appointment_types, "totalcount": len(self.appointment_types)})
+
+    async def handle_patients(self, request: web.Request) -> web.Response:
+        filters = [
+            (field, request.query[field].lower())
+            for field in PATIENT_SEARCH_FIELDS
+            if field in request.query
+        ]
+        candidates = min(
+            (self.patient_index.get(key, []) for key in filters),
+            key=len,
+            default=self.patients
+        )
+        patients = [p for p in candidates if all(p[field].lower() == value for field, value in filters)]
+        return self.paginate(request, "patients", patients)
+
+    async def handle_open_slots(self, request: web.Request) -> web.Response:
+        start, end = self.date_range(request)
+        if start is None or end is None:
+            return web.json_response({"error": "startdate and enddate are required"}, status=400)
+        slots = [
+            slot
+            for department_id in request.query.get("departmentid", "").split(",")
+            for slot_id, slot in self.open_by_department.get(department_id, {}).items()
+            if start <= self.dates[slot_id] <= end
+            and slot["providerid"] == request.query.get("providerid", slot["providerid"])
+        ]
+        return self.paginate(request, "appointments", slots)
+
+    async def handle_appointments(self, request: web.Request) -> web.Response:
+        start, end = self.date_range(request)
+        if start is None or end is None:
+            return web.json_response({"error": "startdate and enddate are required"}, status=400)
+        appointments = [
+            appointment for appointment_id, appointment in self.booked.items()
+            if start <= self.dates[appointment_id] <= end
+            and all(appointment[field] == request.query[field] for field in ("providerid", "departmentid") if field in request.query)
+        ]
+        return self.paginate(request, "appointments", appointments)
+
+    async def handle_book(self, request: web.Request) -> web.Response:
+        data = await request.json()
+        appointment_date = parse_date(data.get("appointmentdate", ""))
+        department_slots = self.open_by_department.get(str(data.get("departmentid")), {})
+        for slot_id, slot in department_slots.items():
+            if (
+                slot["providerid"] == str(data.get("providerid"))
+                and slot["starttime"] == data.get("appointmenttime")
+                and self.dates[slot_id] == appointment_date
+            ):
+                del self.slots[slot_id]
+                del department_slots[slot_id]
+                slot.update(appointmentstatus="f", patientid=str(data.get("patientid")))
+                self.booked[slot_id] = slot
+                return web.json_response([slot])
+        return web.json_response({"error": "The appointment slot is not available"}, status=409)
+
+    async def handle_update(self, request: web.Request) -> web.Response:
+        appointment = self.booked.get(request.match_info["appointment_id"])
+        if appointment is None:
+            return web.json_response({"error": "Appointment not found"}, status=404)
+        data = await request.json()
+        if data.get("appointmentstatus") == "x":
+            # Cancelling reopens the slot
+            del self.booked[appointment["appointmentid"]]
+            appointment.pop("patientid", None)
+            appointment["appointmentstatus"] = "o"
+            self.open_slot(appointment)
+            return web.json_response({"status": "x"})
+        for field in ("appointmentdate", "appointmenttime", "reasonforvisit", "notes"):
+            if field in data:
+                if field == "appointmentdate":
+                    self.dates[appointment["appointmentid"]] = parse_date(data[field]) or self.dates[appointment["appointmentid"]]
+                appointment[{"appointmentdate": "date", "appointmenttime": "starttime"}.get(field, field)] = data[field]
+        return web.json_response(appointment)
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--practice-id", default="1", help="comma-separated practice IDs to serve")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="uniform +/- seconds around --latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests failed with 503")
+    parser.add_argument("--page-size", type=int, default=100, help="maximum records per page")
+    parser.add_argument("--patients", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=30, help="days of schedule to generate from today")
+    args = parser.parse_args()
+
+    simulator = AthenaSimulator(
+        practice_ids=tuple(p.strip() for p in args.practice_id.split(",") if p.strip()),
+        seed=args.seed,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        page_size=args.page_size,
+        patients=args.patients,
+        days=args.days
+    )
+    base_url = await simulator.start(args.host, args.port)
+    print(f"Athena simulator listening on {base_url} (practices {args.practice_id})", flush=True)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await simulator.stop()
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,46 @@
+"""Shared fixtures: servers built from a clean environment, and an in-process simulator on a free port"""
+
+import os
+import unittest
+from typing import Any, Dict
+from unittest import mock
+
+from main import AthenaHealthMCP
+from simulator import AthenaSimulator
+
+
+def clean_env(**overrides: str) -> Dict[str, str]:
+    """The current environment without any ATHENA_* settings (including ones loaded from .env), plus test credentials"""
+    env = {key: value for key, value in os.environ.items() if not key.startswith("ATHENA_")}
+    env.update(
+        ATHENA_CLIENT_ID="test",
+        ATHENA_CLIENT_SECRET="test",
+        ATHENA_PRACTICE_ID="1",
+        ATHENA_CACHE_DIR="",
+        ATHENA_RATE_LIMIT_READ="0",
+        ATHENA_RATE_LIMIT_WRITE="0",
+    )
+    env.update(overrides)
+    return env
+
+
+def make_server(**env: str) -> AthenaHealthMCP:
+    """Build a server configured only by clean_env and the given settings"""
+    with mock.patch.dict(os.environ, clean_env(**env), clear=True):
+        return AthenaHealthMCP()
+
+
+class SimulatorTestCase(unittest.IsolatedAsyncioTestCase):
+    """Runs a server against an in-process AthenaSimulator, both closed after each test"""
+
+    async def start_server(self, simulator: AthenaSimulator, **env: str) -> AthenaHealthMCP:
+        base_url = await simulator.start(port=0)
+        self.addAsyncCleanup(simulator.stop)
+        server = make_server(ATHENA_BASE_URL=base_url, **env)
+        self.addAsyncCleanup(server.close)
+        return server
+
+    @staticmethod
+    def route_requests(simulator: AthenaSimulator, method: str, path: str) -> int:
+        """Requests the simulator served for one route, e.g. ("GET", "/appointments")"""
+        return simulator.requests[f"{method} /v1/{{practice_id}}{path}"]
@@ -0,0 +1,158 @@
+"""Appointment feeds report additions, changes and removals since a cursor"""
+
+import unittest
+
+from main import AppointmentFeeds, AppointmentSnapshot
+
+
+def appointment(appointment_id, status="f", **fields):
+    return {"appointmentid": str(appointment_id), "appointmentstatus": status, **fields}
+
+
+class AppointmentSnapshotTest(unittest.TestCase):
+    def test_changes_are_reported_once_per_cursor(self):
+        snapshot = AppointmentSnapshot({"departmentid": "1"})
+        snapshot.apply([appointment(1), appointment(2)])
+        first = snapshot.changes_since(None)
+        self.assertTrue(first["reset"])
+        self.assertEqual({a["appointmentid"] for a in first["added"]}, {"1", "2"})
+        
+        snapshot.apply([appointment(1, status="2"), appointment(3)])
+        second = snapshot.changes_since(snapshot.parse_cursor(first["cursor"]))
+        self.assertFalse(second["reset"])
+        self.assertEqual([a["appointmentid"] for a in second["added"]], ["3"])
+        self.assertEqual([a["appointmentid"] for a in second["changed"]], ["1"])
+        self.assertEqual(second["removed"], ["2"])
+        self.assertEqual(second["totalcount"], 2)
+        
+        # Nothing new since the latest cursor
+        third = snapshot.changes_since(snapshot.parse_cursor(second["cursor"]))
+        self.assertEqual((third["added"], third["changed"], third["removed"]), ([], [], []))
+        self.assertEqual(third["cursor"], second["cursor"])
+
+    def test_unchanged_poll_keeps_the_cursor(self):
+        snapshot = AppointmentSnapshot({})
+        self.assertEqual(snapshot.apply([appointment(1)]), 1)
+        cursor = snapshot.cursor()
+        self.assertEqual(snapshot.apply([appointment(1)]), 0)
+        self.assertEqual(snapshot.cursor(), cursor)
+
+    def test_reappearing_appointment_is_added_again(self):
+        snapshot = AppointmentSnapshot({})
+        snapshot.apply([appointment(1)])
+        snapshot.apply([])
+        cursor = snapshot.parse_cursor(snapshot.cursor())
+        snapshot.apply([appointment(1)])
+        changes = snapshot.changes_since(cursor)
+        self.assertEqual([a["appointmentid"] for a in changes["added"]], ["1"])
+        self.assertEqual(changes["removed"], [])
+
+    def test_incomplete_poll_does_not_remove(self):
+        snapshot = AppointmentSnapshot({})
+        snapshot.apply([appointment(1), appointment(2)])
+        cursor = snapshot.parse_cursor(snapshot.cursor())
+        snapshot.apply([appointment(1), appointment(3)], complete=False)
+        changes = snapshot.changes_since(cursor)
+        self.assertEqual(changes["removed"], [])
+        self.assertEqual([a["appointmentid"] for a in changes["added"]], ["3"])
+        self.assertEqual(changes["totalcount"], 3)
+        self.assertTrue(changes["truncated"])
+        
+        # The next complete poll catches up on the removal
+        snapshot.apply([appointment(1), appointment(3)])
+        changes = snapshot.changes_since(cursor)
+        self.assertEqual(changes["removed"], ["2"])
+        self.assertNotIn("truncated", changes)
+
+    def test_tombstone_overflow_moves_horizon_and_forces_reset(self):
+        snapshot = AppointmentSnapshot({}, max_tombstones=2)
+        snapshot.apply([appointment(i) for i in range(1, 5)])
+        old_cursor = snapshot.cursor()
+        snapshot.apply([appointment(i) for i in range(2, 5)])
+        recent_cursor = snapshot.cursor()
+        snapshot.apply([appointment(i) for i in range(3, 5)])
+        self.assertEqual(snapshot.horizon, 0)
+        snapshot.apply([appointment(4)])
+        
+        # The tombstone for appointment 1 was dropped, so the oldest cursor can no longer be answered
+        self.assertEqual(list(snapshot.removed), ["2", "3"])
+        self.assertEqual(snapshot.horizon, 2)
+        self.assertIsNone(snapshot.parse_cursor(old_cursor))
+        reset = snapshot.changes_since(snapshot.parse_cursor(old_cursor))
+        self.assertTrue(reset["reset"])
+        self.assertEqual([a["appointmentid"] for a in reset["added"]], ["4"])
+        
+        # A cursor at the horizon still gets every removal after it
+        changes = snapshot.changes_since(snapshot.parse_cursor(recent_cursor))
+        self.assertFalse(changes["reset"])
+        self.assertEqual(sorted(changes["removed"]), ["2", "3"])
+
+    def test_cursor_of_another_snapshot_is_rejected(self):
+        first = AppointmentSnapshot({})
+        first.apply([appointment(1)])
+        second = AppointmentSnapshot({})
+        second.apply([appointment(1)])
+        self.assertIsNone(second.parse_cursor(first.cursor()))
+        self.assertIsNone(second.parse_cursor("garbage"))
+        self.assertIsNone(second.parse_cursor(None))
+
+
+class AppointmentFeedsTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.appointments = [appointment(1), appointment(2)]
+        self.truncated = False
+        self.fetches = 0
+        
+        async def fetch(query):
+            self.fetches += 1
+            result = {"appointments": list(self.appointments)}
+            if self.truncated:
+                result["truncated"] = True
+            return result
+        
+        self.feeds = AppointmentFeeds(fetch, poll_interval=0)
+        self.addAsyncCleanup(self.feeds.stop)
+
+    async def test_reads_follow_changes_across_cursors(self):
+        query = {"departmentid": "1"}
+        first = await self.feeds.read(query)
+        self.assertTrue(first["reset"])
+        self.assertEqual(len(first["added"]), 2)
+        
+        self.appointments = [appointment(1, status="3"), appointment(5)]
+        second = await self.feeds.read(query, first["cursor"])
+        self.assertEqual([a["appointmentid"] for a in second["added"]], ["5"])
+        self.assertEqual([a["appointmentid"] for a in second["changed"]], ["1"])
+        self.assertEqual(second["removed"], ["2"])
+        
+        # An unknown cursor gets the full list again
+        reset = await self.feeds.read(query, "unknown-1")
+        self.assertTrue(reset["reset"])
+        self.assertEqual(len(reset["added"]), 2)
+
+    async def test_truncated_fetch_does_not_remove(self):
+        query = {"departmentid": "1"}
+        first = await self.feeds.read(query)
+        self.appointments = [appointment(1)]
+        self.truncated = True
+        changes = await self.feeds.read(query, first["cursor"])
+        self.assertEqual(changes["removed"], [])
+        self.assertTrue(changes["truncated"])
+
+    async def test_fresh_snapshot_is_not_refetched(self):
+        self.feeds.poll_interval = 60
+        query = {"departmentid": "1"}
+        first = await self.feeds.read(query)
+        await self.feeds.read(query, first["cursor"])
+        self.assertEqual(self.fetches, 1)
+        self.assertEqual(self.feeds.stats()["polls"], 1)
+
+    async def test_least_recently_read_feed_is_dropped(self):
+        self.feeds.max_feeds = 2
+        for department_id in ("1", "2", "1", "3"):
+            await self.feeds.read({"departmentid": department_id})
+        self.assertEqual([dict(key)["departmentid"] for key in self.feeds.feeds], ["1", "3"])
+
+
+if __name__ == "__main__":
+    unittest.main()
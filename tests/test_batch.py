@@ -0,0 +1,33 @@
+"""Batch tool concurrency"""
+
+import asyncio
+import unittest
+from typing import Any, Dict
+
+from helpers import make_server
+
+
+class BatchTest(unittest.IsolatedAsyncioTestCase):
+    async def test_max_parallel_is_capped_by_server_setting(self):
+        server = make_server(ATHENA_BATCH_PARALLELISM="3")
+        self.addAsyncCleanup(server.close)
+        
+        running = peak = 0
+        
+        async def call_tool(name: str, arguments: Dict[str, Any]) -> Dict[str, Any]:
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+            return {}
+        
+        server.call_tool = call_tool
+        items = [{"tool": "get_departments"} for _ in range(20)]
+        result = await server.batch({"items": items, "max_parallel": 1000})
+        self.assertEqual(result["succeeded"], 20)
+        self.assertEqual(peak, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+"""DiskCache keeps its ETags in step with the rows it deletes"""
+
+import tempfile
+import unittest
+
+from main import DiskCache
+
+
+class DiskCacheDeleteTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache = DiskCache(self.directory.name)
+        for endpoint in ("/1/providers", "/1/departments", "/1", "/12/providers", "/2/providers"):
+            await self.cache.store((endpoint, ()), {"endpoint": endpoint}, etag=f'"{endpoint}"')
+
+    async def stored_endpoints(self):
+        return sorted(key[0] for key, _, _ in await DiskCache(self.directory.name).load())
+
+    async def test_deleting_a_practice_drops_etags_below_it(self):
+        await self.cache.delete("/1")
+        self.assertEqual(sorted(key[0] for key in self.cache.etags), ["/12/providers", "/2/providers"])
+        self.assertEqual(await self.stored_endpoints(), ["/12/providers", "/2/providers"])
+
+    async def test_deleting_one_endpoint_keeps_its_siblings(self):
+        await self.cache.delete("/1/providers")
+        self.assertNotIn(("/1/providers", ()), self.cache.etags)
+        self.assertIn(("/1/departments", ()), self.cache.etags)
+        self.assertEqual(len(await self.stored_endpoints()), 4)
+
+    async def test_deleting_everything_clears_every_etag(self):
+        await self.cache.delete()
+        self.assertEqual(self.cache.etags, {})
+        self.assertEqual(await self.stored_endpoints(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
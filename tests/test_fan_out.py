@@ -0,0 +1,51 @@
+"""Date-range fan-out of appointment queries"""
+
+import unittest
+from datetime import date, timedelta
+
+from helpers import SimulatorTestCase
+from main import record_start_key
+from simulator import AthenaSimulator
+
+
+class FanOutTest(SimulatorTestCase):
+    async def asyncSetUp(self):
+        self.start_date = date(2030, 1, 7)
+        self.simulator = AthenaSimulator(start_date=self.start_date, patients=50)
+        self.server = await self.start_server(self.simulator)
+
+    def appointment_requests(self) -> int:
+        return self.route_requests(self.simulator, "GET", "/appointments")
+
+    async def get_appointments(self, **args):
+        end_date = self.start_date + timedelta(days=27)
+        return await self.server.call_tool("get_appointments", dict(
+            start_date=self.start_date.strftime("%m/%d/%Y"),
+            end_date=end_date.strftime("%m/%d/%Y"),
+            chunk_days=7,
+            **args
+        ))
+
+    async def test_max_results_limits_upstream_pages(self):
+        result = await self.get_appointments(max_results=20, page_size=20)
+        self.assertEqual(len(result["appointments"]), 20)
+        self.assertTrue(result["truncated"])
+        # The first week alone fills the budget, so the later weeks are never requested
+        self.assertEqual(self.appointment_requests(), 1)
+
+    async def test_records_merge_in_date_order(self):
+        result = await self.get_appointments(department_id="1,2,3")
+        appointments = result["appointments"]
+        self.assertGreater(len(appointments), 20)
+        self.assertEqual(appointments, sorted(appointments, key=record_start_key))
+        self.assertEqual(len({a["appointmentid"] for a in appointments}), len(appointments))
+
+    async def test_truncated_results_keep_the_earliest_records(self):
+        capped = await self.get_appointments(max_results=50, page_size=10)
+        first_week = {(self.start_date + timedelta(days=day)).strftime("%m/%d/%Y") for day in range(7)}
+        self.assertEqual(len(capped["appointments"]), 50)
+        self.assertTrue(all(a["date"] in first_week for a in capped["appointments"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
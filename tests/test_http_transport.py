@@ -0,0 +1,41 @@
+"""Authentication and host checks of the HTTP transport"""
+
+import unittest
+
+from starlette.testclient import TestClient
+
+from helpers import make_server
+from main import create_http_app
+
+
+class HttpAuthTest(unittest.TestCase):
+    def test_non_loopback_host_requires_token(self):
+        with self.assertRaisesRegex(ValueError, "ATHENA_HTTP_AUTH_TOKEN"):
+            create_http_app(make_server(ATHENA_HTTP_HOST="0.0.0.0"))
+
+    def test_requests_without_token_are_rejected(self):
+        app = create_http_app(make_server(ATHENA_HTTP_HOST="0.0.0.0", ATHENA_HTTP_AUTH_TOKEN="secret"))
+        client = TestClient(app, raise_server_exceptions=False)
+        for path in ("/mcp", "/sse", "/messages/"):
+            self.assertEqual(client.get(path).status_code, 401)
+            self.assertEqual(client.get(path, headers={"Authorization": "Bearer wrong"}).status_code, 401)
+
+    def test_requests_with_token_pass(self):
+        app = create_http_app(make_server(ATHENA_HTTP_HOST="0.0.0.0", ATHENA_HTTP_AUTH_TOKEN="secret"))
+        client = TestClient(app, raise_server_exceptions=False)
+        response = client.post("/messages/", headers={"Authorization": "Bearer secret"}, json={})
+        self.assertNotEqual(response.status_code, 401)
+
+    def test_allowed_hosts_are_enforced_on_any_address(self):
+        server = make_server(
+            ATHENA_HTTP_HOST="0.0.0.0",
+            ATHENA_HTTP_AUTH_TOKEN="secret",
+            ATHENA_HTTP_ALLOWED_HOSTS="mcp.example.com"
+        )
+        client = TestClient(create_http_app(server), base_url="http://evil.example.com", raise_server_exceptions=False)
+        response = client.post("/messages/?session_id=00000000000000000000000000000000", headers={"Authorization": "Bearer secret"}, json={})
+        self.assertEqual(response.status_code, 421)
+
+
+if __name__ == "__main__":
+    unittest.main()
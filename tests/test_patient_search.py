@@ -0,0 +1,55 @@
+"""Fuzzy patient search over the local index and Athena"""
+
+import unittest
+
+from helpers import SimulatorTestCase
+from simulator import AthenaSimulator
+
+
+class FuzzySearchTest(SimulatorTestCase):
+    async def asyncSetUp(self):
+        self.simulator = AthenaSimulator(patients=200)
+        self.server = await self.start_server(self.simulator)
+        self.patient = self.simulator.patients[0]
+        # Index the patient by fetching them once
+        await self.server.call_tool("search_patients", {"last_name": self.patient["lastname"]})
+
+    def patient_requests(self) -> int:
+        return self.route_requests(self.simulator, "GET", "/patients")
+
+    async def test_exact_strong_key_is_served_locally(self):
+        before = self.patient_requests()
+        result = await self.server.call_tool("search_patients", {
+            "last_name": self.patient["lastname"] + "e",
+            "date_of_birth": self.patient["dob"],
+            "fuzzy": True
+        })
+        self.assertEqual(result["source"], "local_index")
+        self.assertIn(self.patient["patientid"], [p["patientid"] for p in result["patients"]])
+        self.assertEqual(self.patient_requests(), before)
+
+    async def test_name_only_match_still_queries_athena(self):
+        before = self.patient_requests()
+        result = await self.server.call_tool("search_patients", {
+            "first_name": self.patient["firstname"],
+            "last_name": self.patient["lastname"] + "e",
+            "fuzzy": True
+        })
+        self.assertEqual(self.patient_requests(), before + 1)
+        self.assertEqual(result["source"], "athena+local_index")
+        self.assertIn(self.patient["patientid"], [p["patientid"] for p in result["patients"]])
+
+    async def test_mismatched_strong_key_queries_athena(self):
+        before = self.patient_requests()
+        result = await self.server.call_tool("search_patients", {
+            "first_name": self.patient["firstname"],
+            "last_name": self.patient["lastname"],
+            "phone": "5550000000",
+            "fuzzy": True
+        })
+        self.assertEqual(self.patient_requests(), before + 1)
+        self.assertNotEqual(result["source"], "local_index")
+
+
+if __name__ == "__main__":
+    unittest.main()
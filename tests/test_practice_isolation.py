@@ -0,0 +1,60 @@
+"""Rate limiting and circuit breaking are kept separate per practice"""
+
+import asyncio
+import unittest
+
+from helpers import SimulatorTestCase
+from main import CircuitBreaker, CircuitOpenError
+from simulator import AthenaSimulator
+
+
+class PracticeIsolationTest(SimulatorTestCase):
+    async def asyncSetUp(self):
+        self.simulator = AthenaSimulator(practice_ids=("1", "2"), patients=50)
+        self.server = await self.start_server(
+            self.simulator,
+            ATHENA_PRACTICE_IDS="1,2",
+            ATHENA_RETRY_MAX_ATTEMPTS="1",
+            ATHENA_CIRCUIT_FAILURE_THRESHOLD="3"
+        )
+        # Fetch the token first; token requests are not retried
+        await self.server.token_manager.get_token()
+
+    async def test_throttling_one_practice_leaves_others_alone(self):
+        self.server.rate_limiter_for("1").record_response(429, retry_after=30)
+        await asyncio.wait_for(self.server.send_api_request("/departments", practice_id="2"), timeout=5)
+        self.assertEqual(self.server.rate_limiter_for("2").concurrency.limit, self.server.max_concurrency)
+        self.assertLess(self.server.rate_limiter_for("1").concurrency.limit, self.server.max_concurrency)
+
+    async def test_one_practice_outage_does_not_open_others_breaker(self):
+        self.simulator.error_rate = 1.0
+        for _ in range(3):
+            with self.assertRaises(Exception):
+                await self.server.send_api_request("/patients", params={"lastname": "x"}, practice_id="1")
+        self.simulator.error_rate = 0.0
+        self.assertEqual(self.server.get_circuit_breaker("/patients", "1").state, CircuitBreaker.OPEN)
+        with self.assertRaises(CircuitOpenError):
+            await self.server.send_api_request("/patients", params={"lastname": "x"}, practice_id="1")
+        result = await self.server.send_api_request("/patients", params={"lastname": "x"}, practice_id="2")
+        self.assertEqual(result["patients"], [])
+
+    async def test_stats_report_the_addressed_practice(self):
+        await self.server.send_api_request("/departments", practice_id="2")
+        stats = await self.server.call_tool("get_rate_limit_stats", {"practice_id": "2"})
+        self.assertEqual(stats["practice_id"], "2")
+        self.assertEqual(stats["requests"], 1)
+        self.assertIn("/departments", stats["circuit_breakers"])
+
+    async def test_read_only_calls_do_not_create_idle_practices(self):
+        self.assertIsNone(self.server.practices.peek("2"))
+        stats = await self.server.call_tool("get_cache_stats", {"practice_id": "2"})
+        self.assertFalse(stats["practice_active"])
+        self.assertNotIn("slot_store", stats)
+        await self.server.call_tool("get_available_slots", {
+            "practice_id": "2", "department_id": "1", "start_date": "01/05/2026", "end_date": "01/06/2026"
+        })
+        self.assertIsNone(self.server.practices.peek("2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+"""Which practices tool calls may address"""
+
+import unittest
+
+from helpers import make_server
+
+
+class PracticeForTest(unittest.TestCase):
+    def test_defaults_to_configured_practices(self):
+        server = make_server(ATHENA_PRACTICE_CREDENTIALS="2=other:secret")
+        self.assertEqual(server.practice_for({}), "1")
+        self.assertEqual(server.practice_for({"practice_id": "2"}), "2")
+        with self.assertRaisesRegex(ValueError, "not enabled"):
+            server.practice_for({"practice_id": "3"})
+
+    def test_explicit_list_keeps_default_practice(self):
+        server = make_server(ATHENA_PRACTICE_IDS="3,4")
+        self.assertEqual(server.practice_for({"practice_id": "1"}), "1")
+        self.assertEqual(server.practice_for({"practice_id": "4"}), "4")
+        with self.assertRaisesRegex(ValueError, "not enabled"):
+            server.practice_for({"practice_id": "5"})
+
+    def test_wildcard_allows_any_practice(self):
+        server = make_server(ATHENA_PRACTICE_IDS="*")
+        self.assertEqual(server.practice_for({"practice_id": "12345"}), "12345")
+        with self.assertRaisesRegex(ValueError, "Invalid practice_id"):
+            server.practice_for({"practice_id": "x1"})
+
+
+if __name__ == "__main__":
+    unittest.main()
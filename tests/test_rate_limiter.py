@@ -0,0 +1,44 @@
+"""Token bucket and adaptive concurrency limiter behaviour"""
+
+import asyncio
+import time
+import unittest
+
+from main import AdaptiveConcurrencyLimiter, TokenBucket
+
+
+class TokenBucketTest(unittest.IsolatedAsyncioTestCase):
+    async def test_cancelled_waiters_return_their_tokens(self):
+        bucket = TokenBucket(rate=1, burst=1)
+        await bucket.acquire()
+        waiters = [asyncio.create_task(bucket.acquire()) for _ in range(30)]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+        await asyncio.gather(*waiters, return_exceptions=True)
+        self.assertGreater(bucket.tokens, -1)
+
+
+class AdaptiveConcurrencyLimiterTest(unittest.TestCase):
+    def test_throttling_halves_the_limit_once_per_round_trip(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=32)
+        sent_at = time.monotonic()
+        for _ in range(10):
+            limiter.on_throttled(sent_at=sent_at)
+        self.assertEqual(limiter.limit, 16)
+        
+        # A request sent after the decrease reports new overload
+        limiter.on_throttled(sent_at=time.monotonic())
+        self.assertEqual(limiter.limit, 8)
+
+    def test_retry_after_pauses_even_without_a_decrease(self):
+        limiter = AdaptiveConcurrencyLimiter(max_limit=32)
+        sent_at = time.monotonic()
+        limiter.on_throttled(sent_at=sent_at)
+        limiter.on_throttled(retry_after=5, sent_at=sent_at)
+        self.assertEqual(limiter.limit, 16)
+        self.assertGreater(limiter.paused_until, time.monotonic() + 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+"""Retry, timeout and circuit breaker behaviour against the fault-injecting simulator"""
+
+import asyncio
+import unittest
+
+from helpers import SimulatorTestCase
+from main import CircuitBreaker
+from simulator import AthenaSimulator
+
+
+class SendWithRetriesTest(SimulatorTestCase):
+    async def test_rate_limit_queueing_does_not_time_out(self):
+        # 30 reads at 5/s queue for up to 6s locally, well past the 1s attempt timeout
+        simulator = AthenaSimulator(latency=0.01, patients=50)
+        server = await self.start_server(
+            simulator,
+            ATHENA_RATE_LIMIT_READ="5",
+            ATHENA_RATE_LIMIT_BURST="1",
+            ATHENA_RETRY_ATTEMPT_TIMEOUT="1"
+        )
+        results = await asyncio.gather(
+            *(server.send_api_request("/patients", params={"lastname": f"Nobody{i}"}) for i in range(30)),
+            return_exceptions=True
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        self.assertEqual(errors, [])
+        self.assertEqual(self.route_requests(simulator, "GET", "/patients"), 30)
+        self.assertEqual(server.get_circuit_breaker("/patients").state, CircuitBreaker.CLOSED)
+
+    async def test_slow_upstream_still_times_out_and_opens_breaker(self):
+        simulator = AthenaSimulator(latency=0.5, patients=50)
+        server = await self.start_server(
+            simulator,
+            ATHENA_RETRY_MAX_ATTEMPTS="1",
+            ATHENA_RETRY_ATTEMPT_TIMEOUT="0.1",
+            ATHENA_CIRCUIT_FAILURE_THRESHOLD="3"
+        )
+        results = await asyncio.gather(
+            *(server.send_api_request("/patients", params={"lastname": f"Nobody{i}"}) for i in range(3)),
+            return_exceptions=True
+        )
+        self.assertTrue(all(isinstance(r, TimeoutError) for r in results))
+        self.assertEqual(server.get_circuit_breaker("/patients").state, CircuitBreaker.OPEN)
+
+    async def test_injected_errors_are_retried(self):
+        simulator = AthenaSimulator(patients=50)
+        server = await self.start_server(
+            simulator,
+            ATHENA_RETRY_BASE_DELAY="0.01",
+            ATHENA_RETRY_MAX_ATTEMPTS="5"
+        )
+        # Fetch the token first; token requests are not retried
+        await server.token_manager.get_token()
+        simulator.error_rate = 0.3
+        for i in range(10):
+            result = await server.send_api_request("/patients", params={"lastname": f"Nobody{i}"})
+            self.assertEqual(result["patients"], [])
+        self.assertGreater(simulator.errors_injected, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,133 @@
+"""Background slot inventory sync"""
+
+import asyncio
+import unittest
+from datetime import date, timedelta
+from typing import Any, Dict, List
+
+from helpers import SimulatorTestCase
+from main import SlotStore
+from simulator import AthenaSimulator
+
+
+class SlotSyncBackoffTest(unittest.IsolatedAsyncioTestCase):
+    async def test_failing_department_backs_off_up_to_sync_interval(self):
+        outage = True
+        
+        async def fetch_slots(department_id: str, start: date, end: date) -> List[Dict[str, Any]]:
+            if outage:
+                raise ConnectionError("Athena unavailable")
+            return []
+        
+        store = SlotStore(fetch_slots, departments=["1"], sync_interval=60, resync_delay=2)
+        waits = []
+        for _ in range(6):
+            with self.assertRaises(ConnectionError):
+                await store.sync_department("1")
+            waits.append(store._seconds_until_next_sync())
+        self.assertEqual([round(wait) for wait in waits], [4, 8, 16, 32, 60, 60])
+        self.assertEqual(store.stats()["failing"]["1"]["failures"], 6)
+        
+        outage = False
+        await store.sync_department("1")
+        self.assertEqual(store.failures, {})
+        self.assertAlmostEqual(store._seconds_until_next_sync(), 60, delta=1)
+
+    async def test_background_sync_does_not_retry_every_second(self):
+        calls = 0
+        
+        async def fetch_slots(department_id: str, start: date, end: date) -> List[Dict[str, Any]]:
+            nonlocal calls
+            calls += 1
+            raise ConnectionError("Athena unavailable")
+        
+        store = SlotStore(fetch_slots, departments=["1"], sync_interval=60, resync_delay=2)
+        store.start()
+        await asyncio.sleep(3.5)
+        await store.stop()
+        self.assertEqual(calls, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
+
+
+class FindOpenSlotsTest(SimulatorTestCase):
+    async def asyncSetUp(self):
+        self.simulator = AthenaSimulator(patients=50)
+        self.server = await self.start_server(self.simulator, ATHENA_SLOT_SYNC_DAYS="7")
+
+    async def test_dates_past_the_sync_horizon_are_fetched_from_athena(self):
+        day = (date.today() + timedelta(days=20)).isoformat()
+        result = await self.server.call_tool("find_open_slots", {"department_id": "1", "after": day, "limit": 5})
+        self.assertEqual(len(result["appointments"]), 5)
+        starts = [SlotStore.slot_start(slot) for slot in result["appointments"]]
+        self.assertEqual(starts, sorted(starts))
+        self.assertTrue(all(start.date().isoformat() >= day for start in starts))
+
+    async def test_open_ended_search_reports_how_far_it_looked(self):
+        day = (date.today() + timedelta(days=40)).isoformat()
+        result = await self.server.call_tool("find_open_slots", {"department_id": "1", "after": day})
+        # The simulator schedule ends after 30 days
+        self.assertEqual(result["appointments"], [])
+        self.assertTrue(result["truncated"])
+        self.assertEqual(result["searched_until"], (date.today() + timedelta(days=46)).isoformat())
+
+    async def test_range_within_the_horizon_stays_local(self):
+        before = self.route_requests(self.simulator, "GET", "/appointments/open")
+        await self.server.call_tool("find_open_slots", {"department_id": "1"})
+        synced = self.route_requests(self.simulator, "GET", "/appointments/open")
+        result = await self.server.call_tool("find_open_slots", {"department_id": "1", "limit": 3})
+        self.assertEqual(len(result["appointments"]), 3)
+        self.assertNotIn("truncated", result)
+        self.assertEqual(self.route_requests(self.simulator, "GET", "/appointments/open"), synced)
+        self.assertGreater(synced, before)
+
+
+class AppointmentChangeResyncTest(SimulatorTestCase):
+    async def asyncSetUp(self):
+        self.simulator = AthenaSimulator(patients=50)
+        self.server = await self.start_server(self.simulator)
+        self.slot_store = (await self.server.practices.get("1")).slot_store
+        for department_id in ("1", "2", "3"):
+            await self.slot_store.sync_department(department_id)
+        # Appointments booked before this server started, so it never tracked their departments
+        self.appointments = {
+            department_id: next(a for a in self.simulator.booked.values() if a["departmentid"] == department_id)
+            for department_id in ("1", "2")
+        }
+
+    async def test_update_dirties_the_department_from_the_response(self):
+        await self.server.call_tool("update_appointment", {"appointment_id": self.appointments["2"]["appointmentid"], "notes": "x"})
+        self.assertEqual(self.slot_store.dirty, {"2"})
+
+    async def test_cancel_dirties_the_callers_department(self):
+        appointment_id = self.appointments["1"]["appointmentid"]
+        await self.server.call_tool("cancel_appointment", {"appointment_id": appointment_id, "department_id": "1"})
+        self.assertEqual(self.slot_store.dirty, {"1"})
+
+    async def test_unknown_department_dirties_everything(self):
+        await self.server.call_tool("cancel_appointment", {"appointment_id": self.appointments["1"]["appointmentid"]})
+        self.assertEqual(self.slot_store.dirty, {"1", "2", "3"})
+
+
+class AvailableSlotsOrderTest(SimulatorTestCase):
+    async def test_local_and_live_answers_match(self):
+        simulator = AthenaSimulator(patients=50)
+        server = await self.start_server(simulator)
+        args = {
+            "department_id": "1,2",
+            "start_date": date.today().isoformat(),
+            "end_date": (date.today() + timedelta(days=2)).isoformat()
+        }
+        live = await server.call_tool("get_available_slots", args)
+        slot_store = (await server.practices.get("1")).slot_store
+        for department_id in ("1", "2"):
+            await slot_store.sync_department(department_id)
+        requests = self.route_requests(simulator, "GET", "/appointments/open")
+        local = await server.call_tool("get_available_slots", args)
+        self.assertEqual(self.route_requests(simulator, "GET", "/appointments/open"), requests)
+        self.assertEqual(
+            [slot["appointmentid"] for slot in local["appointments"]],
+            [slot["appointmentid"] for slot in live["appointments"]]
+        )
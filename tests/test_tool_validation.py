@@ -0,0 +1,168 @@
+"""Tool arguments are checked against the input schemas and mapped to Athena parameters"""
+
+import unittest
+
+from helpers import make_server
+from main import InvalidArgumentsError, compile_check
+
+BOOKING = {
+    "patient_id": "1", "provider_id": "2", "department_id": "3", "appointment_type_id": "4",
+    "appointment_date": "2026-01-05", "appointment_time": "09:30"
+}
+
+
+class ToolValidationTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = make_server()
+        self.addAsyncCleanup(self.server.close)
+        self.specs = self.server.tool_specs
+
+    def test_valid_arguments_pass(self):
+        cases = [
+            ("get_appointments", {"start_date": "2026-01-05", "end_date": "2026-01-05"}),
+            ("get_appointments", {"start_date": "01/05/2026", "end_date": "2026-02-01", "max_results": 10}),
+            ("get_available_slots", {"department_id": "1,2", "start_date": "01/05/2026", "end_date": "01/09/2026"}),
+            ("create_appointment", {**BOOKING, "any_provider": True, "max_alternatives": 0}),
+            ("create_appointment", {**BOOKING, "appointment_time": "23:59"}),
+            ("search_patients", {"last_name": "Smith", "date_of_birth": "12/31/1980", "fuzzy": False}),
+            ("find_open_slots", {"department_id": "1", "earliest_time": "00:00", "latest_time": "14:05"}),
+            ("get_departments", {"practice_id": "1", "fields": ["departmentid"], "format": "table"}),
+            ("batch", {"items": [{"tool": "get_departments"}, {"tool": "get_providers", "arguments": {}}]})
+        ]
+        for tool, arguments in cases:
+            with self.subTest(tool=tool, arguments=arguments):
+                self.specs[tool].validate(arguments)
+
+    def test_invalid_arguments_are_rejected(self):
+        cases = [
+            # Required fields
+            ("get_appointments", {"start_date": "2026-01-05"}, "end_date is required"),
+            ("get_available_slots", {"start_date": "2026-01-05", "end_date": "2026-01-05"}, "department_id is required"),
+            ("create_appointment", {k: v for k, v in BOOKING.items() if k != "patient_id"}, "patient_id is required"),
+            ("update_appointment", {"notes": "x"}, "appointment_id is required"),
+            ("cancel_appointment", {}, "appointment_id is required"),
+            ("batch", {}, "items is required"),
+            # Wrong types, with booleans not accepted as integers
+            ("get_appointments", {"start_date": 20260105, "end_date": "2026-01-05"}, "start_date must be of type string"),
+            ("get_appointments", {"start_date": "2026-01-05", "end_date": "2026-01-05", "max_results": "10"}, "max_results must be of type integer"),
+            ("get_appointments", {"start_date": "2026-01-05", "end_date": "2026-01-05", "max_results": True}, "max_results must be of type integer"),
+            ("get_appointments", {"start_date": "2026-01-05", "end_date": "2026-01-05", "chunk_days": 1.5}, "chunk_days must be of type integer"),
+            ("create_appointment", {**BOOKING, "any_provider": "yes"}, "any_provider must be of type boolean"),
+            ("create_appointment", {**BOOKING, "max_alternatives": False}, "max_alternatives must be of type integer"),
+            ("search_patients", {"fuzzy": 1}, "fuzzy must be of type boolean"),
+            ("get_departments", {"fields": "departmentid"}, "fields must be of type array"),
+            ("get_departments", {"fields": ["departmentid", 7]}, "fields[1] must be of type string"),
+            ("get_departments", {"format": "xml"}, "format must be one of json, table, pretty"),
+            ("batch", {"items": {"tool": "get_departments"}}, "items must be of type array"),
+            ("batch", {"items": [], "max_parallel": True}, "max_parallel must be of type integer"),
+            # Bad dates in either format
+            ("get_appointments", {"start_date": "2026-13-01", "end_date": "2026-12-31"}, "start_date must be a date"),
+            ("get_appointments", {"start_date": "2026-02-30", "end_date": "2026-12-31"}, "start_date must be a date"),
+            ("get_appointments", {"start_date": "2026-01-05", "end_date": "02/30/2026"}, "end_date must be a date"),
+            ("get_appointments", {"start_date": "2026-01-05", "end_date": "13/01/2026"}, "end_date must be a date"),
+            ("get_appointments", {"start_date": "2026/01/05", "end_date": "2026-01-05"}, "start_date must be a date"),
+            ("get_appointments", {"start_date": "tomorrow", "end_date": "2026-01-05"}, "start_date must be a date"),
+            ("search_patients", {"date_of_birth": "1980-1-1x"}, "date_of_birth must be a date"),
+            ("create_appointment", {**BOOKING, "appointment_date": "01-05-2026"}, "appointment_date must be a date"),
+            # end_date before start_date, in the same or mixed formats
+            ("get_appointments", {"start_date": "2026-01-05", "end_date": "2026-01-04"}, "end_date is before start_date"),
+            ("get_available_slots", {"department_id": "1", "start_date": "01/05/2026", "end_date": "2025-12-31"}, "end_date is before start_date"),
+            ("get_appointment_changes", {"start_date": "02/01/2026", "end_date": "01/31/2026"}, "end_date is before start_date"),
+            # HH:MM times
+            ("create_appointment", {**BOOKING, "appointment_time": "9:30"}, "appointment_time must match"),
+            ("create_appointment", {**BOOKING, "appointment_time": "24:00"}, "appointment_time must match"),
+            ("create_appointment", {**BOOKING, "appointment_time": "09:60"}, "appointment_time must match"),
+            ("update_appointment", {"appointment_id": "1", "appointment_time": "09:30:00"}, "appointment_time must match"),
+            ("find_open_slots", {"department_id": "1", "earliest_time": "2pm"}, "earliest_time must match"),
+            ("find_open_slots", {"department_id": "1", "latest_time": 1400}, "latest_time must be of type string"),
+            # Batch items are reported by index
+            ("batch", {"items": [{"tool": "get_departments"}, {"arguments": {}}]}, "items[1].tool is required"),
+            ("batch", {"items": [{"tool": "a"}, {"tool": "b"}, "get_departments"]}, "items[2] must be of type object"),
+            ("batch", {"items": [{"tool": "a"}, {"tool": 3}]}, "items[1].tool must be of type string"),
+            ("batch", {"items": [{"tool": "a", "arguments": []}]}, "items[0].arguments must be of type object")
+        ]
+        for tool, arguments, message in cases:
+            with self.subTest(tool=tool, arguments=arguments):
+                with self.assertRaises(InvalidArgumentsError) as raised:
+                    self.specs[tool].validate(arguments)
+                self.assertIn(message, str(raised.exception))
+                self.assertTrue(str(raised.exception).startswith(f"Invalid arguments for {tool}: "))
+
+    async def test_batch_reports_invalid_item_arguments_by_index(self):
+        result = await self.server.batch({"items": [
+            {"tool": "get_appointments", "arguments": {"start_date": "2026-01-05"}},
+            {"tool": "create_appointment", "arguments": {**BOOKING, "appointment_time": "25:00"}}
+        ]})
+        self.assertEqual(result["failed"], 2)
+        self.assertEqual([item["index"] for item in result["results"]], [0, 1])
+        self.assertIn("get_appointments: end_date is required", result["results"][0]["error"])
+        self.assertIn("create_appointment: appointment_time must match", result["results"][1]["error"])
+
+    def test_athena_params(self):
+        cases = [
+            ("get_appointments",
+             {"start_date": "2026-01-05", "end_date": "2026-01-06", "provider_id": "2", "department_id": "3", "max_results": 5, "practice_id": "1"},
+             {"startdate": "2026-01-05", "enddate": "2026-01-06", "providerid": "2", "departmentid": "3"}),
+            ("get_available_slots",
+             {"department_id": "3", "start_date": "01/05/2026", "end_date": "01/06/2026", "chunk_days": 2},
+             {"departmentid": "3", "startdate": "01/05/2026", "enddate": "01/06/2026"}),
+            ("create_appointment",
+             {**BOOKING, "reason_for_visit": "checkup", "any_provider": True},
+             {"providerid": "2", "departmentid": "3", "appointmentdate": "2026-01-05", "appointmenttime": "09:30", "reasonforvisit": "checkup"}),
+            ("update_appointment",
+             {"appointment_id": "9", "department_id": "3", "appointment_date": "2026-01-07", "appointment_time": "10:00", "reason_for_visit": "x", "notes": "n"},
+             {"departmentid": "3", "appointmentdate": "2026-01-07", "appointmenttime": "10:00", "reasonforvisit": "x", "notes": "n"}),
+            ("cancel_appointment",
+             {"appointment_id": "9", "department_id": "3", "cancellation_reason": "sick"},
+             {"departmentid": "3", "cancellationreason": "sick"}),
+            ("get_providers", {"department_id": "3", "specialty": "cardiology"}, {"departmentid": "3", "specialty": "cardiology"}),
+            ("get_departments", {"practice_id": "1", "fields": ["departmentid"]}, {}),
+            ("get_appointment_types", {"department_id": "3", "provider_id": "2"}, {"departmentid": "3", "providerid": "2"}),
+            ("search_patients",
+             {"first_name": "Ann", "last_name": "Lee", "date_of_birth": "1980-01-01", "phone": "555", "email": "a@b.c", "fuzzy": True},
+             {"firstname": "Ann", "lastname": "Lee", "dob": "1980-01-01", "homephone": "555", "email": "a@b.c"}),
+            ("get_cache_stats", {"practice_id": "1"}, {}),
+            ("clear_cache", {"endpoint": "/providers"}, {}),
+            ("get_rate_limit_stats", {}, {}),
+            ("get_server_metrics", {}, {}),
+            ("find_open_slots",
+             {"department_id": "3", "provider_id": "2", "appointment_type_id": "4", "limit": 3},
+             {"departmentid": "3", "providerid": "2"}),
+            ("get_appointment_changes",
+             {"start_date": "2026-01-05", "end_date": "2026-01-06", "provider_id": "2", "department_id": "3", "cursor": "c"},
+             {"startdate": "2026-01-05", "enddate": "2026-01-06", "providerid": "2", "departmentid": "3"}),
+            ("batch", {"items": [], "max_parallel": 2}, {})
+        ]
+        self.assertEqual({tool for tool, _, _ in cases}, set(self.specs))
+        for tool, arguments, expected in cases:
+            with self.subTest(tool=tool):
+                self.assertEqual(self.specs[tool].athena_params(arguments), expected)
+
+
+class CompileCheckTest(unittest.TestCase):
+    def test_nested_paths_in_messages(self):
+        check = compile_check("", {
+            "type": "object",
+            "properties": {
+                "rows": {"type": "array", "items": {"type": "array", "items": {"type": "integer"}}}
+            }
+        })
+        check({"rows": [[1, 2], []]})
+        for value, message in [
+            ({"rows": [[1], [2, "3"]]}, "rows[1][1] must be of type integer"),
+            ({"rows": [[1], [True]]}, "rows[1][0] must be of type integer"),
+            ({"rows": [1]}, "rows[0] must be of type array"),
+            ([], "arguments must be of type object")
+        ]:
+            with self.subTest(value=value):
+                with self.assertRaises(InvalidArgumentsError) as raised:
+                    check(value)
+                self.assertEqual(str(raised.exception), message)
+
+    def test_unknown_properties_are_ignored(self):
+        check = compile_check("", {"type": "object", "properties": {"a": {"type": "string"}}, "required": ["a"]})
+        check({"a": "x", "b": 1})
+
+
+if __name__ == "__main__":
+    unittest.main()